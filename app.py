@@ -1,29 +1,51 @@
 import streamlit as st
-from streamlit_option_menu import option_menu
-import os, datetime, json, pandas as pd
-from helpers.mini_ai_smart import MiniLegalAI
-from helpers.settings_manager import SettingsManager
-from helpers.ui_components import message_bubble, section_header, info_card
-from recommender import smart_recommender
-from st_aggrid import AgGrid
-from st_aggrid.grid_options_builder import GridOptionsBuilder
-import plotly.express as px
+import os, datetime, pandas as pd
+from helpers.chat_pipeline import ChatPipeline
+from helpers.engine_registry import engine_from_config, engine_stats
+from helpers.result_cache import shared_result_cache
+from helpers.perf_metrics import export_prometheus, metrics_store, sizes_store, start_metrics_server, timed
+from helpers.settings_manager import SettingsManager, clean_user, verify_user
+from helpers.startup_profiler import init_stage, lazy_import, startup_profiler
+from helpers.ui_components import (emit_html, finish_payload_meter, info_card, inject_styles,
+                                   section_header, start_payload_meter)
+from helpers.warmup import start_background_warmup, warm_engine, warm_imports
+from recommender import record_interaction, shared_ranker, smart_recommender
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config.config import get_config, get_config_store, subscribe_config
+
+# الوحدات الثقيلة (st_aggrid، plotly، scikit-learn، requests، option_menu) تُستورد عبر lazy_import
+# عند أول استخدام من الصفحة التي تحتاجها، وزمن استيرادها يظهر في صفحة الأداء
 
 # ==============================
-# ⚙️ تحميل الإعدادات من config.json
+# ⚙️ الإعدادات: نسخة واحدة لكل عملية تُحدَّث تلقائيًا عند تعديل config/config.json
 # ==============================
-CONFIG_PATH = "config.json"
+config = get_config()
 
-def load_config():
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    else:
-        st.error("❌ لم يتم العثور على ملف config.json")
-        return {}
+def authenticated_user():
+    """
+    المستخدم الموثَّق من الرابط: ?user=<الاسم>&token=<HMAC بالمفتاح USER_TOKEN_SECRET>
+    (الرمز يُنشأ بـ python -m helpers.settings_manager <الاسم>)، أو None.
+    """
+    params = st.experimental_get_query_params()
+    user = clean_user(params.get("user", [""])[0])
+    token = params.get("token", [""])[0]
+    return user if verify_user(user, token, os.getenv("USER_TOKEN_SECRET", "")) else None
 
-config = load_config()
-settings = SettingsManager()
+def is_admin():
+    """المشرف: مستخدم موثَّق مذكور في AUTH.ADMINS (صفحات "admin" لا تظهر لغيره)"""
+    user = authenticated_user()
+    return user is not None and user in config.get("AUTH", {}).get("ADMINS", ())
+
+def settings_namespace():
+    """
+    مساحة الإعدادات: ملف لكل مستخدم موثَّق فقط،
+    وإلا إعدادات للجلسة الحالية في الذاكرة فقط (فوق الإعدادات العامة).
+    """
+    user = authenticated_user()
+    if user:
+        return f"user:{user}", True
+    ctx = get_script_run_ctx()
+    return (f"session:{ctx.session_id}", False) if ctx else (None, True)
 
 # ==============================
 # ⚙️ إعداد الصفحة العامة
@@ -33,6 +55,16 @@ st.set_page_config(
     page_icon="⚖️",
     layout="wide"
 )
+if get_config_store().last_error:
+    st.error(get_config_store().last_error)
+start_payload_meter()
+
+namespace, persist = settings_namespace()
+# مطلوبة في كل صفحة لتحديد النمط؛ بعد أول تحميل تُقرأ من المخزن المشترك في الذاكرة
+# (بعد set_page_config: قد تعرض تحذيرًا عند غياب ملف الإعدادات)
+with init_stage("settings"):
+    settings = SettingsManager(namespace=namespace, persist=persist,
+                               debounce_seconds=config.get("SETTINGS", {}).get("DEBOUNCE_SECONDS", 1.0))
 
 # ==============================
 # 🌈 Theme ديناميكي
@@ -41,9 +73,8 @@ def load_css(theme=None):
     if theme is None:
         theme = config.get("THEME", "فاتح")
     css_file = config["UI"]["STYLES_LIGHT"] if theme=="فاتح" else config["UI"]["STYLES_DARK"]
-    if os.path.exists(css_file):
-        with open(css_file, "r", encoding="utf-8") as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    # الملف يُقرأ مرة واحدة (حتى يتغير) ويُحقن مرة واحدة لكل جلسة أو عند تغيير النمط
+    inject_styles(css_file, mode=config["UI"].get("STYLE_INJECTION", "session"))
 
 load_css(settings.get("THEME", config.get("THEME", "فاتح")))
 
@@ -51,71 +82,194 @@ load_css(settings.get("THEME", config.get("THEME", "فاتح")))
 # 📊 تحميل بيانات Google Sheets
 # ==============================
 SHEET_URL = config.get("SHEET_URL", "")
-@st.cache_data(ttl=config.get("CACHE", {}).get("TTL_SECONDS", 600))
+@st.cache_resource
+def get_sheets_refresher(url):
+    SheetsRefresher = lazy_import("helpers.sheets_refresher", "SheetsRefresher")
+    with init_stage("sheets_snapshot"):
+        refresher = SheetsRefresher(url, ttl_seconds=config.get("CACHE", {}).get("TTL_SECONDS", 600))
+
+    def update_ttl(old, new):
+        refresher.ttl_seconds = new.get_nested("CACHE", "TTL_SECONDS", default=600)
+    subscribe_config(update_ttl, "CACHE")
+    return refresher
+
 def load_google_sheets(url):
-    try:
-        with st.spinner("⏳ جاري تحميل البيانات..."):
-            df = pd.read_csv(url)
-        return df
-    except Exception as e:
-        st.error(f"حدث خطأ أثناء تحميل البيانات: {e}")
+    if not url:
         return pd.DataFrame()
+    refresher = get_sheets_refresher(url)
+    if refresher.data is None:
+        with st.spinner("⏳ جاري تحميل البيانات..."), init_stage("sheets"):
+            df = refresher.get()
+    else:
+        df = refresher.get()
+    if refresher.last_error:
+        if df.empty:
+            st.error(f"حدث خطأ أثناء تحميل البيانات: {refresher.last_error}")
+        else:
+            st.warning(f"⚠️ تعذر تحديث البيانات، يتم عرض آخر نسخة محفوظة: {refresher.last_error}")
+    return df
 
-data = load_google_sheets(SHEET_URL)
+def data_version():
+    """إصدار البيانات الحالية (بصمة محتوى الورقة)"""
+    return get_sheets_refresher(SHEET_URL).version if SHEET_URL else ""
 
 # ==============================
 # 🤖 إعداد المساعد الذكي
 # ==============================
-workbook_path = os.getenv("WORKBOOK_PATH", config.get("WORKBOOK_PATH", "AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx"))
-ai = MiniLegalAI(workbook_path)
+@st.cache_resource
+def configure_result_cache():
+    """ضبط ذاكرة النتائج مرة واحدة ثم عند كل تعديل لقسم CACHE"""
+    def apply(old, new):
+        shared_result_cache().configure(
+            max_size=new.get_nested("CACHE", "RESULTS_MAX_SIZE", default=2048),
+            ttl_seconds=new.get_nested("CACHE", "RESULTS_TTL_SECONDS", default=3600),
+        )
+    apply(None, config)
+    subscribe_config(apply, "CACHE")
+
+configure_result_cache()
+start_metrics_server(config.get("PERF", {}).get("METRICS_PORT"))
+
+def get_ai():
+    """المحرك المشترك: يُستورد (scikit-learn) ويُبنى مرة واحدة لكل عملية عند أول سؤال، لا عند بدء التطبيق"""
+    return engine_from_config(config)
+
+@st.cache_resource
+def get_search_backend():
+    """
+    خدمة البحث المحلية (تجميع استعلامات الجلسات في دفعات) إذا كانت مفعلة،
+    وإلا المحرك المشترك مباشرة. العميل يرجع للمحرك المحلي إذا تعذر الاتصال.
+    """
+    service = config.get("SEARCH_SERVICE", {})
+    ai = get_ai()
+    if not service.get("ENABLED", False):
+        return ai
+    search_service = lazy_import("helpers.search_service")
+    socket_path = service.get("SOCKET_PATH", "cache/search_service.sock")
+    if service.get("EMBEDDED", True):
+        search_service.ensure_search_service(ai, socket_path, window_ms=service.get("WINDOW_MS", 5),
+                                             max_batch=service.get("MAX_BATCH", 64))
+    return search_service.SearchClient(socket_path, timeout=service.get("TIMEOUT_SECONDS", 2.0), fallback=ai)
 
 # ==============================
 # 🧠 المساعد القانوني الذكي
 # ==============================
-def show_ai_assistant():
+@st.cache_resource
+def get_memory_manager():
+    """
+    ذاكرة تفاعلات المساعد المشتركة (مصدر ترتيب التوصيات).
+    سجل JSONL: كل سؤال سطر يُضاف تحت قفل ملف، لا إعادة كتابة للملف كاملًا.
+    """
+    AIMemoryManager = lazy_import("logs.ai_memory_manager", "AIMemoryManager")
+    path = config.get("AI", {}).get("MEMORY_PATH", "ai_memory.jsonl")
+    if path.endswith(".json"):  # الصيغة القديمة تعيد كتابة الملف كاملًا مع كل سؤال
+        path += "l"
+    with init_stage("ai_memory"):
+        memory = AIMemoryManager(path)
+        memory.import_legacy_json(os.path.splitext(path)[0] + ".json")
+        return memory
+
+def show_ai_assistant(role=None):
+    """:return: آخر سؤال في الجلسة (لترتيب التوصيات)"""
     if not config.get("AI", {}).get("ENABLE", True):
-        return
+        return ""
     section_header("🤖 المساعد القانوني الذكي", "🤖")
-    query = st.text_input("💬 اكتب سؤالك هنا:")
-    if query:
-        answer, reference, example = ai.advanced_search(query)
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
-        st.session_state.chat_history.append({"user": query, "ai": answer})
-        for chat in st.session_state.chat_history[-config.get("AI", {}).get("MAX_HISTORY", 20):]:
-            message_bubble("User", chat['user'], is_user=True)
-            message_bubble("AI", chat['ai'], is_user=False)
+    chat = ChatPipeline.for_session(max_history=config.get("AI", {}).get("MAX_HISTORY", 20))
+    # النموذج يُرجع submitted=True فقط في إعادة التشغيل الناتجة عن الإرسال نفسه
+    with st.form("chat_form", clear_on_submit=True):
+        query = st.text_input("💬 اكتب سؤالك هنا:")
+        submitted = st.form_submit_button("إرسال")
+    if submitted and query.strip():
+        result = chat.ask(query, get_search_backend().advanced_search, version=get_ai().index_version)
+        record_interaction(get_memory_manager(), role, query, result)
+    chat.render()
+    if chat.last:
+        _, reference, example = chat.last
         st.markdown(f"**📜 نص القانون:** {reference}")
         st.markdown(f"**💡 مثال تطبيقي:** {example}")
+    return chat.last_query
 
 # ==============================
 # 📈 عرض البيانات بشكل تفاعلي
 # ==============================
-def show_data_table(df):
+@st.cache_resource(max_entries=2)
+def get_grid_query(version, _df):
+    """طبقة الاستعلام لكل إصدار من البيانات (مشتركة بين الجلسات)"""
+    return lazy_import("helpers.grid_query", "GridQuery")(_df, version)
+
+def aggrid():
+    """:return: (AgGrid, GridOptionsBuilder) عند أول عرض لجدول"""
+    return lazy_import("st_aggrid", "AgGrid"), lazy_import("st_aggrid.grid_options_builder", "GridOptionsBuilder")
+
+def show_paged_table(df, version=""):
+    """جدول بصفحات: الترتيب والتصفية على الخادم، ويُرسل للمتصفح صفوف الصفحة الحالية فقط"""
+    grid = get_grid_query(version or f"{id(df)}:{len(df)}", df)
+    with st.expander("🔎 ترتيب وتصفية"):
+        col1, col2 = st.columns(2)
+        sort_by = col1.selectbox("الترتيب حسب", ["—"] + grid.columns, key="grid_sort")
+        ascending = col2.radio("الاتجاه", ["تصاعدي", "تنازلي"], horizontal=True, key="grid_dir") == "تصاعدي"
+        filter_columns = st.multiselect("أعمدة التصفية", grid.columns, key="grid_filter_columns")
+        filters = {column: st.text_input(f"🔍 {column}", key=f"grid_filter:{column}") for column in filter_columns}
+
+    page_sizes = [25, 50, 100, 200]
+    default_size = config.get("GRID", {}).get("PAGE_SIZE", 50)
+    col1, col2 = st.columns(2)
+    page_size = col2.selectbox("عدد الصفوف", page_sizes,
+                               index=page_sizes.index(default_size) if default_size in page_sizes else 1,
+                               key="grid_page_size")
+    # العودة للصفحة الأولى عند تغيير الترتيب أو الفلاتر
+    signature = (version, sort_by, ascending, tuple(sorted(filters.items())), page_size)
+    if st.session_state.get("grid_signature") != signature:
+        st.session_state.grid_signature = signature
+        st.session_state.grid_page = 1
+    pages = max(1, -(-grid.count(filters) // page_size))
+    page = col1.number_input(f"الصفحة (من {pages})", min_value=1, max_value=pages, step=1, key="grid_page")
+    window, total = grid.page(page - 1, page_size, sort_by if sort_by != "—" else None, ascending, filters)
+    if window.empty:
+        st.info("لا توجد صفوف مطابقة.")
+        return
+    start = (page - 1) * page_size
+    st.caption(f"عرض {start + 1}–{start + len(window)} من {total}")
+    AgGrid, GridOptionsBuilder = aggrid()
+    with timed("aggrid_render"):
+        gb = GridOptionsBuilder.from_dataframe(window)
+        gb.configure_default_column(editable=False, filter=False, sortable=False)
+        AgGrid(window, gridOptions=gb.build(), enable_enterprise_modules=False, height=400)
+
+def show_data_table(df, version=""):
     if df.empty:
         st.warning("⚠️ لا توجد بيانات للعرض.")
         return
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_pagination(paginationAutoPageSize=True)
-    gb.configure_side_bar()
-    gb.configure_default_column(editable=True, filter=True)
-    grid_options = gb.build()
-    AgGrid(df, gridOptions=grid_options, enable_enterprise_modules=True, height=400)
+    if config.get("GRID", {}).get("MODE", "server") == "server":
+        show_paged_table(df, version)
+        return
+    AgGrid, GridOptionsBuilder = aggrid()
+    with timed("aggrid_render"):
+        gb = GridOptionsBuilder.from_dataframe(df)
+        gb.configure_pagination(paginationAutoPageSize=True)
+        gb.configure_side_bar()
+        gb.configure_default_column(editable=True, filter=True)
+        grid_options = gb.build()
+        AgGrid(df, gridOptions=grid_options, enable_enterprise_modules=True, height=400)
 
 # ==============================
 # 📊 Charts و Metrics
 # ==============================
-def show_statistics(df):
+@st.cache_resource
+def get_dataset_stats():
+    """إحصائيات مشتركة بين الجلسات تُحسب مرة واحدة لكل إصدار من البيانات"""
+    return lazy_import("helpers.dataset_stats", "DatasetStats")()
+
+def show_statistics(df, version=""):
+    stats = get_dataset_stats().update(df, version)
     st.markdown("### 📊 إحصائيات سريعة")
     col1, col2, col3 = st.columns(3)
-    col1.metric("عدد المواد القانونية", len(df))
-    col2.metric("عدد التعديلات", df['المادة'].nunique() if 'المادة' in df.columns else 0)
-    col3.metric("عدد الأقسام القانونية", df['القسم'].nunique() if 'القسم' in df.columns else 0)
-    if 'القسم' in df.columns:
-        section_counts = df['القسم'].value_counts()
-        fig = px.pie(values=section_counts.values, names=section_counts.index,
-                     title="نسبة المواد حسب القسم", hole=0.3)
-        st.plotly_chart(fig, use_container_width=True)
+    col1.metric("عدد المواد القانونية", stats.rows)
+    col2.metric("عدد التعديلات", stats.distinct_articles)
+    col3.metric("عدد الأقسام القانونية", stats.distinct_sections)
+    if stats.figure is not None:
+        with timed("plotly_pie"):
+            st.plotly_chart(stats.figure, use_container_width=True)
 
 # ==============================
 # 🏠 الصفحة الرئيسية – Grid Cards UI
@@ -131,13 +285,15 @@ def show_home():
 
     sections = config.get("SIDEBAR", {}).get("MENU_ITEMS", [])
     cols = st.columns(3)
-    for i, section in enumerate(sections[:-1]):  # تجاهل الإعدادات لتظهر بشكل منفصل
+    sections = [s for s in sections[:-1] if not s.get("admin")]  # تجاهل الإعدادات وصفحات الإدارة
+    for i, section in enumerate(sections):
         with cols[i % 3]:
             if st.button(f"{section['icon']} {section['label']}", key=section['label']):
                 globals()[section['func']]()
 
-    show_data_table(data.head(10))
-    show_statistics(data)
+    data = load_google_sheets(SHEET_URL)
+    show_data_table(data, data_version())
+    show_statistics(data, data_version())
 
 # ==============================
 # 👷 العمال
@@ -150,8 +306,9 @@ def workers_section():
     for tab in tabs:
         with tab:
             st.markdown(f"🛠️ أداة: {tab.title}")
-    show_ai_assistant()
-    smart_recommender("العمال", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6))
+    query = show_ai_assistant("العمال")
+    smart_recommender("العمال", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6), query=query,
+                      memory=get_memory_manager())
 
 # ==============================
 # 🏢 أصحاب العمل
@@ -164,8 +321,9 @@ def employers_section():
     for tab in tabs:
         with tab:
             st.markdown(f"🛠️ أداة: {tab.title}")
-    show_ai_assistant()
-    smart_recommender("اصحاب العمل", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6))
+    query = show_ai_assistant("اصحاب العمل")
+    smart_recommender("اصحاب العمل", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6), query=query,
+                      memory=get_memory_manager())
 
 # ==============================
 # 🕵️ مفتشو العمل
@@ -177,8 +335,9 @@ def inspectors_section():
     for tab in tabs:
         with tab:
             st.markdown(f"🛠️ نوع التفتيش: {tab.title}")
-    show_ai_assistant()
-    smart_recommender("مفتشو العمل", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6))
+    query = show_ai_assistant("مفتشو العمل")
+    smart_recommender("مفتشو العمل", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6), query=query,
+                      memory=get_memory_manager())
 
 # ==============================
 # 📖 الباحثون والمتدربون
@@ -189,39 +348,112 @@ def researchers_section():
     for tab in tabs:
         with tab:
             st.markdown(f"🛠️ نوع التحليل: {tab.title}")
-    show_ai_assistant()
-    smart_recommender("الباحثون والمتدربون", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6))
+    query = show_ai_assistant("الباحثون والمتدربون")
+    smart_recommender("الباحثون والمتدربون", n=config.get("RECOMMENDER", {}).get("MAX_CARDS",6), query=query,
+                      memory=get_memory_manager())
 
 # ==============================
 # ⚙️ الإعدادات
 # ==============================
+LANGUAGES = {"ar": "العربية", "en": "English"}  # LANG يُحفظ كرمز اللغة
+
 def settings_page():
     section_header("⚙️ الإعدادات", "⚙️")
     theme = st.radio("اختر النمط:", ["فاتح", "غامق"], index=0 if settings.get("THEME", "فاتح")=="فاتح" else 1)
-    lang = st.selectbox("اختر اللغة:", ["العربية", "English"], index=0 if settings.get("LANG", "ar")=="ar" else 1)
-    settings.set("THEME", theme)
-    settings.set("LANG", lang)
+    codes = list(LANGUAGES)
+    current = settings.get("LANG", "ar")
+    current = {label: code for code, label in LANGUAGES.items()}.get(current, current)  # قيم قديمة محفوظة كاسم اللغة
+    lang = st.selectbox("اختر اللغة:", codes, index=codes.index(current) if current in codes else 0,
+                        format_func=LANGUAGES.get)
+    changed = settings.update({"THEME": theme, "LANG": lang})  # لا كتابة إذا لم تتغير القيم
     load_css(theme)
-    st.success("✅ تم حفظ الإعدادات.")
+    if changed:
+        st.success("✅ تم حفظ الإعدادات.")
+
+# ==============================
+# 📈 الأداء (للمشرفين)
+# ==============================
+def performance_page():
+    section_header("📈 الأداء", "📈")
+    if not is_admin():
+        st.error("⛔ هذه الصفحة للمشرفين فقط.")
+        return
+    store = metrics_store()
+    snapshot = store.snapshot()
+    if snapshot:
+        df = pd.DataFrame.from_dict(snapshot, orient="index")
+        df[["mean", "min", "max", "p50", "p95", "p99"]] *= 1000
+        st.markdown("#### ⏱️ زمن المراحل (ملّي ثانية)")
+        st.dataframe(df.round(3), use_container_width=True)
+    else:
+        st.info("لا توجد قياسات بعد.")
+    sizes = sizes_store().snapshot()
+    if sizes:
+        st.markdown("#### 📦 حجم HTML المرسل (بايت)")
+        st.dataframe(pd.DataFrame.from_dict(sizes, orient="index").drop(columns="sum").round(0),
+                     use_container_width=True)
+    col1, col2 = st.columns(2)
+    col1.markdown("#### 🤖 المحرك المشترك")
+    col1.json(engine_stats())
+    col2.markdown("#### 🗃️ ذاكرة النتائج")
+    col2.json(shared_result_cache().stats())
+    st.markdown("#### 💡 ترتيب التوصيات")
+    st.json(shared_ranker().stats())
+    st.markdown("#### 📊 إحصائيات البيانات المحسوبة مسبقًا")
+    st.json(get_dataset_stats().stats())
+    if config.get("SEARCH_SERVICE", {}).get("ENABLED", False):
+        st.markdown("#### 🔌 خدمة البحث (حجم الدفعة وعمق الطابور)")
+        try:
+            st.json(get_search_backend().stats())
+        except (OSError, ValueError, RuntimeError) as e:
+            st.warning(f"⚠️ تعذر الاتصال بخدمة البحث، يتم البحث محليًا: {e}")
+    startup = startup_profiler().report()
+    if startup:
+        st.markdown("#### 🚀 زمن الاستيراد والتهيئة عند أول استخدام (ملّي ثانية)")
+        df = pd.DataFrame(startup).set_index("name")
+        df["seconds"] *= 1000
+        st.dataframe(df.rename(columns={"seconds": "ms", "at": "بعد بدء العملية (ث)"}).round(3),
+                     use_container_width=True)
+    col1, col2 = st.columns(2)
+    col1.download_button("⬇️ JSON", store.export_json(), file_name="metrics.json", mime="application/json")
+    col2.download_button("⬇️ Prometheus", export_prometheus(), file_name="metrics.prom", mime="text/plain")
+    if st.button("♻️ تصفير القياسات"):
+        store.reset()
+        sizes_store().reset()
 
 # ==============================
 # 🧭 القائمة الجانبية
 # ==============================
+# صفحات الإدارة ("admin": true) تظهر للمشرفين فقط
+menu_items = [item for item in config.get("SIDEBAR", {}).get("MENU_ITEMS", []) if not item.get("admin") or is_admin()]
 with st.sidebar:
+    option_menu = lazy_import("streamlit_option_menu", "option_menu")
     choice = option_menu(
         "القائمة الرئيسية",
-        [item['label'] for item in config.get("SIDEBAR", {}).get("MENU_ITEMS", [])],
-        icons=[item['icon'] for item in config.get("SIDEBAR", {}).get("MENU_ITEMS", [])],
+        [item['label'] for item in menu_items],
+        icons=[item['icon'] for item in menu_items],
         default_index=0
     )
 
-pages = {item['label']: globals()[item['func']] for item in config.get("SIDEBAR", {}).get("MENU_ITEMS", [])}
-pages[choice]()
+pages = {item['label']: globals()[item['func']] for item in menu_items}
+with timed(f"page:{pages[choice].__name__}"):
+    pages[choice]()
 
 # ==============================
 # ⏰ Footer
 # ==============================
-st.markdown(
+emit_html(
     f"<hr><center><small>{config.get('FOOTER', {}).get('TEXT', f'© {datetime.datetime.now().year} AlyWork Law Pro — جميع الحقوق محفوظة.')}</small></center>",
-    unsafe_allow_html=True
-)
\ No newline at end of file
+    "footer"
+)
+finish_payload_meter()
+
+# ==============================
+# 🔥 تسخين في الخلفية بعد عرض أول صفحة (مرة واحدة لكل عملية)
+# ==============================
+@st.cache_resource
+def start_warmup():
+    return start_background_warmup([("imports", warm_imports), ("ai_engine", lambda: warm_engine(config))])
+
+if config.get("STARTUP", {}).get("BACKGROUND_WARMUP", True):
+    start_warmup()
\ No newline at end of file
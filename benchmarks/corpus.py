@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# 📚 مولّد قاعدة قانونية اصطناعية
+# ==============================
+CORPUS_COLUMNS = ["المادة", "القسم", "النص", "مثال", "نص_القانون", "مثال_تطبيقي"]
+
+SECTIONS = [
+    "العمال", "اصحاب العمل", "مفتشو العمل", "الباحثون والمتدربون", "الأجور",
+    "الإجازات", "إنهاء الخدمة", "السلامة المهنية", "عمل المرأة", "عمل الأحداث",
+    "النقابات", "التفتيش", "العقوبات", "عقود العمل", "ساعات العمل",
+]
+
+LEGAL_TERMS = [
+    "العامل", "صاحب", "العمل", "الأجر", "إجازة", "سنوية", "مرضية", "عقد", "محدد", "المدة",
+    "إنهاء", "الخدمة", "مكافأة", "نهاية", "إشعار", "فصل", "تعسفي", "تعويض", "ساعات", "إضافي",
+    "الضمان", "الاجتماعي", "الوزارة", "المفتش", "مخالفة", "غرامة", "المنشأة", "السلامة", "المهنية", "إصابة",
+    "الحد", "الأدنى", "للأجور", "الأمومة", "الحدث", "التدريب", "النقابة", "نزاع", "جماعي", "المحكمة",
+    "يستحق", "يلتزم", "يحق", "لا", "يجوز", "على", "في", "من", "إلى", "خلال",
+]
+
+_LETTERS = list("ابتثجحخدذرزسشصضطظعغفقكلمنهوي")
+
+
+def _synthetic_vocabulary(rng, size):
+    """كلمات عربية اصطناعية تكمل المصطلحات القانونية لتكبير المفردات مع حجم القاعدة"""
+    lengths = rng.integers(3, 7, size=size)
+    letters = rng.choice(_LETTERS, size=(size, 6))
+    words = {"".join(row[:n]) for row, n in zip(letters, lengths)}
+    return sorted(words - set(LEGAL_TERMS))
+
+
+def _sentences(rng, vocabulary, weights, count, min_words, max_words):
+    lengths = rng.integers(min_words, max_words + 1, size=count)
+    words = rng.choice(len(vocabulary), size=int(lengths.sum()), p=weights)
+    out, start = [], 0
+    for n in lengths:
+        out.append(" ".join(vocabulary[i] for i in words[start:start + n]))
+        start += n
+    return out
+
+
+def generate_corpus(rows, seed=42, vocabulary_size=None):
+    """
+    توليد DataFrame بأعمدة قاعدة القانون (المادة، القسم، النص، مثال، نص_القانون، مثال_تطبيقي).
+    توزيع الكلمات Zipf تقريبًا حتى تشبه الترددات نصوصًا حقيقية، والنتيجة ثابتة لنفس seed.
+    :param rows: عدد المواد
+    :param vocabulary_size: حجم المفردات الاصطناعية (افتراضيًا يكبر مع عدد الصفوف)
+    """
+    rng = np.random.default_rng(seed)
+    if vocabulary_size is None:
+        vocabulary_size = int(min(50_000, 500 + rows // 2))
+    vocabulary = LEGAL_TERMS + _synthetic_vocabulary(rng, vocabulary_size)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    law_texts = _sentences(rng, vocabulary, weights, rows, 12, 40)
+    examples = _sentences(rng, vocabulary, weights, rows, 6, 20)
+    sections = rng.choice(SECTIONS, size=rows)
+    articles = [f"المادة {i + 1}" for i in range(rows)]
+    return pd.DataFrame({
+        "المادة": articles,
+        "القسم": sections,
+        "النص": law_texts,
+        "مثال": examples,
+        "نص_القانون": law_texts,
+        "مثال_تطبيقي": examples,
+    }, columns=CORPUS_COLUMNS)
+
+
+def generate_queries(corpus, count, seed=7, words=(1, 3)):
+    """استعلامات من كلمات متتالية مأخوذة من نصوص القاعدة (تضمن وجود نتائج)"""
+    rng = np.random.default_rng(seed)
+    texts = corpus["النص"].to_numpy()
+    queries = []
+    for pos in rng.integers(0, len(texts), size=count):
+        tokens = texts[pos].split()
+        n = int(rng.integers(words[0], words[1] + 1))
+        start = int(rng.integers(0, max(1, len(tokens) - n + 1)))
+        queries.append(" ".join(tokens[start:start + n]))
+    return queries
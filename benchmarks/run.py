@@ -0,0 +1,335 @@
+"""
+قياس أداء المنصة على قواعد قانونية اصطناعية (1k / 10k / 100k مادة).
+
+التشغيل:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000 10000 --output cache/benchmarks/results.json
+    python -m benchmarks.run --baseline cache/benchmarks/previous.json --tolerance 0.25
+
+النتيجة ملف JSON، وتنتهي العملية برمز 1 عند تجاوز أي حد في benchmarks/thresholds.json
+أو تراجع أكبر من النسبة المسموحة مقارنة بنتيجة سابقة.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus, generate_queries
+from helpers.ai_logs_manager import AILogsManager
+from helpers.data_loader import read_data
+from helpers.mini_ai_smart import MiniLegalAI as TfidfLegalAI
+from helpers.result_cache import shared_result_cache
+from helpers.workbook_snapshot import compile_snapshot, read_sheet
+from logs.ai_memory_manager import AIMemoryManager
+from mini_ai_smart import MiniLegalAI as SmartLegalAI
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+DEFAULT_OUTPUT = "cache/benchmarks/results.json"
+# مقاييس الأعلى فيها أفضل؛ البقية (زمن، ذاكرة) الأقل أفضل
+HIGHER_IS_BETTER = ("_qps", "_per_sec")
+
+
+# ==============================
+# ⏱️ أدوات القياس
+# ==============================
+def _elapsed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _peak_mb(fn):
+    """أعلى استهلاك ذاكرة (Python + NumPy) أثناء تنفيذ fn"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def _latencies(fn, queries):
+    """زمن كل استدعاء بالملّي ثانية + الإنتاجية (استعلام/ثانية)"""
+    samples = []
+    start = time.perf_counter()
+    for query in queries:
+        t0 = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - start
+    samples = np.asarray(samples)
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "qps": len(queries) / total if total else 0.0,
+    }
+
+
+def _uncached(method):
+    """الدالة الأصلية دون ذاكرة النتائج المشتركة (حتى لا تقيس إصابات الذاكرة)"""
+    return getattr(method, "__wrapped__", method)
+
+
+# ==============================
+# 🤖 المحركات
+# ==============================
+def bench_tfidf_engine(corpus, queries, batch_size=32):
+    frame = corpus[["المادة", "القسم", "النص", "مثال"]]
+    build_seconds, ai = _elapsed(lambda: TfidfLegalAI.from_dataframe(frame))
+    search = _uncached(TfidfLegalAI.advanced_search)
+    query_stats = _latencies(lambda q: search(ai, q), queries)
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    batch_seconds, _ = _elapsed(lambda: [ai.batch_search(batch) for batch in batches])
+    return {
+        "build_seconds": build_seconds,
+        "build_peak_mb": _peak_mb(lambda: TfidfLegalAI.from_dataframe(frame)),
+        "query_p50_ms": query_stats["p50_ms"],
+        "query_p95_ms": query_stats["p95_ms"],
+        "query_qps": query_stats["qps"],
+        "batch_qps": len(queries) / batch_seconds if batch_seconds else 0.0,
+    }
+
+
+def bench_smart_engine(corpus, queries):
+    build_seconds, ai = _elapsed(lambda: SmartLegalAI.from_dataframe(corpus))
+    search = _uncached(SmartLegalAI.advanced_search)
+    suggest = _uncached(SmartLegalAI.suggest_related_materials)
+    query_stats = _latencies(lambda q: search(ai, q), queries)
+    suggest_stats = _latencies(lambda q: suggest(ai, q), queries)
+    return {
+        "build_seconds": build_seconds,
+        "build_peak_mb": _peak_mb(lambda: SmartLegalAI.from_dataframe(corpus)),
+        "query_p50_ms": query_stats["p50_ms"],
+        "query_p95_ms": query_stats["p95_ms"],
+        "query_qps": query_stats["qps"],
+        "suggest_p95_ms": suggest_stats["p95_ms"],
+    }
+
+
+# ==============================
+# 📥 التحميل
+# ==============================
+def _write_workbook(corpus, path):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("مواد_القانون")
+    ws.append(list(corpus.columns))
+    for row in corpus.itertuples(index=False):
+        ws.append(list(row))
+    wb.save(path)
+
+
+def bench_loaders(corpus, workdir, max_excel_rows):
+    csv_path = os.path.join(workdir, "corpus.csv")
+    corpus.to_csv(csv_path, index=False)
+    csv_seconds, _ = _elapsed(lambda: read_data(csv_path))
+    streaming_seconds, (_, report) = _elapsed(lambda: read_data(csv_path, streaming=True, chunksize=10_000))
+    results = {
+        "csv_read_seconds": csv_seconds,
+        "csv_streaming_seconds": streaming_seconds,
+        "csv_streaming_memory_mb": report["memory_bytes"] / (1024 * 1024),
+        "csv_streaming_peak_mb": _peak_mb(lambda: read_data(csv_path, streaming=True, chunksize=10_000)),
+    }
+    if len(corpus) <= max_excel_rows:
+        xlsx_path = os.path.join(workdir, "corpus.xlsx")
+        snapshot_dir = os.path.join(workdir, "snapshot")
+        _write_workbook(corpus, xlsx_path)
+        compile_seconds, _ = _elapsed(lambda: compile_snapshot(xlsx_path, snapshot_dir))
+        read_seconds, _ = _elapsed(lambda: read_sheet(xlsx_path, "مواد_القانون", snapshot_dir=snapshot_dir))
+        results["excel_snapshot_compile_seconds"] = compile_seconds
+        results["excel_snapshot_read_seconds"] = read_seconds
+    return results
+
+
+# ==============================
+# ✍️ مسارات الكتابة
+# ==============================
+def _interactions(corpus, count):
+    texts = corpus["النص"].to_numpy()
+    articles = corpus["المادة"].to_numpy()
+    for i in range(count):
+        pos = i % len(texts)
+        yield texts[pos][:80], texts[pos], articles[pos]
+
+
+def bench_memory_manager(corpus, workdir, write_ops):
+    results = {}
+    variants = [
+        ("json", "memory.json", {}, min(write_ops, 1_000)),  # إعادة كتابة كاملة: O(n²)
+        ("jsonl", "memory.jsonl", {}, write_ops),
+        ("jsonl_batched", "memory_batched.jsonl", {"batch_size": 100}, write_ops),
+        ("sqlite", "memory.db", {}, write_ops),
+    ]
+    for name, filename, options, count in variants:
+        backend = "jsonl" if name.startswith("jsonl") else name
+        manager = AIMemoryManager(os.path.join(workdir, filename), backend=backend, **options)
+
+        def write():
+            for query, response, reference in _interactions(corpus, count):
+                manager.add_interaction("العمال", query, response, reference=reference)
+            manager.save_memory()
+
+        seconds, _ = _elapsed(write)
+        results[f"{name}_add_per_sec"] = count / seconds if seconds else 0.0
+    return results
+
+
+def bench_logs_manager(corpus, workdir, write_ops):
+    logs = AILogsManager(os.path.join(workdir, "logs", "AI_Analysis_Logs.csv"))
+    enqueue_seconds = []
+
+    def write():
+        for query, response, reference in _interactions(corpus, write_ops):
+            t0 = time.perf_counter()
+            logs.log_interaction("العمال", query, response, reference=reference)
+            enqueue_seconds.append(time.perf_counter() - t0)
+        logs.flush()
+
+    seconds, _ = _elapsed(write)
+    logs.close()
+    return {
+        "log_per_sec": write_ops / seconds if seconds else 0.0,
+        "log_enqueue_p95_ms": float(np.percentile(enqueue_seconds, 95) * 1000),
+    }
+
+
+# ==============================
+# 🚦 الحدود والتراجع
+# ==============================
+def _lower_is_better(metric):
+    return not metric.endswith(HIGHER_IS_BETTER)
+
+
+def check_thresholds(results, thresholds):
+    """
+    مقارنة النتائج بالحدود المطلقة:
+    {"limits": {"1000": {"tfidf_engine.query_p95_ms": {"max": 20}}}}
+    """
+    checks = []
+    for size, limits in thresholds.get("limits", {}).items():
+        measured = results.get(str(size), {})
+        for metric, bound in limits.items():
+            if metric not in measured:
+                continue
+            value = measured[metric]
+            for kind, limit in bound.items():
+                ok = value <= limit if kind == "max" else value >= limit
+                checks.append({"size": str(size), "metric": metric, "kind": kind,
+                               "value": value, "limit": limit, "ok": ok})
+    return checks
+
+
+def check_baseline(results, baseline, tolerance):
+    """مقارنة نسبية مع نتيجة سابقة: التراجع المسموح = tolerance (0.25 = 25٪)"""
+    checks = []
+    for size, previous in baseline.get("results", {}).items():
+        measured = results.get(size, {})
+        for metric, old in previous.items():
+            if metric not in measured or not old:
+                continue
+            value = measured[metric]
+            if _lower_is_better(metric):
+                limit, ok = old * (1 + tolerance), value <= old * (1 + tolerance)
+            else:
+                limit, ok = old * (1 - tolerance), value >= old * (1 - tolerance)
+            checks.append({"size": size, "metric": metric, "kind": "baseline",
+                           "value": value, "limit": limit, "ok": ok})
+    return checks
+
+
+# ==============================
+# 🚀 التشغيل
+# ==============================
+def run(sizes, queries=200, write_ops=2_000, max_excel_rows=10_000, seed=42):
+    results = {}
+    for size in sizes:
+        print(f"⏳ قاعدة اصطناعية بحجم {size} مادة...")
+        corpus = generate_corpus(size, seed=seed)
+        query_list = generate_queries(corpus, queries, seed=seed + 1)
+        shared_result_cache().clear()
+        measured = {}
+        with tempfile.TemporaryDirectory(prefix="alywork-bench-") as workdir:
+            groups = [
+                ("tfidf_engine", lambda: bench_tfidf_engine(corpus, query_list)),
+                ("smart_engine", lambda: bench_smart_engine(corpus, query_list)),
+                ("loaders", lambda: bench_loaders(corpus, workdir, max_excel_rows)),
+                ("memory_manager", lambda: bench_memory_manager(corpus, workdir, write_ops)),
+                ("logs_manager", lambda: bench_logs_manager(corpus, workdir, write_ops)),
+            ]
+            for group, bench in groups:
+                for metric, value in bench().items():
+                    measured[f"{group}.{metric}"] = round(float(value), 6)
+        results[str(size)] = measured
+    return results
+
+
+def _print_report(results, checks):
+    for size, measured in results.items():
+        print(f"\n📊 {size} مادة")
+        for metric, value in measured.items():
+            print(f"  {metric:<45} {value:>14.4f}")
+    failed = [c for c in checks if not c["ok"]]
+    for c in failed:
+        print(f"❌ {c['size']} {c['metric']}: {c['value']:.4f} (الحد {c['kind']} = {c['limit']:.4f})")
+    if checks and not failed:
+        print(f"\n✅ كل الفحوص ناجحة ({len(checks)})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء AlyWork Law Pro")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--queries", type=int, default=200, help="عدد الاستعلامات لكل محرك")
+    parser.add_argument("--write-ops", type=int, default=2_000, help="عدد عمليات الكتابة للذاكرة والسجلات")
+    parser.add_argument("--max-excel-rows", type=int, default=10_000, help="أكبر حجم يُكتب كملف Excel")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--baseline", help="ملف نتائج سابق للمقارنة النسبية")
+    parser.add_argument("--tolerance", type=float, default=None, help="نسبة التراجع المسموحة مقارنة بالـ baseline")
+    args = parser.parse_args(argv)
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+    tolerance = args.tolerance if args.tolerance is not None else thresholds.get("tolerance", 0.25)
+
+    results = run(args.sizes, args.queries, args.write_ops, args.max_excel_rows, args.seed)
+    checks = check_thresholds(results, thresholds)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            checks += check_baseline(results, json.load(f), tolerance)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "queries": args.queries,
+            "write_ops": args.write_ops,
+            "seed": args.seed,
+        },
+        "results": results,
+        "checks": checks,
+        "passed": all(c["ok"] for c in checks),
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    _print_report(results, checks)
+    print(f"\n💾 {args.output}")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,285 @@
+import copy
 import json
 import os
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
 
+DEFAULT_CONFIG_PATH = os.getenv("CONFIG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"))
+
+
+def default_config():
+    """إعدادات افتراضية (تُدمج معها القيم الناقصة من الملف)"""
+    return {
+        "APP_NAME": "AlyWork Law Pro",
+        "VERSION": "v25.0",
+        "LANG": "ar",
+        "THEME": "فاتح",
+        "WORKBOOK_PATH": "AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx",
+        "SHEET_URL": "",
+        "CACHE": {"ENABLED": True, "TTL_SECONDS": 600},
+        "UI": {"STYLES_LIGHT": "assets/styles_light.css", "STYLES_DARK": "assets/styles_dark.css", "ICON_PATH": "assets/icons/"},
+        "AI": {"ENABLE": True, "MEMORY_PATH": "ai_memory.jsonl", "LOGS_PATH": "AI_Analysis_Logs.csv", "MAX_HISTORY": 20},
+        "RECOMMENDER": {"MAX_CARDS": 6},
+        "SIDEBAR": {"MENU_ITEMS": []},
+        "FOOTER": {"TEXT": "© 2025 AlyWork Law Pro — جميع الحقوق محفوظة."}
+    }
+
+
+# ==============================
+# 🧊 نسخة غير قابلة للتعديل
+# ==============================
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _merge_defaults(data, defaults):
+    merged = copy.deepcopy(defaults)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_defaults(value, merged[key])
+        else:
+            merged[key] = value
+    return merged
+
+
+def validate_config(data):
+    """
+    التحقق من بنية الإعدادات ودمج القيم الافتراضية.
+    :raises ValueError: عند وجود قيمة غير صالحة
+    """
+    if not isinstance(data, dict):
+        raise ValueError("❌ ملف الإعدادات يجب أن يكون كائن JSON")
+    config = _merge_defaults(data, default_config())
+    for section in ("CACHE", "UI", "AI", "RECOMMENDER", "SIDEBAR", "FOOTER"):
+        if not isinstance(config[section], dict):
+            raise ValueError(f"❌ القسم {section} يجب أن يكون كائن JSON")
+    for section, key in (("CACHE", "TTL_SECONDS"), ("AI", "MAX_HISTORY"), ("RECOMMENDER", "MAX_CARDS")):
+        value = config[section][key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"❌ {section}.{key} يجب أن يكون رقمًا موجبًا")
+    items = config["SIDEBAR"]["MENU_ITEMS"]
+    if not isinstance(items, list) or not all(isinstance(i, dict) and {"label", "func", "icon"} <= i.keys() for i in items):
+        raise ValueError("❌ SIDEBAR.MENU_ITEMS يجب أن تحتوي label و func و icon لكل عنصر")
+    return config
+
+
+class ConfigSnapshot(Mapping):
+    """
+    نسخة إعدادات مُحلّلة ومتحقق منها، غير قابلة للتعديل.
+    القواميس الداخلية MappingProxyType والقوائم tuple.
+    """
+
+    def __init__(self, data, version=0, path=None):
+        self._data = _freeze(data)
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_nested(self, *keys, default=None):
+        """الوصول للقيم المتداخلة: get_nested("AI", "MAX_HISTORY")"""
+        value = self._data
+        for key in keys:
+            if not isinstance(value, Mapping) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def to_dict(self):
+        """نسخة dict عادية قابلة للتعديل/الحفظ"""
+        return _thaw(self._data)
+
+
+# ==============================
+# 🔄 مخزن الإعدادات مع إعادة تحميل تلقائية
+# ==============================
+class ConfigStore:
+    """
+    مصدر واحد للإعدادات داخل العملية:
+    🔹 قراءة الملف والتحقق منه مرة واحدة؛ get() بدون أي عمليات على القرص
+    🔹 مراقبة الملف عبر watchdog واستبدال النسخة ذرّيًا عند تغيّره
+    🔹 إشعار المشتركين (مثل مدة الذاكرة المؤقتة) بالأقسام التي تغيرت فقط
+    🔹 ملف تالف أثناء التعديل لا يستبدل النسخة السليمة الحالية
+    """
+
+    def __init__(self, path=DEFAULT_CONFIG_PATH):
+        self.path = os.path.abspath(path)
+        self.last_error = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._observer = None
+        self._snapshot = ConfigSnapshot(default_config(), 0, self.path)
+        self.reload()
+
+    def get(self):
+        return self._snapshot
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"❌ لم يتم العثور على ملف config.json: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            return validate_config(json.load(f))
+
+    def reload(self):
+        """
+        إعادة قراءة الملف واستبدال النسخة الحالية.
+        :return: True إذا تغيرت الإعدادات
+        """
+        try:
+            data = self._read()
+        except (OSError, ValueError) as e:  # JSONDecodeError ترث ValueError
+            self.last_error = str(e)
+            print(f"⚠️ خطأ في ملف config.json: {e}")
+            return False
+        with self._lock:
+            old = self._snapshot
+            if old.version and data == old.to_dict():
+                self.last_error = None
+                return False
+            self._snapshot = ConfigSnapshot(data, old.version + 1, self.path)
+            self.last_error = None
+            subscribers = list(self._subscribers)
+        new = self._snapshot
+        for callback, sections in subscribers:
+            if sections is None or any(old.get(s) != new.get(s) for s in sections):
+                try:
+                    callback(old, new)
+                except Exception as e:
+                    print(f"⚠️ خطأ في مشترك الإعدادات {getattr(callback, '__name__', callback)}: {e}")
+        return True
+
+    def subscribe(self, callback, *sections):
+        """
+        تسجيل دالة callback(old, new) تُستدعى عند تغيّر الأقسام المحددة (أو أي تغيير).
+        :return: دالة لإلغاء الاشتراك
+        """
+        entry = (callback, sections or None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def watch(self):
+        """بدء مراقبة ملف الإعدادات (مرة واحدة)"""
+        if self._observer is not None:
+            return self._observer
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        store = self
+
+        class _Handler(FileSystemEventHandler):
+            # أحداث الكتابة فقط؛ أحداث الفتح/القراءة تسبب حلقة مع reload()
+            def _reload_if_config(self, *paths):
+                if store.path in {os.path.abspath(p) for p in paths if p}:
+                    store.reload()
+
+            def on_modified(self, event):
+                self._reload_if_config(event.src_path)
+
+            def on_created(self, event):
+                self._reload_if_config(event.src_path)
+
+            def on_moved(self, event):
+                self._reload_if_config(event.dest_path)
+
+        observer = Observer()
+        # مراقبة المجلد لا الملف: المحررات تحفظ عبر ملف مؤقت ثم rename
+        observer.schedule(_Handler(), os.path.dirname(self.path), recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return observer
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_config_store(path=None, watch=True):
+    """المخزن المشترك لملف إعدادات (يُنشأ ويبدأ المراقبة مرة واحدة لكل عملية)"""
+    path = os.path.abspath(path or DEFAULT_CONFIG_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ConfigStore(path)
+            if watch:
+                try:
+                    store.watch()
+                except (ImportError, OSError) as e:
+                    print(f"⚠️ تعذر مراقبة ملف الإعدادات، لن يُعاد تحميله تلقائيًا: {e}")
+        return store
+
+
+def get_config(path=None):
+    """النسخة الحالية من الإعدادات (بدون قراءة من القرص)"""
+    return get_config_store(path).get()
+
+
+def subscribe_config(callback, *sections, path=None):
+    return get_config_store(path).subscribe(callback, *sections)
+
+
+# ==============================
+# 🧩 واجهة التوافق القديمة
+# ==============================
 class ConfigManager:
-    def __init__(self, path="helpers/config.json"):
+    def __init__(self, path=DEFAULT_CONFIG_PATH):
         self.path = path
-        self.config = self.load_config()
+        self.store = get_config_store(path)
+
+    @property
+    def config(self):
+        return self.store.get()
 
     def load_config(self):
-        """تحميل ملف config.json أو إنشاء إعدادات افتراضية إذا لم يكن موجودًا"""
-        if os.path.exists(self.path):
-            try:
-                with open(self.path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except json.JSONDecodeError as e:
-                print(f"⚠️ خطأ في ملف config.json: {e}")
-                return self.default_config()
-        else:
-            print("⚠️ لم يتم العثور على ملف config.json، سيتم إنشاء ملف افتراضي.")
-            self.save_config(self.default_config())
-            return self.default_config()
+        """إعادة تحميل ملف config.json"""
+        self.store.reload()
+        return self.config
 
     def default_config(self):
         """إعدادات افتراضية"""
-        return {
-            "APP_NAME": "AlyWork Law Pro",
-            "VERSION": "v25.0",
-            "LANG": "ar",
-            "THEME": "فاتح",
-            "WORKBOOK_PATH": "AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx",
-            "SHEET_URL": "",
-            "CACHE": {"ENABLED": True, "TTL_SECONDS": 600},
-            "UI": {"STYLES_LIGHT": "assets/styles_light.css", "STYLES_DARK": "assets/styles_dark.css", "ICON_PATH": "assets/icons/"},
-            "AI": {"ENABLE": True, "MEMORY_PATH": "ai_memory.json", "LOGS_PATH": "AI_Analysis_Logs.csv"},
-            "RECOMMENDER": {"MAX_CARDS": 6},
-            "SIDEBAR": {"MENU_ITEMS": []},
-            "FOOTER": {"TEXT": "© 2025 AlyWork Law Pro — جميع الحقوق محفوظة."}
-        }
+        return default_config()
 
     def save_config(self, config=None):
-        """حفظ الإعدادات الحالية أو config معين"""
-        cfg = config or self.config
-        with open(self.path, "w", encoding="utf-8") as f:
+        """حفظ الإعدادات الحالية أو config معين (كتابة ذرّية ثم إعادة تحميل)"""
+        cfg = validate_config(_thaw(config) if config is not None else self.config.to_dict())
+        tmp_path = f"{self.store.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(cfg, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.store.path)
+        self.store.reload()
 
     def get(self, key, default=None):
         """الحصول على قيمة من config"""
@@ -49,12 +287,10 @@ class ConfigManager:
 
     def set(self, key, value):
         """تعديل قيمة في config وحفظها"""
-        self.config[key] = value
-        self.save_config()
+        cfg = self.config.to_dict()
+        cfg[key] = value
+        self.save_config(cfg)
 
     def get_nested(self, *keys, default=None):
         """الوصول للقيم المتداخلة بسهولة"""
-        cfg = self.config
-        for key in keys:
-            cfg = cfg.get(key, {})
-        return cfg or default
\ No newline at end of file
+        return self.config.get_nested(*keys, default=default)
@@ -0,0 +1,223 @@
+# helpers/ai_logs_manager.py
+
+import csv
+import glob
+import os
+import queue
+import threading
+import weakref
+from datetime import datetime
+import pandas as pd
+
+COLUMNS = ["timestamp", "role", "query", "response", "reference", "example", "notes"]
+
+
+class _LogWriter:
+    """
+    خيط الكتابة الخلفي وطابوره، منفصلان عن AILogsManager:
+    الخيط لا يحمل مرجعًا للمدير، فيمكن تحريره وإيقاف الخيط عبر weakref.finalize.
+    """
+
+    def __init__(self, partition_path, batch_size=50, flush_interval=1.0):
+        self.partition_path = partition_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._loop, name="ai-logs-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, entry):
+        self.queue.put(entry)
+        if self.stop.is_set():
+            # بعد close() لا يوجد خيط كتابة: الكتابة مباشرة
+            self.drain()
+
+    def _loop(self):
+        while not (self.stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def drain(self):
+        """كتابة ما تبقى في الطابور في الخيط الحالي (عندما لا يعمل خيط الكتابة)"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            with self._write_lock:
+                self._append_rows(batch)
+        except Exception as e:
+            print(f"⚠️ تعذر كتابة سجلات المساعد: {e}")
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _append_rows(self, rows):
+        """إلحاق الصفوف بملفات أيامها دون قراءة المحتوى السابق"""
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row["timestamp"][:10], []).append(row)
+        for day, day_rows in by_day.items():
+            path = self.partition_path(day)
+            new_file = not os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8-sig") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(day_rows)
+
+    def flush(self):
+        """انتظار كتابة كل السجلات المعلقة (أو كتابتها مباشرة إذا توقف خيط الكتابة)"""
+        pending = self.queue.all_tasks_done
+        with pending:
+            while self.queue.unfinished_tasks and self.thread.is_alive():
+                pending.wait(self.flush_interval)
+        if not self.thread.is_alive():
+            self.drain()
+
+    def close(self):
+        """إيقاف خيط الكتابة بعد تفريغ الطابور"""
+        if self.thread.is_alive():
+            self.stop.set()
+            self.thread.join()
+
+
+def _partition_path(directory, stem, ext):
+    return lambda day: os.path.join(directory, f"{stem}_{day}{ext}")
+
+
+class AILogsManager:
+    """
+    إدارة سجلات المحادثات الذكية للمساعد القانوني.
+    يتم حفظ كل استفسار واستجابة مع تفاصيل إضافية.
+    🔹 الكتابة في خيط خلفي عبر طابور، على دفعات، وبالإلحاق دون إعادة قراءة الملف
+    🔹 ملف منفصل لكل يوم (AI_Analysis_Logs_YYYY-MM-DD.csv)
+    🔹 القراءة والبحث لكل ملف يومي على حدة وعند الحاجة فقط
+    🔹 خيط الكتابة يُغلق عند تحرير المدير أو عند إنهاء العملية (weakref.finalize)
+    """
+    COLUMNS = COLUMNS
+
+    def __init__(self, file_path="data/AI_Analysis_Logs.csv", batch_size=50, flush_interval=1.0):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.directory = os.path.dirname(file_path) or "."
+        self.stem, self.ext = os.path.splitext(os.path.basename(file_path))
+        os.makedirs(self.directory, exist_ok=True)
+
+        # الخيط يتلقى دالة المسار لا المدير نفسه (حتى لا يبقيه حيًا)
+        self._writer = _LogWriter(_partition_path(self.directory, self.stem, self.ext), batch_size, flush_interval)
+        self._finalizer = weakref.finalize(self, self._writer.close)
+
+    def partition_path(self, day):
+        """مسار ملف سجلات يوم محدد"""
+        return self._writer.partition_path(day)
+
+    def create_empty_log(self, path=None):
+        """إنشاء ملف CSV فارغ مع الأعمدة المطلوبة"""
+        df = pd.DataFrame(columns=self.COLUMNS)
+        df.to_csv(path or self.file_path, index=False, encoding="utf-8-sig")
+
+    # ==============================
+    # ✍️ الكتابة في الخلفية
+    # ==============================
+    def log_interaction(self, role, query, response, reference="", example="", notes=""):
+        """إضافة سجل جديد للتفاعل (لا يحجب خيط الطلب)"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        new_entry = {
+            "timestamp": timestamp,
+            "role": role,
+            "query": query,
+            "response": response,
+            "reference": reference,
+            "example": example,
+            "notes": notes
+        }
+        self._writer.put(new_entry)
+        return new_entry
+
+    def flush(self):
+        """انتظار كتابة كل السجلات المعلقة"""
+        self._writer.flush()
+
+    def close(self):
+        """إيقاف خيط الكتابة بعد تفريغ الطابور (يُستدعى تلقائيًا عند تحرير المدير أو الإغلاق)"""
+        self._finalizer()
+
+    # ==============================
+    # 📖 القراءة والبحث
+    # ==============================
+    def partitions(self, start_date=None, end_date=None):
+        """
+        ملفات السجلات مرتبة حسب اليوم (الملف القديم غير المقسم أولًا إن وجد).
+        :param start_date / end_date: "YYYY-MM-DD"
+        """
+        paths = [self.file_path] if os.path.exists(self.file_path) and start_date is None else []
+        prefix = os.path.join(self.directory, f"{self.stem}_")
+        for path in sorted(glob.glob(f"{glob.escape(prefix)}*{self.ext}")):
+            day = path[len(prefix):-len(self.ext) or None]
+            if (start_date is None or day >= start_date) and (end_date is None or day <= end_date):
+                paths.append(path)
+        return paths
+
+    def iter_logs(self, start_date=None, end_date=None):
+        """قراءة الملفات اليومية واحدًا تلو الآخر"""
+        self.flush()
+        for path in self.partitions(start_date, end_date):
+            yield pd.read_csv(path, encoding="utf-8-sig")
+
+    def load_logs(self, start_date=None, end_date=None):
+        """تحميل السجلات (كلها أو ضمن فترة)"""
+        frames = list(self.iter_logs(start_date, end_date))
+        if not frames:
+            return pd.DataFrame(columns=self.COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def search_logs(self, keyword, start_date=None, end_date=None):
+        """البحث في السجلات حسب كلمة مفتاحية (عمليات متجهة لكل عمود بدل مسح الصفوف)"""
+        matches = []
+        for df in self.iter_logs(start_date, end_date):
+            mask = pd.Series(False, index=df.index)
+            for col in df.columns:
+                mask |= df[col].astype(str).str.contains(keyword, case=False, regex=False, na=False)
+            if mask.any():
+                matches.append(df[mask])
+        if not matches:
+            return pd.DataFrame(columns=self.COLUMNS)
+        return pd.concat(matches, ignore_index=True)
+
+# ==============================
+# 👷 مثال للاستخدام داخل Streamlit
+# ==============================
+if __name__ == "__main__":
+    logs_manager = AILogsManager()
+
+    # تسجيل مثال
+    logs_manager.log_interaction(
+        role="العمال",
+        query="كيف أحسب مكافأة نهاية الخدمة؟",
+        response="يجب حساب مكافأة نهاية الخدمة وفق المادة 40 من قانون العمل الأردني.",
+        reference="المادة 40 قانون العمل",
+        example="عامل أجره 500 دينار وعمل 5 سنوات يحصل على مكافأة 2500 دينار",
+        notes="✅ ممتاز"
+    )
+
+    # تحميل وعرض السجلات
+    df = logs_manager.load_logs()
+    print(df.head())
@@ -0,0 +1,89 @@
+from collections import OrderedDict, deque
+import streamlit as st
+from helpers.perf_metrics import timed
+from helpers.ui_components import emit_html, message_bubble_html
+
+MEMO_SIZE = 256
+
+
+def _normalize(query):
+    return " ".join(str(query).split())
+
+
+class ChatPipeline:
+    """
+    محادثة المساعد لكل جلسة، آمنة مع إعادات التشغيل (reruns):
+    🔹 السؤال يُجاب مرة واحدة لكل إرسال للنموذج (لا مع كل تفاعل آخر في الصفحة)
+    🔹 الإجابات محفوظة لكل جلسة: تكرار نفس السؤال لا يستدعي البحث
+      (وتُمسح عند تغيّر إصدار الفهرس بعد إعادة تحميل البيانات)
+    🔹 HTML كل رسالة يُبنى مرة واحدة، والسجل يُعرض في استدعاء markdown واحد
+      يُعاد تجميعه فقط عند إضافة رسالة
+    """
+
+    def __init__(self, max_history=20, memo_size=MEMO_SIZE):
+        self.max_history = max_history
+        self.memo_size = memo_size
+        self.history = deque(maxlen=max_history)
+        self.last = None
+        self.last_query = ""
+        self.searches = 0
+        self.memo_hits = 0
+        self._memo = OrderedDict()
+        self._memo_version = None
+        self._block = ""
+
+    @classmethod
+    def for_session(cls, key="chat_pipeline", max_history=20):
+        """المحادثة المحفوظة في st.session_state (تُنشأ مرة واحدة لكل جلسة)"""
+        pipeline = st.session_state.get(key)
+        if pipeline is None:
+            pipeline = st.session_state[key] = cls(max_history)
+        elif pipeline.max_history != max_history:
+            pipeline.max_history = max_history
+            pipeline.history = deque(pipeline.history, maxlen=max_history)
+            pipeline._block = ""
+        return pipeline
+
+    def ask(self, query, search, version=None):
+        """
+        الإجابة عن سؤال جديد وإضافته للسجل.
+        :param search: دالة البحث (مثل ai.advanced_search) تُرجع (answer, reference, example)
+        :param version: إصدار الفهرس (ai.index_version)؛ الإجابات المحفوظة من إصدار آخر لا تُستخدم
+        """
+        if version != self._memo_version:
+            self._memo.clear()
+            self._memo_version = version
+        key = _normalize(query)
+        result = self._memo.get(key)
+        if result is None:
+            result = tuple(search(query))
+            self.searches += 1
+            self._memo[key] = result
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+        self.last = result
+        self.last_query = query
+        self.history.append((
+            message_bubble_html("User", query, is_user=True),
+            message_bubble_html("AI", result[0], is_user=False),
+        ))
+        self._block = ""
+        return result
+
+    def render(self):
+        """عرض السجل كاملًا في عنصر واحد"""
+        if not self.history:
+            return
+        with timed("chat_render"):
+            if not self._block:
+                self._block = "\n".join(bubble for pair in self.history for bubble in pair)
+            emit_html(self._block, "chat_history")
+
+    def clear(self):
+        self.history.clear()
+        self.last = None
+        self.last_query = ""
+        self._block = ""
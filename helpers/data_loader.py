@@ -1,46 +1,169 @@
 import pandas as pd
 import streamlit as st
+from pandas.api.types import union_categoricals
+from helpers.workbook_snapshot import read_sheet
+
+DEFAULT_CHUNKSIZE = 50_000
+# أعمدة قليلة التنوع تُحوَّل دائمًا إلى category
+DEFAULT_CATEGORICALS = ("القسم", "المادة")
+# أي عمود نصي نسبة قيمه المميزة أقل من هذا الحد يُحوَّل أيضًا إلى category
+CATEGORY_RATIO = 0.5
+
 
 # ==============================
-# 📂 دالة تحميل البيانات الذكية
+# 🧮 تحسين أنواع الأعمدة
 # ==============================
-@st.cache_data(ttl=600)
-def load_data(source_path: str) -> pd.DataFrame:
+def optimize_dtypes(df: pd.DataFrame, categoricals=DEFAULT_CATEGORICALS) -> pd.DataFrame:
     """
-    تحميل البيانات من مصدر محدد (CSV، XLSX، Google Sheets).
-    
+    تقليص الذاكرة: تصغير الأعداد (downcast) وتحويل الأعمدة النصية قليلة التنوع إلى category.
+    """
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if col in categoricals:
+            converted[col] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series):
+            converted[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            converted[col] = pd.to_numeric(series, downcast="float")
+        elif pd.api.types.is_string_dtype(series) and len(series):
+            if series.nunique(dropna=False) / len(series) <= CATEGORY_RATIO:
+                converted[col] = series.astype("category")
+    return df.assign(**converted) if converted else df
+
+
+def _concat_chunks(chunks):
+    """دمج الدفعات مع توحيد فئات الأعمدة category بدل تحويلها إلى object"""
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    merged = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            merged[col] = pd.Series(union_categoricals(parts, ignore_order=True), name=col)
+        else:
+            merged[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(merged)
+
+
+def _iter_chunks(source_path, columns, dtypes, chunksize):
+    """قراءة المصدر على دفعات مع إسقاط الأعمدة غير المطلوبة أثناء القراءة"""
+    if source_path.startswith("http") or source_path.endswith(".csv"):
+        yield from pd.read_csv(source_path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+    elif source_path.endswith(".xlsx"):
+        df = read_sheet(source_path, 0, columns=columns)
+        if dtypes:
+            df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError("⚠️ صيغة الملف غير مدعومة. استخدم CSV أو XLSX أو رابط Google Sheets CSV.")
+
+
+# ==============================
+# 📥 القراءة (بدون أي عناصر واجهة)
+# ==============================
+def read_data(source_path: str, streaming: bool = False, columns=None, dtypes=None, predicate=None,
+              chunksize: int = DEFAULT_CHUNKSIZE, categoricals=DEFAULT_CATEGORICALS):
+    """
+    قراءة البيانات من CSV أو XLSX أو رابط Google Sheets CSV.
+
     Args:
         source_path (str): رابط أو مسار الملف.
-    
+        streaming (bool): القراءة على دفعات مع تحسين الأنواع.
+        columns (list): الأعمدة المطلوبة فقط.
+        dtypes (dict): أنواع صريحة للأعمدة (وإلا يتم استنتاجها).
+        predicate (callable): دالة تستقبل دفعة وتعيد قناعًا منطقيًا للصفوف المطلوبة.
+        chunksize (int): عدد الصفوف في كل دفعة.
+
     Returns:
-        pd.DataFrame: DataFrame يحتوي على البيانات، أو فارغ عند حدوث خطأ.
+        tuple: (DataFrame, report) حيث report يحتوي عدد الصفوف وحجم الذاكرة.
     """
-    try:
-        if source_path.startswith("http"):
-            # دعم Google Sheets CSV links
-            df = pd.read_csv(source_path)
-            st.success(f"✅ تم تحميل البيانات من الرابط بنجاح ({len(df)} صف).")
-            return df
-
+    columns = list(columns) if columns is not None else None
+    if streaming or predicate is not None:
+        chunks, n_chunks = [], 0
+        for chunk in _iter_chunks(source_path, columns, dtypes, chunksize):
+            n_chunks += 1
+            if predicate is not None:
+                chunk = chunk[predicate(chunk)]
+            if streaming:
+                chunk = optimize_dtypes(chunk, categoricals)
+            chunks.append(chunk)
+        df = _concat_chunks(chunks)
+    else:
+        n_chunks = 1
+        if source_path.startswith("http") or source_path.endswith(".csv"):
+            df = pd.read_csv(source_path, usecols=columns, dtype=dtypes)
         elif source_path.endswith(".xlsx"):
-            df = pd.read_excel(source_path, engine="openpyxl")
-            st.success(f"✅ تم تحميل ملف Excel بنجاح ({len(df)} صف).")
-            return df
-
-        elif source_path.endswith(".csv"):
-            df = pd.read_csv(source_path)
-            st.success(f"✅ تم تحميل ملف CSV بنجاح ({len(df)} صف).")
-            return df
-
+            df = read_sheet(source_path, 0, columns=columns)
         else:
             raise ValueError("⚠️ صيغة الملف غير مدعومة. استخدم CSV أو XLSX أو رابط Google Sheets CSV.")
 
+    report = {
+        "source": source_path,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "chunks": n_chunks,
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+    return df, report
+
+
+def _safe_read(source_path, **options):
+    """القراءة مع تحويل الأخطاء إلى رسالة بدل رفع استثناء"""
+    try:
+        df, report = read_data(source_path, **options)
+        return df, report, None
     except FileNotFoundError:
-        st.error(f"❌ لم يتم العثور على الملف: {source_path}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, f"❌ لم يتم العثور على الملف: {source_path}"
     except pd.errors.EmptyDataError:
-        st.error(f"❌ الملف فارغ: {source_path}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None, f"❌ الملف فارغ: {source_path}"
     except Exception as e:
-        st.error(f"❌ حدث خطأ أثناء تحميل البيانات: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame(), None, f"❌ حدث خطأ أثناء تحميل البيانات: {e}"
+
+
+@st.cache_data(ttl=600)
+def _cached_read(source_path, streaming=False, columns=None, dtypes=None):
+    return _safe_read(source_path, streaming=streaming, columns=columns, dtypes=dtypes)
+
+
+# ==============================
+# 📂 دالة تحميل البيانات الذكية
+# ==============================
+def show_load_status(report, error=None):
+    """عرض نتيجة التحميل في الواجهة (خارج الدالة المخزنة مؤقتًا)"""
+    if error:
+        st.error(error)
+    elif report:
+        size_mb = report["memory_bytes"] / (1024 * 1024)
+        st.success(f"✅ تم تحميل البيانات بنجاح ({report['rows']} صف، {size_mb:.1f} MB).")
+
+
+def load_data(source_path: str, streaming: bool = False, columns=None, dtypes=None, predicate=None,
+              show_status: bool = True) -> pd.DataFrame:
+    """
+    تحميل البيانات من مصدر محدد (CSV، XLSX، Google Sheets).
+
+    Args:
+        source_path (str): رابط أو مسار الملف.
+        streaming (bool): وضع القراءة على دفعات مع تحسين الأنواع.
+        columns (list): الأعمدة المطلوبة فقط.
+        dtypes (dict): أنواع صريحة للأعمدة.
+        predicate (callable): فلتر صفوف يُطبق أثناء القراءة (بدون تخزين مؤقت).
+        show_status (bool): عرض رسالة النجاح/الخطأ في الواجهة.
+
+    Returns:
+        pd.DataFrame: DataFrame يحتوي على البيانات، أو فارغ عند حدوث خطأ.
+    """
+    if predicate is None:
+        df, report, error = _cached_read(source_path, streaming, columns, dtypes)
+    else:
+        df, report, error = _safe_read(source_path, streaming=streaming, columns=columns,
+                                       dtypes=dtypes, predicate=predicate)
+    if show_status:
+        show_load_status(report, error)
+    return df
@@ -0,0 +1,122 @@
+import threading
+from collections import Counter, namedtuple
+import numpy as np
+import pandas as pd
+from helpers.perf_metrics import timed
+
+# ==============================
+# 📊 إحصائيات البيانات المحسوبة مسبقًا
+# ==============================
+STATS_COLUMNS = ("المادة", "القسم")
+
+# نسخة إحصائيات غير قابلة للتعديل لإصدار واحد من البيانات
+StatsSnapshot = namedtuple(
+    "StatsSnapshot",
+    "version rows distinct_articles distinct_sections section_counts article_counts figure figure_json",
+)
+
+
+def _value_counts(df, column):
+    if column not in df.columns:
+        return Counter()
+    return Counter(df[column].value_counts().to_dict())
+
+
+def _row_hashes(df):
+    columns = [c for c in STATS_COLUMNS if c in df.columns]
+    if not columns:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def _pie_figure(section_counts):
+    """مخطط نسبة المواد حسب القسم (عدد الأقسام محدود، فالحجم لا يتبع عدد الصفوف)"""
+    if not section_counts:
+        return None, None
+    import plotly.express as px  # يُستورد عند أول مخطط فقط (بطيء الاستيراد)
+
+    names, values = zip(*section_counts.most_common())
+    fig = px.pie(values=list(values), names=list(names), title="نسبة المواد حسب القسم", hole=0.3)
+    return fig, fig.to_json()
+
+
+class DatasetStats:
+    """
+    إحصائيات الصفحة الرئيسية مرة واحدة لكل إصدار من البيانات:
+    🔹 عدد المواد لكل قسم، المواد المميزة، وعدد التعديلات (الصفوف) لكل مادة
+    🔹 المخطط يُبنى ويُسلسل مرة واحدة مع الأرقام
+    🔹 إضافة صفوف في نهاية الورقة تُحدّث العدادات من الصفوف الجديدة فقط
+    عرض الصفحة يقرأ النسخة الحالية فقط، فلا يعتمد زمنه على حجم البيانات.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._snapshot = self._build("", 0, Counter(), Counter())
+        self.full_builds = 0
+        self.incremental_updates = 0
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _build(self, version, rows, section_counts, article_counts):
+        figure, figure_json = _pie_figure(section_counts)
+        return StatsSnapshot(version, rows, len(article_counts), len(section_counts),
+                             section_counts, article_counts, figure, figure_json)
+
+    def update(self, df, version):
+        """
+        الإحصائيات لإصدار البيانات الحالي (تُحسب فقط عند تغيّر الإصدار).
+        :param df: البيانات الكاملة
+        :param version: إصدار البيانات (مثل SheetsRefresher.version)
+        :return: StatsSnapshot
+        """
+        snapshot = self._snapshot
+        if version and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if version and snapshot.version == version:
+                return snapshot
+            with timed("dataset_stats_update"):
+                hashes = _row_hashes(df)
+                old_rows = len(self._hashes)
+                if 0 < old_rows <= len(df) and np.array_equal(hashes[:old_rows], self._hashes):
+                    snapshot = self._append(df.iloc[old_rows:], version, hashes)
+                else:
+                    self.full_builds += 1
+                    snapshot = self._build(version, len(df), _value_counts(df, "القسم"),
+                                           _value_counts(df, "المادة"))
+            self._hashes = hashes
+            self._snapshot = snapshot
+            return snapshot
+
+    def append(self, rows, version):
+        """إضافة صفوف جديدة معروفة مسبقًا (دون إعادة قراءة البيانات السابقة)"""
+        with self._lock:
+            self._hashes = np.concatenate([self._hashes, _row_hashes(rows)])
+            self._snapshot = self._append(rows, version, self._hashes)
+            return self._snapshot
+
+    def _append(self, rows, version, hashes):
+        old = self._snapshot
+        if rows.empty:
+            return old._replace(version=version)
+        self.incremental_updates += 1
+        section_counts = old.section_counts + _value_counts(rows, "القسم")
+        article_counts = old.article_counts + _value_counts(rows, "المادة")
+        # الرسم لا يتغير إذا لم تتغير أعداد الأقسام (مثل إضافة أعمدة أخرى فقط)
+        if section_counts == old.section_counts:
+            return old._replace(version=version, rows=len(hashes), article_counts=article_counts,
+                                distinct_articles=len(article_counts))
+        return self._build(version, len(hashes), section_counts, article_counts)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "rows": snapshot.rows,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+        }
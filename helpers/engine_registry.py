@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from helpers.fingerprint import file_stat, file_fingerprint
+from helpers.result_cache import shared_result_cache
+from helpers.startup_profiler import init_stage, lazy_import
+
+DEFAULT_WORKBOOK = "AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx"
+
+class EngineRegistry:
+    """
+    سجل مشترك على مستوى العملية لمحركات MiniLegalAI.
+    🔹 محرك واحد لكل ملف Excel، يُعاد استخدامه بين الجلسات وإعادات التشغيل (reruns)
+    🔹 المفتاح: المسار + وقت التعديل + بصمة المحتوى
+    🔹 لا يُعاد البناء إلا إذا تغيّر محتوى الملف فعليًا
+    """
+
+    def __init__(self, factory=None):
+        """:param factory: دالة بناء المحرك (الافتراضي MiniLegalAI، يُستورد مع أول بناء فقط لأنه يحمّل scikit-learn)"""
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _build_lock(self, key):
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key, stat):
+        """إرجاع المحرك إذا كان الملف لم يتغير منذ آخر بناء (فحص stat فقط)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["stat"] == stat:
+                self.hits += 1
+                return entry["engine"]
+        return None
+
+    def get(self, workbook_path, **kwargs):
+        """
+        الحصول على المحرك المشترك لملف قاعدة البيانات.
+        :param workbook_path: مسار ملف Excel
+        :param kwargs: معاملات إضافية للمحرك (مثل index_dir)
+        :return: MiniLegalAI
+        """
+        key = os.path.abspath(workbook_path)
+        stat = file_stat(key)
+        engine = self._lookup(key, stat)
+        if engine is not None:
+            return engine
+
+        # بناء واحد فقط لكل ملف حتى مع تزامن الجلسات
+        with self._build_lock(key):
+            stat = file_stat(key)
+            engine = self._lookup(key, stat)
+            if engine is not None:
+                return engine
+
+            sha256 = file_fingerprint(key)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry["sha256"] == sha256:
+                    # تغيّر وقت التعديل فقط دون المحتوى
+                    entry["stat"] = stat
+                    self.hits += 1
+                    return entry["engine"]
+                if entry is not None and hasattr(entry["engine"], "refresh_async"):
+                    # المحرك يحدّث فهرسه في الخلفية (جزئيًا إن أمكن) ويستبدله ذرّيًا،
+                    # وحتى ذلك الحين يخدم الطلبات من النسخة الحالية
+                    entry["engine"].refresh_async()
+                    entry["stat"] = stat
+                    entry["sha256"] = sha256
+                    self.hits += 1
+                    return entry["engine"]
+
+            if self.factory is None:
+                self.factory = lazy_import("helpers.mini_ai_smart", "MiniLegalAI")
+            start = time.perf_counter()
+            engine = self.factory(workbook_path, fingerprint=sha256, **kwargs)
+            build_time = time.perf_counter() - start
+            with self._lock:
+                self.misses += 1
+                old = self._entries.get(key)
+                self._entries[key] = {
+                    "engine": engine,
+                    "stat": stat,
+                    "sha256": sha256,
+                    "build_time": build_time,
+                    "built_at": time.time(),
+                }
+            if old is not None:
+                shared_result_cache().discard_version(old["engine"].index_version)
+            return engine
+
+    def invalidate(self, workbook_path=None):
+        """حذف محرك ملف محدد أو جميع المحركات"""
+        with self._lock:
+            if workbook_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(workbook_path), None)
+
+    def stats(self):
+        """إحصائيات إعادة الاستخدام وزمن البناء لكل ملف"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "engines": {
+                    key: {
+                        "sha256": entry["sha256"],
+                        "build_time": entry["build_time"],
+                        "built_at": entry["built_at"],
+                        "last_refresh": getattr(entry["engine"], "last_refresh", None),
+                    }
+                    for key, entry in self._entries.items()
+                },
+            }
+
+# ==============================
+# 🌐 السجل المشترك للعملية
+# ==============================
+_registry = EngineRegistry()
+
+def get_shared_engine(workbook_path, **kwargs):
+    """المحرك المشترك (thread-safe) لملف قاعدة البيانات"""
+    return _registry.get(workbook_path, **kwargs)
+
+def engine_from_config(config, watch=None):
+    """
+    المحرك المشترك بإعدادات قسم AI (WORKBOOK_PATH و INDEX_MODE قابلان للتجاوز من البيئة).
+    INDEX_MODE = "attach": هذا العامل يتصل بالفهرس المنشور من عامل آخر (mmap) بدل بنائه.
+    :param watch: تجاوز AI.WATCH_WORKBOOK (أداة التسخين لا تراقب الملف)
+    """
+    ai_config = config.get("AI", {})
+    workbook_path = os.getenv("WORKBOOK_PATH", config.get("WORKBOOK_PATH", DEFAULT_WORKBOOK))
+    with init_stage("ai_engine"):
+        return get_shared_engine(workbook_path, index_dir=ai_config.get("INDEX_DIR"),
+                                 watch=ai_config.get("WATCH_WORKBOOK", True) if watch is None else watch,
+                                 attach=os.getenv("INDEX_MODE", ai_config.get("INDEX_MODE", "build")) == "attach")
+
+def engine_stats():
+    """عدادات hit/miss وزمن البناء للمحرك المشترك"""
+    return _registry.stats()
@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+# ==============================
+# 🔑 بصمة ملفات المصدر
+# ==============================
+def file_stat(path):
+    """
+    إرجاع (mtime, size) للملف أو None إذا لم يكن موجودًا.
+    فحص رخيص يُستخدم قبل حساب البصمة الكاملة.
+    """
+    try:
+        st_ = os.stat(path)
+    except OSError:
+        return None
+    return st_.st_mtime_ns, st_.st_size
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """
+    حساب بصمة SHA-256 لمحتوى الملف (قراءة على دفعات).
+    :return: سلسلة hex أو "" إذا لم يكن الملف موجودًا
+    """
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_fingerprint_memo = {}
+
+def cached_fingerprint(path):
+    """
+    بصمة المحتوى مع ذاكرة حسب (mtime, size):
+    لا يُعاد حساب SHA-256 إلا إذا تغيّر الملف.
+    """
+    key = os.path.abspath(path)
+    stat = file_stat(key)
+    memo = _fingerprint_memo.get(key)
+    if memo is not None and memo[0] == stat:
+        return memo[1]
+    fingerprint = file_fingerprint(key)
+    _fingerprint_memo[key] = (stat, fingerprint)
+    return fingerprint
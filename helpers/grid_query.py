@@ -0,0 +1,139 @@
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from helpers.perf_metrics import timed
+
+# ==============================
+# 🗂️ طبقة استعلام الجدول على الخادم (ترقيم + ترتيب + تصفية)
+# ==============================
+MAX_PAGE_SIZE = 500
+_NUMERIC_FILTER = re.compile(r"^\s*(>=|<=|!=|>|<|=)?\s*(-?\d+(?:\.\d+)?)\s*$")
+_OPERATORS = {
+    ">=": np.greater_equal, "<=": np.less_equal, "!=": np.not_equal,
+    ">": np.greater, "<": np.less, "=": np.equal, None: np.equal,
+}
+
+
+class GridQuery:
+    """
+    استعلامات نافذة الصفوف لإصدار واحد من البيانات:
+    🔹 يُرسل للمتصفح صفوف الصفحة الحالية فقط، فحجم البيانات المرسلة ثابت مهما كبرت الورقة
+    🔹 ترتيب كل عمود يُحسب مرة واحدة (argsort) ويُعاد استخدامه لكل الصفحات
+    🔹 أقنعة الفلاتر ونتائج الاستعلامات الأخيرة محفوظة (LRU) للتنقل بين الصفحات دون إعادة الحساب
+    فلتر العمود النصي: يحتوي (بدون حساسية لحالة الأحرف).
+    فلتر العمود الرقمي: 10 أو ‎>=10 أو ‎<5 أو ‎!=3
+    """
+
+    def __init__(self, df, version="", cache_size=64):
+        self.df = df.reset_index(drop=True)
+        self.version = version
+        self.cache_size = cache_size
+        self._orders = {}
+        self._masks = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def __len__(self):
+        return len(self.df)
+
+    # ==============================
+    # 🔃 الترتيب والتصفية
+    # ==============================
+    def _order(self, column, ascending):
+        key = (column, ascending)
+        order = self._orders.get(key)
+        if order is None:
+            series = self.df[column]
+            try:
+                order = series.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            except TypeError:
+                # أنواع مختلطة في نفس العمود: ترتيب نصي
+                order = series.astype(str).sort_values(ascending=ascending, kind="stable").index.to_numpy()
+            self._orders[key] = order
+        return order
+
+    def _mask(self, column, expression):
+        key = (column, expression)
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+        series = self.df[column]
+        match = _NUMERIC_FILTER.match(expression)
+        if match and pd.api.types.is_numeric_dtype(series):
+            operator, value = match.groups()
+            mask = _OPERATORS[operator](series.to_numpy(), float(value))
+        else:
+            # الخلايا الفارغة (NaN/None) تبقى قيمًا مفقودة فلا تطابق "nan" أو "None"
+            text = series if pd.api.types.is_string_dtype(series) else series.astype("string")
+            mask = text.str.contains(expression, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        self._masks[key] = mask
+        while len(self._masks) > self.cache_size:
+            self._masks.popitem(last=False)
+        return mask
+
+    def _positions(self, sort_by, ascending, filters):
+        key = (sort_by, ascending, filters)
+        positions = self._results.get(key)
+        if positions is not None:
+            self._results.move_to_end(key)
+            return positions
+        mask = None
+        for column, expression in filters:
+            column_mask = self._mask(column, expression)
+            mask = column_mask if mask is None else mask & column_mask
+        if sort_by is not None:
+            positions = self._order(sort_by, ascending)
+            if mask is not None:
+                positions = positions[mask[positions]]
+        else:
+            positions = np.flatnonzero(mask) if mask is not None else None
+        self._results[key] = positions
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return positions
+
+    # ==============================
+    # 📄 نافذة الصفحة
+    # ==============================
+    def _normalize(self, filters):
+        return tuple(sorted(
+            (column, str(expression).strip())
+            for column, expression in (filters or {}).items()
+            if column in self.df.columns and str(expression).strip()
+        ))
+
+    def count(self, filters=None):
+        """عدد الصفوف المطابقة للفلاتر (لحساب عدد الصفحات)"""
+        filters = self._normalize(filters)
+        if not filters:
+            return len(self.df)
+        with self._lock:
+            return len(self._positions(None, True, filters))
+
+    def page(self, page=0, page_size=50, sort_by=None, ascending=True, filters=None):
+        """
+        صفوف صفحة واحدة بعد التصفية والترتيب.
+        :param page: رقم الصفحة (يبدأ من 0)
+        :param filters: dict {العمود: تعبير الفلتر}؛ القيم الفارغة تُتجاهل
+        :return: (DataFrame للصفحة فقط، عدد الصفوف المطابقة)
+        """
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        filters = self._normalize(filters)
+        if sort_by not in self.df.columns:
+            sort_by = None
+        with timed("grid_query"), self._lock:
+            positions = self._positions(sort_by, bool(ascending), filters)
+            total = len(self.df) if positions is None else len(positions)
+            start = max(0, int(page)) * page_size
+            if positions is None:
+                window = self.df.iloc[start:start + page_size]
+            else:
+                window = self.df.iloc[positions[start:start + page_size]]
+        return window, total
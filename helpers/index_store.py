@@ -0,0 +1,196 @@
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from scipy.sparse import csr_matrix
+
+# ==============================
+# 📦 إعدادات ملف الفهرس المحفوظ
+# ==============================
+INDEX_FORMAT_VERSION = 2  # v2: بيانات المواد بصيغة Arrow IPC (mmap دون نسخ)
+MANIFEST_NAME = "manifest.json"
+CURRENT_NAME = "CURRENT"
+ARTICLES_NAME = "articles.arrow"
+ARTICLE_COLUMNS = ["المادة", "القسم", "النص", "مثال"]
+
+
+def index_path(index_dir, fingerprint):
+    """مسار نسخة الفهرس الخاصة ببصمة ملف Excel وإصدار الصيغة"""
+    return os.path.join(index_dir, f"tfidf-v{INDEX_FORMAT_VERSION}-{fingerprint[:16]}")
+
+
+# ==============================
+# 💾 كتابة الفهرس
+# ==============================
+@contextlib.contextmanager
+def build_lock(index_dir):
+    """
+    قفل حصري بين العمليات أثناء بناء الفهرس:
+    عامل واحد يبني، والبقية تنتظر ثم تستخدم النسخة المنشورة.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, ".build.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish(index_dir, fingerprint):
+    """تحديث المؤشر CURRENT ذرّيًا لتتبعه العمال الآخرون (وضع attach)"""
+    tmp_path = os.path.join(index_dir, f".{CURRENT_NAME}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(fingerprint)
+    os.replace(tmp_path, os.path.join(index_dir, CURRENT_NAME))
+
+
+def current_fingerprint(index_dir):
+    """بصمة آخر فهرس منشور، أو "" إذا لم يُنشر شيء بعد"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_NAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _write_articles(path, db):
+    columns = [c for c in ARTICLE_COLUMNS if c in db.columns]
+    table = pa.table({col: pa.array(db[col].astype(str).tolist(), type=pa.string()) for col in columns})
+    with pa.OSFile(path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return columns
+
+
+def _read_articles(path):
+    """DataFrame مدعوم مباشرة بذاكرة الملف (string[pyarrow]) دون نسخ النصوص"""
+    table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pd.DataFrame({
+        col: pd.Series(pd.arrays.ArrowExtensionArray(table.column(col)), name=col)
+        for col in table.column_names
+    })
+
+
+def save_index(index_dir, fingerprint, vectorizer, tfidf_matrix, db, publish_current=True):
+    """
+    حفظ المفردات وأوزان idf ومصفوفة CSR وبيانات المواد في مجلد مُرقّم بالإصدار.
+    الكتابة تتم في مجلد مؤقت ثم يُعاد تسميته، فلا يرى القارئ فهرسًا نصف مكتوب.
+    :param publish_current: تحديث المؤشر CURRENT بعد الحفظ
+    :return: مسار مجلد الفهرس
+    """
+    target = index_path(index_dir, fingerprint)
+    if os.path.exists(os.path.join(target, MANIFEST_NAME)):
+        if publish_current:
+            publish(index_dir, fingerprint)
+        return target
+
+    os.makedirs(index_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=index_dir)
+    try:
+        matrix = csr_matrix(tfidf_matrix)
+        np.save(os.path.join(tmp_dir, "vocabulary.npy"), np.asarray(vectorizer.get_feature_names_out(), dtype=str))
+        np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_)
+        np.save(os.path.join(tmp_dir, "data.npy"), matrix.data)
+        np.save(os.path.join(tmp_dir, "indices.npy"), matrix.indices)
+        np.save(os.path.join(tmp_dir, "indptr.npy"), matrix.indptr)
+
+        columns = _write_articles(os.path.join(tmp_dir, ARTICLES_NAME), db)
+
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "shape": list(matrix.shape),
+            "columns": columns,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # عامل آخر نشر نفس النسخة في الوقت ذاته
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if publish_current:
+        publish(index_dir, fingerprint)
+    return target
+
+
+def prune_indexes(index_dir, keep=2):
+    """
+    حذف نسخ الفهرس الأقدم والإبقاء على آخر keep نسخ.
+    الحذف آمن للعمال الذين ما زالوا يستخدمون نسخة قديمة عبر mmap.
+    """
+    if not os.path.isdir(index_dir):
+        return
+    current = os.path.basename(index_path(index_dir, current_fingerprint(index_dir)))
+    versions = []
+    for name in os.listdir(index_dir):
+        manifest_file = os.path.join(index_dir, name, MANIFEST_NAME)
+        if name.startswith("tfidf-") and name != current and os.path.exists(manifest_file):
+            versions.append((os.path.getmtime(manifest_file), name))
+    for _, name in sorted(versions, reverse=True)[max(keep - 1, 0):]:
+        shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+
+# ==============================
+# 📂 تحميل الفهرس (memory-mapped)
+# ==============================
+def load_index(index_dir, fingerprint):
+    """
+    تحميل الفهرس المحفوظ دون openpyxl ودون إعادة تدريب.
+    المصفوفات تُفتح بوضع mmap فلا تُقرأ من القرص إلا عند الحاجة.
+    :return: (vocabulary, idf, tfidf_matrix, db) أو None إذا لم تتطابق البصمة
+    """
+    target = index_path(index_dir, fingerprint)
+    manifest_file = os.path.join(target, MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION or manifest.get("fingerprint") != fingerprint:
+            return None
+
+        def _load(name):
+            return np.load(os.path.join(target, name), mmap_mode="r")
+
+        terms = _load("vocabulary.npy")
+        vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+        matrix = csr_matrix(
+            (_load("data.npy"), _load("indices.npy"), _load("indptr.npy")),
+            shape=tuple(manifest["shape"]),
+            copy=False,
+        )
+        db = _read_articles(os.path.join(target, ARTICLES_NAME))
+        return vocabulary, np.asarray(_load("idf.npy")), matrix, db
+    except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+        print(f"⚠️ تعذر تحميل الفهرس المحفوظ: {e}")
+        return None
+
+
+# ==============================
+# 🛠️ خطوة بناء الفهرس من سطر الأوامر
+# ==============================
+if __name__ == "__main__":
+    import argparse
+    from helpers.mini_ai_smart import MiniLegalAI
+
+    parser = argparse.ArgumentParser(description="بناء فهرس TF-IDF المحفوظ لملف قاعدة البيانات")
+    parser.add_argument("workbook", help="مسار ملف Excel")
+    parser.add_argument("index_dir", help="مجلد حفظ الفهرس")
+    args = parser.parse_args()
+
+    ai = MiniLegalAI(args.workbook, index_dir=args.index_dir)
+    print(f"✅ تم بناء ونشر الفهرس: {index_path(args.index_dir, ai.fingerprint)}")
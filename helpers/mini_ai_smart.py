@@ -1,22 +1,126 @@
+import contextlib
+import threading
+import time
+from collections import namedtuple
+import numpy as np
 import pandas as pd
 import os
 import re
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from helpers.fingerprint import file_fingerprint
+from helpers.index_store import (ARTICLE_COLUMNS, CURRENT_NAME, build_lock, current_fingerprint,
+                                 load_index, prune_indexes, save_index)
+from helpers.result_cache import cached_result, new_index_version, shared_result_cache
+from helpers.workbook_snapshot import read_sheet
+from helpers.perf_metrics import timed
+
+# نسخة فهرس كاملة غير قابلة للتعديل؛ الاستعلامات تقرأ نسخة واحدة من البداية للنهاية
+IndexState = namedtuple("IndexState", ["db", "vectorizer", "tfidf_matrix", "fingerprint", "version"])
+
+# أقصى نسبة صفوف معدّلة تُحدَّث جزئيًا؛ أكثر من ذلك يعني إعادة بناء كاملة
+INCREMENTAL_MAX_FRACTION = 0.05
+
+
+def row_hashes(db):
+    """بصمة لكل مادة (المادة، القسم، النص، مثال) لاكتشاف الصفوف المعدلة"""
+    columns = [c for c in ARTICLE_COLUMNS if c in db.columns]
+    if db.empty or not columns:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(db[columns].astype(str), index=False).to_numpy()
+
+
+def _replace_rows(matrix, positions, replacements, appended):
+    """مصفوفة CSR جديدة: صفوف positions مستبدلة بـ replacements ثم الصفوف المضافة في النهاية"""
+    blocks, start = [], 0
+    for i, pos in enumerate(positions):
+        if pos > start:
+            blocks.append(matrix[start:pos])
+        blocks.append(replacements[i])
+        start = pos + 1
+    if start < matrix.shape[0]:
+        blocks.append(matrix[start:])
+    if appended.shape[0]:
+        blocks.append(appended)
+    return sp.vstack(blocks, format="csr")
+
 
 class MiniLegalAI:
-    def __init__(self, workbook_path=None):
+    """
+    مساعد البحث TF-IDF مع تحديث حيّ لقاعدة المعرفة:
+    🔹 كل الفهرس (البيانات + المفردات + المصفوفة) في IndexState واحدة تُستبدل ذرّيًا
+    🔹 الاستعلامات الجارية تكمل على النسخة القديمة
+    🔹 تعديل/إضافة عدد قليل من المواد دون كلمات جديدة → تحديث الصفوف المتأثرة فقط
+    🔹 غير ذلك → إعادة بناء كاملة في الخلفية
+    """
+
+    def __init__(self, workbook_path=None, index_dir=None, fingerprint=None, watch=False, attach=False):
         """
         تهيئة المساعد الذكي وربط قاعدة البيانات القانونية.
         :param workbook_path: مسار ملف Excel الرئيسي (AlyWork_Law_Pro)
+        :param index_dir: مجلد الفهرس المحفوظ (اختياري) لتسريع التشغيل البارد
+        :param fingerprint: بصمة الملف إن كانت محسوبة مسبقًا
+        :param watch: مراقبة ملف Excel وتحديث الفهرس تلقائيًا عند تعديله
+        :param attach: استخدام آخر فهرس منشور في index_dir (CURRENT) دون قراءة ملف Excel؛
+                       عامل واحد يبني وينشر، والبقية تتصل بنفس الملفات عبر mmap
         """
         self.workbook_path = workbook_path or "AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx"
-        self.db = self.load_database()
-        self.vectorizer = None
-        self.tfidf_matrix = None
-        self.build_tfidf_matrix()
-    
-    def load_database(self):
+        self.index_dir = index_dir
+        self.attach = bool(attach and index_dir)
+        self._init_refresh()
+        state = self._attach_current() if self.attach else None
+        if state is None:
+            state = self._load_or_build(fingerprint or file_fingerprint(self.workbook_path))
+        self._state = state
+        if watch:
+            self.watch()
+
+    @classmethod
+    def from_dataframe(cls, df, fingerprint=""):
+        """
+        إنشاء المساعد من DataFrame جاهز دون ملف Excel (لقياس الأداء والتجارب).
+        :param df: DataFrame بالأعمدة: المادة، القسم، النص، مثال
+        """
+        ai = cls.__new__(cls)
+        ai.workbook_path = None
+        ai.index_dir = None
+        ai.attach = False
+        ai._init_refresh()
+        ai._state = ai.build_state(df.fillna(""), fingerprint)
+        return ai
+
+    def _init_refresh(self):
+        self.last_refresh = None
+        self._swap_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_pending = False
+        self._refresh_thread = None
+        self._observer = None
+
+    # ==============================
+    # 🔎 النسخة الحالية من الفهرس
+    # ==============================
+    @property
+    def db(self):
+        return self._state.db
+
+    @property
+    def vectorizer(self):
+        return self._state.vectorizer
+
+    @property
+    def tfidf_matrix(self):
+        return self._state.tfidf_matrix
+
+    @property
+    def fingerprint(self):
+        return self._state.fingerprint
+
+    @property
+    def index_version(self):
+        return self._state.version
+
+    def load_database(self, fingerprint=None):
         """
         تحميل قاعدة البيانات من ملف Excel.
         يتوقع وجود الأعمدة: المادة، القسم، النص، مثال
@@ -25,7 +129,8 @@ class MiniLegalAI:
             print(f"⚠️ ملف قاعدة البيانات غير موجود: {self.workbook_path}")
             return pd.DataFrame(columns=['المادة', 'القسم', 'النص', 'مثال'])
         try:
-            df = pd.read_excel(self.workbook_path, engine='openpyxl')
+            with timed("excel_load"):
+                df = read_sheet(self.workbook_path, 0, columns=ARTICLE_COLUMNS, fingerprint=fingerprint)
             df.fillna("", inplace=True)
             return df
         except Exception as e:
@@ -41,16 +146,229 @@ class MiniLegalAI:
         text = re.sub(r"\s+", " ", text)
         return text
 
-    def build_tfidf_matrix(self):
+    def normalize_query(self, query):
+        """توحيد الاستعلام كمفتاح للذاكرة المؤقتة (نفس تقطيع TfidfVectorizer)"""
+        return " ".join(self.preprocess_text(query).lower().split())
+
+    def build_tfidf_matrix(self, db):
         """
         بناء مصفوفة TF-IDF للنصوص في قاعدة البيانات
+        :return: (vectorizer, tfidf_matrix) أو (None, None) لقاعدة فارغة
+        """
+        if db.empty:
+            return None, None
+        # قياس واحد لكل تمرير على النصوص (لا لكل صف)
+        with timed("preprocess_corpus"):
+            corpus = db['النص'].apply(self.preprocess_text).tolist()
+        vectorizer = TfidfVectorizer()
+        return vectorizer, vectorizer.fit_transform(corpus)
+
+    def build_state(self, db, fingerprint=""):
+        """بناء نسخة فهرس كاملة جديدة (إعادة تدريب TF-IDF)"""
+        vectorizer, tfidf_matrix = self.build_tfidf_matrix(db)
+        return IndexState(db, vectorizer, tfidf_matrix, fingerprint, new_index_version((fingerprint or "frame")[:16]))
+
+    def load_saved_index(self, fingerprint):
+        """
+        تحميل الفهرس المحفوظ (mmap) إذا كانت بصمته مطابقة لملف Excel الحالي.
+        :return: IndexState عند النجاح، None للرجوع إلى إعادة البناء
         """
-        if self.db.empty:
+        if not fingerprint:
+            return None
+        loaded = load_index(self.index_dir, fingerprint)
+        if loaded is None:
+            return None
+        vocabulary, idf, tfidf_matrix, db = loaded
+        vectorizer = TfidfVectorizer()
+        vectorizer.vocabulary_ = vocabulary
+        vectorizer.idf_ = idf
+        return IndexState(db, vectorizer, tfidf_matrix, fingerprint, new_index_version(fingerprint[:16]))
+
+    def save_index(self, state=None):
+        """حفظ الفهرس الحالي على القرص ليستخدمه أي عامل جديد"""
+        state = state or self._state
+        if not self.index_dir or state.tfidf_matrix is None or not state.fingerprint:
             return
-        corpus = self.db['النص'].apply(self.preprocess_text).tolist()
-        self.vectorizer = TfidfVectorizer()
-        self.tfidf_matrix = self.vectorizer.fit_transform(corpus)
+        try:
+            save_index(self.index_dir, state.fingerprint, state.vectorizer, state.tfidf_matrix, state.db)
+        except OSError as e:
+            print(f"⚠️ تعذر حفظ الفهرس: {e}")
+
+    # ==============================
+    # 🔄 التحديث الحيّ لقاعدة المعرفة
+    # ==============================
+    def _incremental_state(self, old, db, fingerprint):
+        """
+        نسخة جديدة بتحديث الصفوف المعدلة/المضافة فقط، بنفس المفردات وأوزان idf.
+        :return: (IndexState, عدد الصفوف المحدثة) أو None إذا لزمت إعادة بناء كاملة
+        (حذف مواد، تغييرات كثيرة، أو كلمات غير موجودة في المفردات)
+        """
+        if old.vectorizer is None or db.empty or len(db) < len(old.db):
+            return None
+        old_hashes, new_hashes = row_hashes(old.db), row_hashes(db)
+        changed = np.flatnonzero(new_hashes[:len(old_hashes)] != old_hashes)
+        appended = np.arange(len(old_hashes), len(new_hashes))
+        rows = np.concatenate([changed, appended])
+        if len(rows) > max(1, INCREMENTAL_MAX_FRACTION * len(db)):
+            return None
+        matrix = old.tfidf_matrix
+        if len(rows):
+            texts = [self.preprocess_text(t) for t in db['النص'].iloc[rows]]
+            analyzer = old.vectorizer.build_analyzer()
+            vocabulary = old.vectorizer.vocabulary_
+            if any(term not in vocabulary for text in texts for term in analyzer(text)):
+                return None
+            new_rows = old.vectorizer.transform(texts)
+            matrix = _replace_rows(old.tfidf_matrix, changed, new_rows[:len(changed)], new_rows[len(changed):])
+        return IndexState(db, old.vectorizer, matrix, fingerprint, new_index_version(fingerprint[:16])), len(rows)
+
+    # ==============================
+    # 🗂️ الفهرس المنشور المشترك بين العمال
+    # ==============================
+    def _build_lock(self):
+        return build_lock(self.index_dir) if self.index_dir else contextlib.nullcontext()
+
+    def _publish(self, state):
+        """
+        حفظ النسخة ونشرها (CURRENT) ثم إعادة فتحها من القرص عبر mmap،
+        فتستخدم كل العمليات نفس الصفحات في الذاكرة بدل نسخة خاصة لكل عامل.
+        """
+        if not self.index_dir or state.tfidf_matrix is None or not state.fingerprint:
+            return state
+        self.save_index(state)
+        return self.load_saved_index(state.fingerprint) or state
+
+    def _attach_current(self):
+        """فتح آخر فهرس منشور (أو None إذا لم يُنشر شيء بعد)"""
+        fingerprint = current_fingerprint(self.index_dir)
+        return self.load_saved_index(fingerprint) if fingerprint else None
+
+    def _load_or_build(self, fingerprint, db=None):
+        """تحميل النسخة المحفوظة لهذه البصمة، أو بناؤها مرة واحدة بين كل العمليات"""
+        state = self.load_saved_index(fingerprint) if self.index_dir else None
+        if state is None:
+            with self._build_lock():
+                # عامل آخر ربما أنهى البناء أثناء انتظار القفل
+                state = self.load_saved_index(fingerprint) if self.index_dir else None
+                if state is None:
+                    if db is None:
+                        db = self.load_database(fingerprint)
+                    return self._publish(self.build_state(db, fingerprint))
+        self.save_index(state)  # النسخة موجودة: نشرها فقط
+        return state
+
+    def _swap(self, state):
+        """استبدال النسخة الحالية ذرّيًا ثم إبطال نتائج النسخة القديمة"""
+        old, self._state = self._state, state
+        shared_result_cache().discard_version(old.version)
+        if self.index_dir and not self.attach:
+            prune_indexes(self.index_dir)
+
+    def refresh(self):
+        """
+        مزامنة الفهرس مع ملف Excel الحالي (متزامن)، أو مع آخر نسخة منشورة في وضع attach.
+        :return: "unchanged" أو "incremental" أو "rebuild" أو "attach"
+        """
+        with self._swap_lock:
+            start = time.perf_counter()
+            old = self._state
+            if self.attach:
+                fingerprint = current_fingerprint(self.index_dir)
+                state = self.load_saved_index(fingerprint) if fingerprint and fingerprint != old.fingerprint else None
+                if state is None:
+                    return "unchanged"
+                rows, mode = len(state.db), "attach"
+            else:
+                fingerprint = file_fingerprint(self.workbook_path)
+                if not fingerprint or fingerprint == old.fingerprint:
+                    return "unchanged"
+                db = self.load_database(fingerprint)
+                incremental = self._incremental_state(old, db, fingerprint)
+                if incremental is not None:
+                    state, rows = incremental
+                    with self._build_lock():
+                        state = self._publish(state)
+                    mode = "incremental"
+                else:
+                    state = self._load_or_build(fingerprint, db)
+                    rows, mode = len(db), "rebuild"
+            self._swap(state)
+            self.last_refresh = {"mode": mode, "rows": int(rows), "seconds": time.perf_counter() - start, "at": time.time()}
+            return mode
+
+    def refresh_async(self):
+        """
+        جدولة refresh() في خيط خلفي؛ الطلبات المتزامنة تُدمج في تحديث واحد لاحق.
+        الاستعلامات تستمر على النسخة الحالية حتى يكتمل الاستبدال.
+        """
+        with self._refresh_lock:
+            self._refresh_pending = True
+            if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                self._refresh_thread = threading.Thread(target=self._refresh_loop, name="index-refresh", daemon=True)
+                self._refresh_thread.start()
+            return self._refresh_thread
+
+    def _refresh_loop(self):
+        while True:
+            with self._refresh_lock:
+                if not self._refresh_pending:
+                    return
+                self._refresh_pending = False
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ تعذر تحديث فهرس قاعدة البيانات: {e}")
+
+    def watch(self, debounce_seconds=1.0):
+        """
+        مراقبة ملف Excel (أو المؤشر CURRENT في وضع attach) عبر watchdog
+        وتحديث الفهرس بعد توقف الكتابة بـ debounce_seconds.
+        """
+        if self._observer is not None:
+            return self._observer
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        if self.attach:
+            target = os.path.abspath(os.path.join(self.index_dir, CURRENT_NAME))
+        else:
+            target = os.path.abspath(self.workbook_path)
+        engine = self
+        timer = [None]
+
+        class _Handler(FileSystemEventHandler):
+            def _schedule(self, path):
+                if os.path.abspath(path) != target:
+                    return
+                # Excel يكتب الملف على عدة دفعات: ننتظر هدوء الأحداث
+                if timer[0] is not None:
+                    timer[0].cancel()
+                timer[0] = threading.Timer(debounce_seconds, engine.refresh_async)
+                timer[0].daemon = True
+                timer[0].start()
 
+            def on_modified(self, event):
+                self._schedule(event.src_path)
+
+            def on_created(self, event):
+                self._schedule(event.src_path)
+
+            def on_moved(self, event):
+                self._schedule(event.dest_path)
+
+        observer = Observer()
+        observer.schedule(_Handler(), os.path.dirname(target), recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return observer
+
+    def stop_watching(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    @cached_result("advanced_search")
     def advanced_search(self, query, top_n=1):
         """
         البحث الذكي في قاعدة البيانات باستخدام TF-IDF وCosine Similarity
@@ -58,21 +376,72 @@ class MiniLegalAI:
         :param top_n: عدد النتائج الأعلى تطابقًا
         :return: (answer, reference, example)
         """
-        if self.db.empty or self.tfidf_matrix is None:
-            return "⚠️ قاعدة البيانات فارغة.", "", ""
-        
-        query_clean = self.preprocess_text(query)
-        query_vec = self.vectorizer.transform([query_clean])
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix).flatten()
-        
-        top_indices = similarities.argsort()[::-1][:top_n]
-        best_score = similarities[top_indices[0]]
-        
-        if best_score == 0:
-            return "⚠️ لم يتم العثور على تطابق مباشر في قاعدة البيانات.", "", ""
-        
-        row = self.db.iloc[top_indices[0]]
-        answer = row['النص']
-        reference = f"المادة {row['المادة']} - القسم: {row['القسم']}"
-        example = row['مثال'] if 'مثال' in row else "لا يوجد مثال متاح."
-        return answer, reference, example
\ No newline at end of file
+        return self.answer_batch([query], top_n=top_n)[0]
+
+    def answer_batch(self, queries, top_n=1):
+        """
+        نفس نتيجة advanced_search لعدة استعلامات بعملية مصفوفات واحدة (تُستخدم في خدمة البحث).
+        :return: قائمة (answer, reference, example) بنفس ترتيب الاستعلامات
+        """
+        state = self._state  # نسخة واحدة طوال الاستعلام حتى لو تم الاستبدال أثناءه
+        queries = list(queries)
+        if state.db.empty or state.tfidf_matrix is None:
+            return [("⚠️ قاعدة البيانات فارغة.", "", "") for _ in queries]
+
+        answers = []
+        for results in self.batch_search(queries, top_k=top_n, state=state):
+            if not results:
+                answers.append(("⚠️ لم يتم العثور على تطابق مباشر في قاعدة البيانات.", "", ""))
+                continue
+            row = state.db.iloc[results[0][0]]
+            answer = row['النص']
+            reference = f"المادة {row['المادة']} - القسم: {row['القسم']}"
+            example = row['مثال'] if 'مثال' in row else "لا يوجد مثال متاح."
+            answers.append((answer, reference, example))
+        return answers
+
+    def batch_search(self, queries, top_k=1, state=None):
+        """
+        بحث دفعي لعدة استعلامات بضرب مصفوفات sparse واحد.
+        صفوف TF-IDF مُطبّعة (L2) لذا حاصل الضرب يساوي Cosine Similarity.
+        :param queries: قائمة الاستعلامات النصية
+        :param top_k: عدد النتائج لكل استعلام
+        :param state: نسخة الفهرس (افتراضيًا الحالية)
+        :return: لكل استعلام قائمة مرتبة من (row, score, article, section)
+        """
+        state = state or self._state
+        db = state.db
+        queries = list(queries)
+        if not queries or db.empty or state.tfidf_matrix is None:
+            return [[] for _ in queries]
+
+        with timed("vectorizer_transform"):
+            query_matrix = state.vectorizer.transform([self.preprocess_text(q) for q in queries])
+        with timed("cosine_similarity"):
+            # الضرب من جهة المصفوفة (CSR × عمود) يتجنب نسخ منقولها كاملًا في كل استدعاء (وتبقى
+            # المصفوفة المحمّلة عبر mmap مشتركة دون نسخ). استعلام واحد: متجه كثيف أسرع
+            if len(queries) == 1:
+                scores = np.asarray(state.tfidf_matrix @ query_matrix.T.toarray()).T
+            else:
+                scores = (state.tfidf_matrix @ query_matrix.T).T.toarray()
+
+        n_rows = scores.shape[1]
+        k = min(max(int(top_k), 1), n_rows)
+        if k < n_rows:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n_rows), (len(queries), n_rows))
+
+        ranked = []
+        for q_scores, q_candidates in zip(scores, candidates):
+            top = q_candidates[np.argsort(-q_scores[q_candidates], kind="stable")]
+            ranked.append([(int(row), float(q_scores[row])) for row in top if q_scores[row] > 0])
+
+        # قراءة المادة/القسم للصفوف الناتجة فقط (الأعمدة قد تكون mmap بصيغة Arrow)
+        rows = sorted({row for hits in ranked for row, _ in hits})
+        articles = dict(zip(rows, db['المادة'].iloc[rows].tolist())) if 'المادة' in db.columns else {}
+        sections = dict(zip(rows, db['القسم'].iloc[rows].tolist())) if 'القسم' in db.columns else {}
+        return [
+            [(row, score, articles.get(row, ""), sections.get(row, "")) for row, score in hits]
+            for hits in ranked
+        ]
@@ -0,0 +1,190 @@
+import contextlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==============================
+# ⏱️ مدرّج زمني بحاويات لوغاريتمية
+# ==============================
+_MIN_SECONDS = 1e-6
+_GROWTH = 1.15  # خطأ تقدير المئين ≤ 15٪
+_LOG_GROWTH = math.log(_GROWTH)
+
+
+class Histogram:
+    """مدرّج زمني خفيف: عدد ثابت من الحاويات بدل تخزين كل القياسات"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, seconds):
+        seconds = max(seconds, _MIN_SECONDS)
+        bucket = int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """تقدير المئين q (0..1) من الحد الأعلى للحاوية"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(_MIN_SECONDS * _GROWTH ** (bucket + 1), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class HistogramStore:
+    """مخزن المدرّجات لكل مرحلة (thread-safe) مع تصدير JSON و Prometheus"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: h.summary() for stage, h in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def export_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=4)
+
+    def export_prometheus(self, metric="alywork_stage_seconds", help_text="Latency per stage in seconds."):
+        lines = [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+        for stage, s in self.snapshot().items():
+            label = re.sub(r'["\\\n]', "_", stage)
+            for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                value = s[key]
+                lines.append(f'{metric}{{stage="{label}",quantile="{q}"}} {value:.9f}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {s["sum"]:.9f}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# ==============================
+# 🌐 المخزن المشترك للعملية
+# ==============================
+_store = HistogramStore()
+# أحجام بالبايت (مثل HTML المرسل للمتصفح في كل إعادة تشغيل)
+_sizes = HistogramStore()
+
+def metrics_store():
+    return _store
+
+
+def sizes_store():
+    return _sizes
+
+
+def observe(stage, seconds):
+    """تسجيل قياس زمني لمرحلة"""
+    _store.observe(stage, seconds)
+
+
+def observe_size(name, nbytes):
+    """تسجيل حجم بالبايت"""
+    _sizes.observe(name, nbytes)
+
+
+def export_prometheus():
+    """كل المقاييس بصيغة Prometheus (الأزمنة + الأحجام)"""
+    return _store.export_prometheus() + _sizes.export_prometheus("alywork_payload_bytes", "Payload size in bytes.")
+
+
+class timed(contextlib.ContextDecorator):
+    """
+    قياس زمن مرحلة، يُستخدم كـ context manager أو decorator:
+        with timed("excel_load"): ...
+        @timed("build_state")
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def _recreate_cm(self):
+        # نسخة جديدة لكل استدعاء حتى لا تتشارك الخيوط وقت البدء
+        return timed(self.stage)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _store.observe(self.stage, time.perf_counter() - self._start)
+        return False
+
+
+# ==============================
+# 📡 خادم تصدير اختياري (Prometheus / JSON)
+# ==============================
+_server = None
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = _store.export_json(), "application/json; charset=utf-8"
+        elif self.path.startswith("/sizes.json"):
+            body, content_type = _sizes.export_json(), "application/json; charset=utf-8"
+        elif self.path.startswith("/metrics"):
+            body, content_type = export_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """تشغيل خادم /metrics و /metrics.json و /sizes.json مرة واحدة لكل عملية"""
+    global _server
+    if _server is None and port:
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # عامل آخر يستخدم نفس المنفذ
+            print(f"⚠️ تعذر تشغيل خادم المقاييس على المنفذ {port}: {e}")
+            _server = False
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server or None
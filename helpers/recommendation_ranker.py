@@ -0,0 +1,131 @@
+import threading
+import numpy as np
+from helpers.search_index import tokenize
+
+# ==============================
+# 🎯 ترتيب التوصيات حسب الاستخدام
+# ==============================
+MIN_TERM_LENGTH = 3  # تجاهل الكلمات القصيرة الشائعة (في، من، لا)
+WEIGHTS = {"prior": 0.1, "popularity": 1.0, "cooccurrence": 0.5, "match": 2.0}
+_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي"})
+_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال")
+
+
+def _stem(token):
+    """توحيد خفيف للكلمة العربية: أشكال الألف والتاء المربوطة وأداة التعريف"""
+    token = token.translate(_LETTERS)
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= MIN_TERM_LENGTH:
+            return token[len(prefix):]
+    return token
+
+
+def _terms(*texts):
+    return {_stem(t) for text in texts for t in tokenize(text) if len(t) >= MIN_TERM_LENGTH}
+
+
+class RecommendationRanker:
+    """
+    ترتيب بطاقات التوصيات من تفاعلات ذاكرة المساعد (الدور، السؤال، context_tags):
+    🔹 شعبية كل بطاقة لكل دور، وتكرار ظهور كل كلمة مع كل بطاقة (co-occurrence)
+    🔹 العدادات متجهات NumPy تُحدَّث تدريجيًا من التفاعلات الجديدة فقط
+    🔹 الترتيب لدور وسؤال حديث = جمع بضعة متجهات جاهزة، دون إعادة مسح السجل
+    التفاعل يُنسب للبطاقات التي تشترك معه في كلمة (من عنوانها ووصفها ونوعها).
+    """
+
+    def __init__(self, cards_by_role, weights=None):
+        self.weights = dict(WEIGHTS, **(weights or {}))
+        self.cards = []
+        self.role_cards = {}
+        for role, cards in cards_by_role.items():
+            start = len(self.cards)
+            self.cards.extend(cards)
+            self.role_cards[role] = np.arange(start, len(self.cards))
+        size = len(self.cards)
+        # ترتيب البطاقات الأصلي داخل كل دور كقيمة أولية صغيرة
+        self.prior = np.zeros(size)
+        for positions in self.role_cards.values():
+            self.prior[positions] = 1.0 / (1.0 + np.arange(len(positions)))
+        self.card_terms = {}
+        for i, card in enumerate(self.cards):
+            for term in _terms(card.get("العنوان", ""), card.get("الوصف", ""), card.get("النوع", "")):
+                self.card_terms.setdefault(term, np.zeros(size))[i] = 1.0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.popularity = {}
+        self.cooccurrence = {}
+        self.observed = 0
+
+    # ==============================
+    # ➕ تحديث العدادات
+    # ==============================
+    def _matched(self, terms):
+        vectors = [self.card_terms[t] for t in terms if t in self.card_terms]
+        if not vectors:
+            return None
+        return np.minimum(np.sum(vectors, axis=0), 1.0)
+
+    def _observe(self, entry):
+        tags = entry.get("context_tags") or []
+        terms = _terms(entry.get("query", ""), *tags)
+        matched = self._matched(terms)
+        if matched is None:
+            return
+        role = entry.get("role")
+        popularity = self.popularity.get(role)
+        if popularity is None:
+            popularity = self.popularity[role] = np.zeros(len(self.cards))
+        popularity += matched
+        for term in terms:
+            vector = self.cooccurrence.get(term)
+            if vector is None:
+                vector = self.cooccurrence[term] = np.zeros(len(self.cards))
+            vector += matched
+
+    def sync(self, memory):
+        """
+        قراءة التفاعلات الجديدة فقط من قائمة الذاكرة (AIMemoryManager.memory).
+        إذا قصرت القائمة (مسح أو إعادة تحميل) يُعاد الحساب من البداية.
+        """
+        with self._lock:
+            if len(memory) < self.observed:
+                self._reset()
+            for entry in memory[self.observed:]:
+                self._observe(entry)
+            self.observed = len(memory)
+
+    # ==============================
+    # 🏆 الترتيب
+    # ==============================
+    def rank(self, role, query="", n=6):
+        """
+        أفضل n بطاقات للدور مع مراعاة آخر سؤال.
+        :return: قائمة البطاقات (dict) مرتبة
+        """
+        positions = self.role_cards.get(role)
+        if positions is None or not len(positions):
+            return []
+        w = self.weights
+        score = w["prior"] * self.prior[positions]
+        popularity = self.popularity.get(role)
+        if popularity is not None:
+            score = score + w["popularity"] * np.log1p(popularity[positions])
+        for term in _terms(query):
+            vector = self.cooccurrence.get(term)
+            if vector is not None:
+                score = score + w["cooccurrence"] * np.log1p(vector[positions])
+            vector = self.card_terms.get(term)
+            if vector is not None:
+                score = score + w["match"] * vector[positions]
+        order = np.argsort(-score, kind="stable")[:n]
+        return [self.cards[i] for i in positions[order]]
+
+    def stats(self):
+        return {
+            "cards": len(self.cards),
+            "observed": self.observed,
+            "terms": len(self.cooccurrence),
+            "roles": {role: float(v.sum()) for role, v in self.popularity.items()},
+        }
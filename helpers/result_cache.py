@@ -0,0 +1,123 @@
+import copy
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+_version_counter = itertools.count(1)
+
+
+def new_index_version(prefix=""):
+    """رقم إصدار فريد لكل تحميل للفهرس (يتغير عند كل إعادة تحميل)"""
+    return f"{prefix}#{next(_version_counter)}"
+
+
+class ResultCache:
+    """
+    ذاكرة نتائج مشتركة بين جميع الجلسات (LRU + TTL).
+    🔹 المفتاح: (نوع العملية، إصدار الفهرس، الاستعلام الموحّد، الفلاتر)
+    🔹 تغيير إصدار الفهرس يُبطل النتائج القديمة تلقائيًا
+    🔹 تعرض نسبة الإصابة والحجم وعدد الإخراجات
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def configure(self, max_size=None, ttl_seconds=None):
+        """تعديل الحجم الأقصى ومدة الصلاحية"""
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl_seconds is not None:
+                self.ttl_seconds = ttl_seconds
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """:return: (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def discard_version(self, version):
+        """حذف كل النتائج المرتبطة بإصدار فهرس قديم"""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] == version]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """إحصائيات الذاكرة المؤقتة لتحديد الحجم المناسب"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ==============================
+# 🌐 الذاكرة المشتركة للعملية
+# ==============================
+_shared_cache = ResultCache()
+
+def shared_result_cache():
+    """الذاكرة المؤقتة المشتركة بين كل الجلسات"""
+    return _shared_cache
+
+
+def cached_result(kind):
+    """
+    مُزخرف لدوال البحث في المحرك.
+    يتطلب أن يعرّف المحرك: index_version و normalize_query(query).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, query, *args, **kwargs):
+            key = (kind, self.index_version, self.normalize_query(query), args, tuple(sorted(kwargs.items())))
+            found, value = _shared_cache.get(key)
+            if not found:
+                value = func(self, query, *args, **kwargs)
+                # لا نخزن نتيجة حُسبت أثناء استبدال الفهرس تحت إصدار لم يعد حاليًا
+                if self.index_version == key[1]:
+                    _shared_cache.put(key, value)
+            return copy.deepcopy(value)
+        return wrapper
+    return decorator
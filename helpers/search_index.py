@@ -0,0 +1,311 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+# ==============================
+# 🔤 تقطيع النصوص
+# ==============================
+_TOKEN_RE = re.compile(r"\w+")
+_CELL_SEP = "\x1f"  # فاصل بين الخلايا حتى لا تتطابق عبارة عبر عمودين
+EXPANSION_CACHE_SIZE = 4096  # أقصى عدد من توسيعات الكلمات الجزئية المحفوظة
+GRAM = 3  # طول k-gram لفهرس البحث داخل الكلمات (infix)
+
+
+def tokenize(text):
+    """تقسيم النص إلى كلمات بحروف صغيرة (casefold)"""
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+class InvertedIndex:
+    """
+    فهرس مقلوب token → أرقام الصفوف (posting lists).
+    🔹 يجيب عن البحث الجزئي (substring) والعبارات بتقاطع القوائم بدل مسح كل الخلايا
+    🔹 يدعم الإضافة والحذف التدريجي للصفوف
+    🔹 توسيع الكلمات الجزئية دون مسح المفردات: بداية الكلمة بـ bisect على المفردات
+      مرتبة، ونهايتها على المفردات معكوسة، ووسطها بفهرس k-gram (الكلمات لكل 3 أحرف)
+    🔹 آمن بين الخيوط (جلسات Streamlit): بناء فهارس المفردات وذاكرة التوسيعات وتعديل الصفوف تحت قفل
+    """
+
+    def __init__(self, cache_size=EXPANSION_CACHE_SIZE):
+        self.postings = defaultdict(set)
+        self.docs = {}
+        self.cache_size = cache_size
+        self._expansions = OrderedDict()
+        self._lock = threading.RLock()
+        # فهارس المفردات تُبنى عند أول بحث جزئي ثم تُحدَّث مع كل كلمة جديدة أو محذوفة
+        self._sorted = None
+        self._reversed = None
+        self._grams = None
+        self._short = None
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """بناء الفهرس من DataFrame (الصف = موقعه iloc)"""
+        index = cls()
+        columns = list(columns) if columns is not None else list(df.columns)
+        for row, values in enumerate(df[columns].astype(str).itertuples(index=False, name=None)):
+            index.add(row, values)
+        return index
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, row, values):
+        """إضافة صف (أو استبداله) مع قيم خلاياه"""
+        text = _CELL_SEP.join(str(v).casefold() for v in values)
+        with self._lock:
+            if row in self.docs:
+                self.remove(row)
+            self.docs[row] = text
+            for token in set(_TOKEN_RE.findall(text)):
+                rows = self.postings[token]
+                if not rows:
+                    self._add_term(token)
+                rows.add(row)
+            self._expansions.clear()
+
+    def remove(self, row):
+        """حذف صف من الفهرس"""
+        with self._lock:
+            text = self.docs.pop(row, None)
+            if text is None:
+                return
+            for token in set(_TOKEN_RE.findall(text)):
+                rows = self.postings.get(token)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self.postings[token]
+                        self._remove_term(token)
+            self._expansions.clear()
+
+    # ==============================
+    # 🔤 فهارس المفردات (للبحث الجزئي)
+    # ==============================
+    @staticmethod
+    def _term_grams(term):
+        return {term[i:i + GRAM] for i in range(len(term) - GRAM + 1)}
+
+    def _build_terms(self):
+        terms = list(self.postings)
+        grams, short = defaultdict(set), set()
+        for term in terms:
+            if len(term) < GRAM:
+                short.add(term)
+            for gram in self._term_grams(term):
+                grams[gram].add(term)
+        self._reversed = sorted(term[::-1] for term in terms)
+        self._grams, self._short = grams, short
+        self._sorted = sorted(terms)  # آخرًا: _sorted غير None يعني أن كل الفهارس جاهزة
+
+    def _add_term(self, term):
+        if self._sorted is None:
+            return
+        bisect.insort(self._sorted, term)
+        bisect.insort(self._reversed, term[::-1])
+        if len(term) < GRAM:
+            self._short.add(term)
+        for gram in self._term_grams(term):
+            self._grams[gram].add(term)
+
+    def _remove_term(self, term):
+        if self._sorted is None:
+            return
+        for array, value in ((self._sorted, term), (self._reversed, term[::-1])):
+            i = bisect.bisect_left(array, value)
+            if i < len(array) and array[i] == value:
+                del array[i]
+        self._short.discard(term)
+        for gram in self._term_grams(term):
+            terms = self._grams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._grams[gram]
+
+    @staticmethod
+    def _with_prefix(array, prefix):
+        start = bisect.bisect_left(array, prefix)
+        end = bisect.bisect_left(array, prefix + "\U0010ffff", start)
+        return array[start:end]
+
+    def _terms_matching(self, token, mode):
+        """المفردات التي تطابق token (prefix / suffix / infix)"""
+        with self._lock:
+            if self._sorted is None:
+                self._build_terms()
+            return self._match_terms(token, mode)
+
+    def _match_terms(self, token, mode):
+        if mode == "prefix":
+            return self._with_prefix(self._sorted, token)
+        if mode == "suffix":
+            return [term[::-1] for term in self._with_prefix(self._reversed, token[::-1])]
+        if len(token) >= GRAM:
+            # تقاطع كلمات كل k-grams في token (الأصغر أولًا) ثم تحقق نهائي
+            sets = sorted((self._grams.get(gram, ()) for gram in self._term_grams(token)), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:])
+            return [term for term in candidates if token in term]
+        # كلمة قصيرة: البحث في مفاتيح k-grams (أقل بكثير من المفردات) والكلمات القصيرة
+        terms = {term for gram, gram_terms in self._grams.items() if token in gram for term in gram_terms}
+        terms.update(term for term in self._short if token in term)
+        return terms
+
+    def _expand(self, token, mode, terms=None):
+        """
+        الصفوف التي تحتوي كلمة تطابق token:
+        exact / prefix / suffix / infix
+        """
+        if mode == "exact":
+            return self.postings.get(token, set())
+        key = (token, mode)
+        with self._lock:
+            rows = self._expansions.get(key)
+            if rows is not None:
+                self._expansions.move_to_end(key)
+                return rows
+            if terms is None:
+                terms = self._terms_matching(token, mode)
+            if len(terms) == 1:
+                # كلمة واحدة: قائمتها نفسها (لا تُعدَّل خارج add/remove اللذين يفرغان الذاكرة)
+                rows = self.postings[next(iter(terms))]
+            else:
+                rows = set().union(*(self.postings[term] for term in terms)) if terms else set()
+            self._expansions[key] = rows
+            while len(self._expansions) > self.cache_size:
+                self._expansions.popitem(last=False)
+            return rows
+
+    def _parts(self, tokens):
+        """
+        أجزاء الاستعلام: (الحجم التقديري، token، النوع، الصفوف أو None، كلمات الجزء).
+        الصفوف معروفة دون تكلفة للكلمة المطابقة تمامًا أو المحفوظة أو ذات الكلمة الواحدة؛
+        غير ذلك لا يُبنى اتحادها هنا وحجمها مجموع أطوال قوائم كلماتها.
+        """
+        if len(tokens) == 1:
+            parts = [(tokens[0], "infix")]
+        else:
+            # أول كلمة قد تكون نهاية كلمة، وآخر كلمة قد تكون بدايتها، والوسط مطابق تمامًا
+            parts = [(t, "exact") for t in tokens[1:-1]]
+            parts += [(tokens[0], "suffix"), (tokens[-1], "prefix")]
+        sized = []
+        with self._lock:
+            for token, mode in parts:
+                terms = None
+                if mode != "exact" and (token, mode) not in self._expansions:
+                    terms = self._terms_matching(token, mode)
+                if terms is None or len(terms) <= 1:
+                    rows = self._expand(token, mode, terms)
+                    sized.append((len(rows), token, mode, rows, terms))
+                else:
+                    sized.append((sum(len(self.postings[t]) for t in terms), token, mode, None, terms))
+        return sized
+
+    def search(self, query, candidates=None, limit=None):
+        """
+        الصفوف التي يحتوي أحد خلاياها على query (دون حساسية لحالة الأحرف).
+        :param candidates: مجموعة صفوف مسموحة (مثل فلتر القسم)
+        :param limit: أقصى عدد من النتائج (أصغر أرقام الصفوف)؛ لا يُتحقق من بقية المرشحين
+        :return: قائمة مرتبة بأرقام الصفوف
+        """
+        needle = str(query).casefold()
+        tokens = _TOKEN_RE.findall(needle)
+        if not tokens:
+            pool = self.docs.keys() if candidates is None else candidates
+            return sorted(row for row in pool if row in self.docs and needle in self.docs[row])[:limit]
+
+        parts = self._parts(tokens)
+        if candidates is not None:
+            parts.append((len(candidates), None, None, candidates, None))
+        # تقاطع الأجزاء الجاهزة أولًا (الأصغر أولًا)، ثم الأجزاء متعددة الكلمات: فحص عضوية الصفوف
+        # الحالية في قوائم كلماتها إذا كان أرخص من بناء اتحادها
+        ready = sorted((part for part in parts if part[3] is not None), key=lambda part: part[0])
+        pending = sorted((part for part in parts if part[3] is None), key=lambda part: part[0])
+        if ready:
+            rows = ready[0][3]
+        else:
+            _, token, mode, _, terms = pending.pop(0)
+            rows = self._expand(token, mode, terms)
+        for _, _, _, other, _ in ready[1:]:
+            if not rows:
+                return []
+            rows = rows & other if len(rows) <= len(other) else other & rows
+        for size, token, mode, _, terms in pending:
+            if not rows:
+                return []
+            if len(rows) * len(terms) < size:
+                term_rows = [self.postings[t] for t in terms]
+                rows = {row for row in rows if any(row in r for r in term_rows)}
+            else:
+                other = self._expand(token, mode, terms)
+                rows = rows & other if len(rows) <= len(other) else other & rows
+
+        # تحقق نهائي على المرشحين فقط
+        if limit is None or len(rows) <= limit:
+            return sorted(row for row in rows if needle in self.docs[row])[:limit]
+        # مرشحون كثيرون: التحقق من أصغر الصفوف على دفعات بدل ترتيبها كلها
+        matched, done, batch = [], 0, limit
+        while True:
+            smallest = heapq.nsmallest(batch, rows)
+            matched.extend(row for row in smallest[done:] if needle in self.docs[row])
+            if len(matched) >= limit or len(smallest) < batch:
+                return matched[:limit]
+            done, batch = batch, batch * 4
+
+
+class NGramIndex:
+    """
+    فهرس n-gram للأحرف للبحث التقريبي (بديل difflib).
+    🔹 يُبنى مرة واحدة عند التحميل
+    🔹 التشابه: معامل Dice بين مجموعتي n-grams للاستعلام والنص
+    🔹 يعيد مواقع الصفوف مباشرة مع درجة التشابه
+    """
+
+    def __init__(self, texts, n=3):
+        self.n = n
+        postings = defaultdict(list)
+        sizes = []
+        for row, text in enumerate(texts):
+            grams = self.ngrams(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(row)
+        self.sizes = np.asarray(sizes, dtype=np.int32)
+        self.postings = {gram: np.asarray(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def ngrams(self, text):
+        """مجموعة n-grams للنص بعد التوحيد وإضافة مسافة في الطرفين"""
+        padded = f" {' '.join(str(text).casefold().split())} "
+        if len(padded) < self.n:
+            return {padded}
+        return {padded[i:i + self.n] for i in range(len(padded) - self.n + 1)}
+
+    def most_similar(self, query, n=3, cutoff=0.0, candidates=None):
+        """
+        أكثر النصوص تشابهًا مع query.
+        :param n: عدد النتائج
+        :param cutoff: الحد الأدنى للتشابه (0..1)
+        :param candidates: مجموعة صفوف مسموحة (اختياري)
+        :return: قائمة (row, score) مرتبة تنازليًا
+        """
+        grams = self.ngrams(query)
+        arrays = [self.postings[g] for g in grams if g in self.postings]
+        if not arrays or n <= 0:
+            return []
+        shared = np.bincount(np.concatenate(arrays), minlength=len(self.sizes))
+        scores = 2.0 * shared / (len(grams) + self.sizes)
+        if candidates is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[list(candidates)] = True
+            scores[~mask] = 0.0
+
+        k = min(n, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0 and scores[row] >= cutoff]
@@ -0,0 +1,334 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from helpers.perf_metrics import Histogram, observe, timed
+
+# ==============================
+# 🔌 خدمة بحث محلية بتجميع الطلبات (micro-batching)
+# ==============================
+# البروتوكول: سطر JSON لكل طلب وسطر JSON لكل رد
+#   {"op": "search", "query": "...", "top_n": 1}  ->  {"answer": "...", "reference": "...", "example": "..."}
+#   {"op": "stats"}                               ->  {"requests": ..., "batch_size": {...}, ...}
+DEFAULT_WINDOW_MS = 5
+DEFAULT_MAX_BATCH = 64
+_MAX_LINE = 1 << 20
+
+
+class SearchService:
+    """
+    خدمة asyncio فوق Unix socket (أو localhost TCP) تغلّف MiniLegalAI:
+    🔹 تجمع الاستعلامات التي تصل خلال نافذة قصيرة (window_ms) أو حتى max_batch
+    🔹 تحسب الدفعة كلها بضرب مصفوفات sparse واحد (answer_batch) ثم توزع النتائج
+    🔹 الاستعلامات المكررة داخل الدفعة تُحسب مرة واحدة
+    🔹 تسجل عمق الطابور وحجم الدفعة وزمن الانتظار
+    """
+
+    def __init__(self, engine, socket_path=None, host="127.0.0.1", port=None,
+                 window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        if not socket_path and not port:
+            raise ValueError("❌ يجب تحديد socket_path أو port لخدمة البحث")
+        self.engine = engine
+        self.socket_path = os.path.abspath(socket_path) if socket_path else None
+        self.host = host
+        self.port = port
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = Histogram()
+        self.queue_depths = Histogram()
+        self._stats_lock = threading.Lock()
+        self._queue = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # ==============================
+    # 📥 استقبال الطلبات
+    # ==============================
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "stats":
+                        response = self.stats()
+                    else:
+                        future = self._loop.create_future()
+                        await self._queue.put((str(request["query"]), int(request.get("top_n", 1)),
+                                               future, time.perf_counter()))
+                        answer, reference, example = await future
+                        response = {"answer": answer, "reference": reference, "example": example}
+                except Exception as e:
+                    with self._stats_lock:
+                        self.errors += 1
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            pass  # انقطاع العميل أو إيقاف الخدمة
+        finally:
+            writer.close()
+
+    # ==============================
+    # 📦 تجميع الدفعات
+    # ==============================
+    async def _collect(self):
+        """انتظار أول طلب ثم جمع ما يصل خلال النافذة (أو حتى max_batch)"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, batch):
+        """حساب الدفعة (في خيط منفصل حتى تستمر الحلقة في استقبال الطلبات)"""
+        groups = {}
+        for query, top_n, _, _ in batch:
+            groups.setdefault(top_n, {}).setdefault(query, None)
+        answers = {}
+        with timed("search_service_batch"):
+            for top_n, queries in groups.items():
+                for query, answer in zip(queries, self.engine.answer_batch(list(queries), top_n=top_n)):
+                    answers[(query, top_n)] = answer
+        return answers
+
+    async def _batcher(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes.observe(len(batch))
+                # عمق الطابور عند الإرسال: الدفعة الحالية + ما ينتظر خلفها
+                self.queue_depths.observe(len(batch) + self._queue.qsize())
+            for _, _, _, enqueued_at in batch:
+                observe("search_service_wait", started - enqueued_at)
+            try:
+                answers = await self._loop.run_in_executor(None, self._score, batch)
+            except Exception as e:
+                print(f"❌ خطأ في دفعة البحث: {e}")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for query, top_n, future, _ in batch:
+                if not future.done():
+                    future.set_result(answers[(query, top_n)])
+
+    # ==============================
+    # ▶️ التشغيل والإيقاف
+    # ==============================
+    async def _start_server(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        if self.socket_path:
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)  # socket قديم من عملية انتهت
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=_MAX_LINE)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=_MAX_LINE)
+        self._loop.create_task(self._batcher())
+        self._ready.set()
+
+    async def serve_forever(self):
+        await self._start_server()
+        async with self._server:
+            with contextlib.suppress(asyncio.CancelledError):  # stop() يغلق الخادم
+                await self._server.serve_forever()
+
+    def start(self, timeout=10.0):
+        """تشغيل الخدمة في خيط خلفي داخل العملية الحالية"""
+        if self._thread is not None:
+            return self
+
+        def run():
+            try:
+                asyncio.run(self.serve_forever())
+            except Exception as e:
+                print(f"❌ توقفت خدمة البحث: {e}")
+            finally:
+                self._ready.set()
+
+        self._thread = threading.Thread(target=run, name="search-service", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self.socket_path:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    def stats(self):
+        """عدد الطلبات والدفعات، وتوزيع حجم الدفعة وعمق الطابور"""
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "queue_depth_now": self._queue.qsize() if self._queue is not None else 0,
+                "batch_size": self.batch_sizes.summary(),
+                "queue_depth": self.queue_depths.summary(),
+            }
+
+
+# ==============================
+# 📡 العميل (يُستخدم داخل Streamlit)
+# ==============================
+class SearchClient:
+    """
+    عميل متزامن لخدمة البحث مع مجموعة اتصالات قابلة لإعادة الاستخدام.
+    عند تعذر الاتصال يرجع إلى المحرك المحلي (fallback) إن وُجد، فلا تتوقف الصفحة.
+    """
+
+    def __init__(self, socket_path=None, host="127.0.0.1", port=None, timeout=2.0, fallback=None, pool_size=16):
+        self.socket_path = os.path.abspath(socket_path) if socket_path else None
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.fallback = fallback
+        self.fallbacks = 0
+        self.last_error = None
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        if self.socket_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.socket_path
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (self.host, self.port)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile("rb")
+
+    def _request(self, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._connect()
+                reused = False
+            sock, reader = conn
+            try:
+                sock.sendall(data)
+                line = reader.readline(_MAX_LINE)
+                if not line:
+                    raise ConnectionError("انقطع الاتصال بخدمة البحث")
+            except OSError:
+                sock.close()
+                if reused and attempt == 0:
+                    continue  # اتصال قديم أغلقه الخادم: نعيد المحاولة باتصال جديد
+                raise
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                sock.close()
+            response = json.loads(line)
+            if "error" in response:
+                raise RuntimeError(response["error"])
+            return response
+
+    def available(self):
+        try:
+            self.stats()
+            return True
+        except (OSError, ValueError, RuntimeError):
+            return False
+
+    def advanced_search(self, query, top_n=1):
+        """نفس واجهة MiniLegalAI.advanced_search"""
+        try:
+            response = self._request({"op": "search", "query": query, "top_n": top_n})
+            return response["answer"], response["reference"], response["example"]
+        except (OSError, ValueError, RuntimeError) as e:
+            self.last_error = str(e)
+            if self.fallback is None:
+                raise
+            self.fallbacks += 1
+            return self.fallback.advanced_search(query, top_n=top_n)
+
+    def stats(self):
+        return self._request({"op": "stats"})
+
+
+# ==============================
+# 🌐 تشغيل خدمة مشتركة واحدة بين العمال
+# ==============================
+_service = None
+_service_lock_file = None
+_service_lock = threading.Lock()
+
+
+def ensure_search_service(engine, socket_path, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+    """
+    تشغيل الخدمة داخل هذه العملية إذا لم تكن هناك خدمة تعمل على نفس socket.
+    القفل يمنع عاملين من تشغيلها معًا؛ العمال الآخرون يتصلون بها كعملاء.
+    :return: SearchService إذا شُغّلت هنا، وإلا None
+    """
+    global _service, _service_lock_file
+    socket_path = os.path.abspath(socket_path)
+    with _service_lock:
+        if _service is not None:
+            return _service
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        lock_file = open(f"{socket_path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None  # عامل آخر يملك الخدمة
+        _service_lock_file = lock_file  # القفل يبقى طوال عمر العملية
+        _service = SearchService(engine, socket_path=socket_path, window_ms=window_ms, max_batch=max_batch).start()
+        return _service
+
+
+if __name__ == "__main__":
+    import argparse
+    from helpers.mini_ai_smart import MiniLegalAI
+
+    parser = argparse.ArgumentParser(description="تشغيل خدمة البحث المحلية بتجميع الطلبات")
+    parser.add_argument("workbook", help="مسار ملف Excel")
+    parser.add_argument("--socket", default="cache/search_service.sock", help="مسار Unix socket")
+    parser.add_argument("--port", type=int, default=None, help="منفذ TCP على localhost بدل Unix socket")
+    parser.add_argument("--index-dir", default="cache/ai_index")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    args = parser.parse_args()
+
+    ai = MiniLegalAI(args.workbook, index_dir=args.index_dir, watch=True)
+    service = SearchService(ai, socket_path=None if args.port else args.socket, port=args.port,
+                            window_ms=args.window_ms, max_batch=args.max_batch)
+    print(f"✅ خدمة البحث تعمل على {args.port or os.path.abspath(args.socket)}")
+    asyncio.run(service.serve_forever())
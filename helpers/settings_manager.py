@@ -1,29 +1,211 @@
+import atexit
+import hashlib
+import hmac
 import json
 import os
+import re
+import threading
+from collections import OrderedDict
 import streamlit as st
 from datetime import datetime
+from helpers.fingerprint import file_stat
 
-class SettingsManager:
-    def __init__(self, path="helpers/settings.json"):
+# أقصى عدد من مساحات الجلسات (غير المحفوظة على القرص) في الذاكرة
+MAX_MEMORY_NAMESPACES = 10_000
+# أقصى عدد من ملفات إعدادات المستخدمين المفتوحة في الذاكرة (الأقدم استخدامًا يُحفظ ثم يُغلق)
+MAX_USER_NAMESPACES = 1_000
+# اسم المستخدم المقبول في الرابط (?user=...)
+_USER_RE = re.compile(r"[\w.@-]{1,64}")
+# حقول لا تُعتبر تغييرًا في الإعدادات
+_VOLATILE_KEYS = ("LAST_UPDATED",)
+_MISSING = object()
+
+
+class _SettingsStore:
+    """
+    نسخة واحدة مشتركة لكل ملف إعدادات داخل العملية:
+    🔹 تتبع التغييرات (dirty) فلا يُكتب الملف إذا لم تتغير أي قيمة
+    🔹 كتابة مؤجلة (debounce) تجمع عدة تعديلات في كتابة ذرّية واحدة
+    🔹 إعادة القراءة فقط عندما يتغير الملف على القرص (من عامل آخر)
+    """
+
+    def __init__(self, path, defaults, persist=True, debounce_seconds=1.0):
         self.path = path
-        self.settings = self.load_settings()
+        self.persist = persist and path is not None
+        self.debounce_seconds = debounce_seconds
+        self.settings = dict(defaults)
+        self.dirty = False
+        self.last_error = None
+        self._defaults = dict(defaults)
+        self._stat = None
+        self._timer = None
+        self._lock = threading.RLock()
+        if self.persist:
+            atexit.register(self.flush)
 
-    # ==============================
-    # تحميل الإعدادات من ملف JSON أو إعدادات افتراضية
-    # ==============================
-    def load_settings(self):
-        if os.path.exists(self.path):
+    def load(self):
+        """
+        قراءة الملف إذا تغيّر منذ آخر قراءة.
+        :return: None، أو رسالة خطأ إذا كان الملف تالفًا
+        """
+        if not self.persist:
+            return None
+        with self._lock:
+            stat = file_stat(self.path)
+            if self.dirty or stat is None or stat == self._stat:
+                return None
             try:
                 with open(self.path, "r", encoding="utf-8") as f:
-                    settings = json.load(f)
-                st.info(f"✅ تم تحميل الإعدادات بنجاح ({len(settings)} إعداد).")
-                return settings
-            except json.JSONDecodeError as e:
-                st.warning(f"⚠️ خطأ في ملف الإعدادات: {e}. سيتم استخدام الإعدادات الافتراضية.")
-                return self.default_settings()
+                    self.settings = json.load(f)
+                return None
+            except (json.JSONDecodeError, OSError) as e:
+                self.settings = dict(self._defaults)
+                return str(e)
+            finally:
+                self._stat = stat
+
+    def set_many(self, values):
+        """تعديل عدة قيم؛ يُرجع True فقط إذا تغيّر شيء فعلًا"""
+        with self._lock:
+            changed = {k: v for k, v in values.items() if self.settings.get(k, _MISSING) != v}
+            if all(k in _VOLATILE_KEYS for k in changed):
+                return False
+            self.settings.update(changed)
+            self._mark_dirty()
+            return True
+
+    def replace(self, settings):
+        with self._lock:
+            self.settings = dict(settings)
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        if not self.persist:
+            return
+        self.dirty = True
+        if self._timer is None:
+            # الكتابة بعد فترة قصيرة: التعديلات المتتالية تُجمع في كتابة واحدة
+            self._timer = threading.Timer(self.debounce_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """كتابة الإعدادات ذرّيًا (ملف مؤقت + rename) إذا كانت هناك تغييرات"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return True
+            self.settings["LAST_UPDATED"] = datetime.now().isoformat()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.settings, f, ensure_ascii=False, indent=4)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                # قد تُستدعى من خيط المؤقت، لذا لا نستخدم عناصر Streamlit هنا
+                self.last_error = str(e)
+                print(f"❌ حدث خطأ أثناء حفظ الإعدادات: {e}")
+                return False
+            self.dirty = False
+            self.last_error = None
+            self._stat = file_stat(self.path)
+            return True
+
+
+_stores = OrderedDict()
+_session_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def _shared_store(path, defaults, persist, debounce_seconds):
+    """الحصول على النسخة المشتركة لملف/مساحة إعدادات (تُنشأ مرة واحدة لكل عملية)"""
+    with _stores_lock:
+        if persist:
+            store = _stores.get(path)
+            if store is not None:
+                _stores.move_to_end(path)
+                return store, False
+            store = _stores[path] = _SettingsStore(path, defaults, True, debounce_seconds)
+            while len(_stores) > MAX_USER_NAMESPACES:
+                _, evicted = _stores.popitem(last=False)
+                evicted.flush()
+                atexit.unregister(evicted.flush)
+            return store, True
+        store = _session_stores.get(path)
+        if store is not None:
+            _session_stores.move_to_end(path)
+            return store, False
+        store = _session_stores[path] = _SettingsStore(None, defaults, False, debounce_seconds)
+        while len(_session_stores) > MAX_MEMORY_NAMESPACES:
+            _session_stores.popitem(last=False)
+        return store, True
+
+
+def clean_user(value):
+    """اسم المستخدم من الرابط بعد التحقق من صيغته، أو None"""
+    value = str(value or "").strip()
+    return value if _USER_RE.fullmatch(value) else None
+
+
+def user_token(user, secret):
+    """رمز المستخدم (HMAC-SHA256) الذي يُمرَّر مع ?user=... في ?token=..."""
+    return hmac.new(secret.encode("utf-8"), user.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify_user(user, token, secret):
+    """هل token رمز صحيح لهذا المستخدم؟ (دون secret لا يُوثَّق أي مستخدم)"""
+    if not (user and token and secret):
+        return False
+    return hmac.compare_digest(user_token(user, secret), str(token))
+
+
+def namespace_path(path, namespace):
+    """مسار ملف مستقل لكل مستخدم: helpers/settings/<namespace>-<hash>.json"""
+    safe = re.sub(r"[^\w-]", "_", str(namespace))[:48]
+    digest = hashlib.sha1(str(namespace).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(os.path.dirname(path), "settings", f"{safe}-{digest}.json")
+
+
+class SettingsManager:
+    """
+    إدارة الإعدادات العامة، مع مساحة اختيارية لكل مستخدم أو جلسة:
+    🔹 namespace=None: ملف الإعدادات العام
+    🔹 namespace مع persist=True: ملف مستقل لكل مستخدم (لا تنافس على ملف واحد)
+    🔹 namespace مع persist=False: إعدادات الجلسة في الذاكرة فقط
+    قيم المساحة تتقدم على الإعدادات العامة عند القراءة.
+    """
+
+    def __init__(self, path="helpers/settings.json", namespace=None, persist=True, debounce_seconds=1.0):
+        self.namespace = namespace
+        self.parent = None
+        if namespace is None:
+            self.path = path
+            defaults = self.default_settings()
         else:
+            self.path = namespace_path(path, namespace)
+            self.parent = SettingsManager(path, debounce_seconds=debounce_seconds)
+            defaults = {}
+        self._store, created = _shared_store(self.path if persist else str(namespace), defaults,
+                                             persist, debounce_seconds)
+        self.load_settings(announce=created and namespace is None)
+
+    @property
+    def settings(self):
+        return self._store.settings
+
+    # ==============================
+    # تحميل الإعدادات من ملف JSON أو إعدادات افتراضية
+    # ==============================
+    def load_settings(self, announce=False):
+        error = self._store.load()
+        if error:
+            st.warning(f"⚠️ خطأ في ملف الإعدادات: {error}. سيتم استخدام الإعدادات الافتراضية.")
+        elif announce and self._store.persist and not os.path.exists(self.path):
             st.warning("⚠️ لم يتم العثور على ملف settings.json، سيتم إنشاء إعدادات افتراضية.")
-            return self.default_settings()
+        return self._store.settings
 
     # ==============================
     # إعدادات افتراضية
@@ -39,45 +221,59 @@ class SettingsManager:
         }
 
     # ==============================
-    # حفظ الإعدادات مع تسجيل الوقت
+    # حفظ الإعدادات فورًا (بدل انتظار الكتابة المؤجلة)
     # ==============================
     def save_settings(self):
-        self.settings["LAST_UPDATED"] = datetime.now().isoformat()
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=4)
-            st.success("✅ تم حفظ الإعدادات بنجاح.")
-        except Exception as e:
-            st.error(f"❌ حدث خطأ أثناء حفظ الإعدادات: {e}")
+        if not self._store.flush():
+            st.error(f"❌ حدث خطأ أثناء حفظ الإعدادات: {self._store.last_error}")
+            return False
+        return True
 
     # ==============================
-    # الحصول على قيمة إعداد
+    # الحصول على قيمة إعداد (المساحة أولًا ثم الإعدادات العامة)
     # ==============================
     def get(self, key, default=None):
-        return self.settings.get(key, default)
+        value = self._store.settings.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.parent is not None:
+            return self.parent.get(key, default)
+        return default
 
     # ==============================
-    # تعيين قيمة إعداد جديدة وحفظها تلقائيًا
+    # تعيين قيمة إعداد (تُكتب لاحقًا فقط إذا تغيرت)
     # ==============================
     def set(self, key, value):
-        self.settings[key] = value
-        self.save_settings()
+        return self._store.set_many({key: value})
 
     # ==============================
     # تحديث إعدادات متعددة دفعة واحدة
     # ==============================
     def update(self, new_settings: dict):
         if isinstance(new_settings, dict):
-            self.settings.update(new_settings)
-            self.save_settings()
-        else:
-            st.error("⚠️ يجب أن يكون التحديث على شكل dict.")
+            return self._store.set_many(new_settings)
+        st.error("⚠️ يجب أن يكون التحديث على شكل dict.")
+        return False
 
     # ==============================
     # إعادة الإعدادات إلى الافتراضية
     # ==============================
     def reset_to_default(self):
-        self.settings = self.default_settings()
+        self._store.replace(self.default_settings() if self.parent is None else {})
         self.save_settings()
-        st.info("♻️ تم إعادة الإعدادات إلى الوضع الافتراضي.")
\ No newline at end of file
+        st.info("♻️ تم إعادة الإعدادات إلى الوضع الافتراضي.")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="إنشاء رابط إعدادات موثَّق لمستخدم (?user=...&token=...)")
+    parser.add_argument("user")
+    parser.add_argument("--secret", default=os.getenv("USER_TOKEN_SECRET", ""),
+                        help="المفتاح السري (افتراضيًا من USER_TOKEN_SECRET)")
+    args = parser.parse_args()
+
+    user = clean_user(args.user)
+    if user is None or not args.secret:
+        raise SystemExit("❌ اسم مستخدم غير صالح أو لم يُحدَّد USER_TOKEN_SECRET")
+    print(f"?user={user}&token={user_token(user, args.secret)}")
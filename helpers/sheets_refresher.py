@@ -0,0 +1,194 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+import requests
+
+DEFAULT_SNAPSHOT_DIR = "cache/sheets"
+# بعد فشل التحميل لا يُعاد المحاولة قبل ttl_seconds / RETRY_DIVISOR (بدل طلب حاجب مع كل إعادة تشغيل)
+RETRY_DIVISOR = 10
+
+
+class SheetsRefresher:
+    """
+    تحميل Google Sheets (CSV) مع تحديث في الخلفية.
+    🔹 طلبات شرطية (ETag / If-Modified-Since) فلا يُعاد تنزيل ملف لم يتغير
+    🔹 تقديم البيانات الحالية فورًا أثناء إعادة التحقق في خيط خلفي
+    🔹 حفظ آخر نسخة سليمة محليًا للتشغيل البارد وأثناء الانقطاع
+    🔹 قياس زمن التنزيل وعمر البيانات
+    🔹 بعد فشل التحميل تُعاد المحاولة بعد فترة انتظار فقط (تخزين سلبي للخطأ)
+    """
+
+    def __init__(self, url, snapshot_path=None, ttl_seconds=600, timeout=15):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        if snapshot_path is None:
+            name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+            snapshot_path = os.path.join(DEFAULT_SNAPSHOT_DIR, f"{name}.csv")
+        self.snapshot_path = snapshot_path
+
+        self.data = None
+        self.version = ""
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = None
+        self.last_fetch_latency = None
+        self.last_error = None
+        self.last_attempt = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()  # تنزيل واحد على الأكثر في نفس الوقت
+        self._thread = None
+        self._load_snapshot()
+
+    # ==============================
+    # 💾 النسخة المحلية
+    # ==============================
+    @property
+    def _meta_path(self):
+        return f"{self.snapshot_path}.meta.json"
+
+    def _load_snapshot(self):
+        """تحميل آخر نسخة سليمة من القرص (إن وجدت)"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                content = f.read()
+            meta = {}
+            if os.path.exists(self._meta_path):
+                with open(self._meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            self.data = pd.read_csv(io.BytesIO(content))
+            self.version = hashlib.sha256(content).hexdigest()[:16]
+            self.etag = meta.get("etag")
+            self.last_modified = meta.get("last_modified")
+            self.fetched_at = meta.get("fetched_at")
+        except Exception as e:
+            print(f"⚠️ تعذر قراءة النسخة المحلية للبيانات: {e}")
+
+    def _write_atomic(self, path, payload):
+        # ملف مؤقت باسم فريد في نفس المجلد حتى لا تتداخل كتابات العمال/الخيوط المتزامنة
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=".tmp-", delete=False) as f:
+            f.write(payload)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def _save_snapshot(self, content):
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        self._write_atomic(self.snapshot_path, content)
+        meta = {"url": self.url, "etag": self.etag, "last_modified": self.last_modified, "fetched_at": self.fetched_at}
+        self._write_atomic(self._meta_path, json.dumps(meta, ensure_ascii=False, indent=4).encode("utf-8"))
+
+    # ==============================
+    # 🌐 التحديث
+    # ==============================
+    def refresh(self):
+        """
+        طلب شرطي للمصدر وتحديث البيانات عند تغيّرها.
+        عند الخطأ تبقى النسخة الحالية كما هي ويُسجل الخطأ في last_error.
+        :return: True إذا تغيرت البيانات
+        """
+        seen = self.last_attempt
+        with self._fetch_lock:
+            if self.last_attempt != seen:
+                # طلب آخر أكمل المحاولة (نجاحًا أو فشلًا) أثناء الانتظار، مثل عدة جلسات في تشغيل بارد
+                return False
+            try:
+                return self._fetch()
+            finally:
+                self.last_attempt = time.time()
+
+    def _fetch(self):
+        headers = {}
+        if self.data is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        start = time.perf_counter()
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+            self.last_fetch_latency = time.perf_counter() - start
+            if response.status_code == 304:
+                with self._lock:
+                    self.fetched_at = time.time()
+                    self.last_error = None
+                return False
+            response.raise_for_status()
+            content = response.content
+            df = pd.read_csv(io.BytesIO(content))
+            with self._lock:
+                self.data = df
+                self.version = hashlib.sha256(content).hexdigest()[:16]
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                self.fetched_at = time.time()
+                self.last_error = None
+            try:
+                self._save_snapshot(content)
+            except OSError as e:
+                print(f"⚠️ تعذر حفظ النسخة المحلية للبيانات: {e}")
+            return True
+        except Exception as e:
+            self.last_fetch_latency = time.perf_counter() - start
+            self.last_error = str(e)
+            print(f"⚠️ حدث خطأ أثناء تحديث البيانات: {e}")
+            return False
+
+    def refresh_async(self):
+        """بدء إعادة التحقق في خيط خلفي (خيط واحد على الأكثر)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._thread
+            self._thread = threading.Thread(target=self.refresh, name="sheets-refresher", daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def is_stale(self):
+        age = self.data_age()
+        return age is None or age > self.ttl_seconds
+
+    def backing_off(self):
+        """هل فشلت آخر محاولة منذ أقل من ttl_seconds / RETRY_DIVISOR؟"""
+        if self.last_error is None or self.last_attempt is None:
+            return False
+        return time.time() - self.last_attempt < self.ttl_seconds / RETRY_DIVISOR
+
+    def get(self):
+        """
+        إرجاع البيانات فورًا؛ التحميل يكون متزامنًا فقط عند عدم وجود أي نسخة.
+        بعد فشل حديث لا يُعاد الطلب (يُرجع ما هو متوفر، وقد يكون فارغًا) حتى انتهاء فترة الانتظار.
+        :return: pd.DataFrame (فارغ إذا لم تتوفر أي بيانات)
+        """
+        if not self.backing_off():
+            if self.data is None:
+                self.refresh()
+            elif self.is_stale():
+                self.refresh_async()
+        return self.data if self.data is not None else pd.DataFrame()
+
+    def data_age(self):
+        """عمر البيانات بالثواني منذ آخر تحقق ناجح"""
+        if self.fetched_at is None:
+            return None
+        return max(0.0, time.time() - self.fetched_at)
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "version": self.version,
+            "rows": 0 if self.data is None else len(self.data),
+            "data_age": self.data_age(),
+            "last_fetch_latency": self.last_fetch_latency,
+            "last_error": self.last_error,
+            "backing_off": self.backing_off(),
+            "refreshing": self._thread is not None and self._thread.is_alive(),
+        }
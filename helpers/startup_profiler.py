@@ -0,0 +1,146 @@
+import contextlib
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+from helpers.perf_metrics import observe
+
+# الوحدات الثقيلة التي تُستورد عند أول استخدام فقط (بالترتيب الذي تحتاجه الصفحات)
+HEAVY_MODULES = (
+    "streamlit_option_menu",
+    "helpers.sheets_refresher",
+    "st_aggrid",
+    "plotly.express",
+    "helpers.mini_ai_smart",
+    "logs.ai_memory_manager",
+)
+# وحدات يستوردها التطبيق دائمًا، فتُستبعد من تكلفة الوحدات الأخرى في التقرير
+BASELINE_MODULES = ("streamlit", "pandas", "helpers.perf_metrics")
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+class StartupProfiler:
+    """
+    زمن الاستيراد والتهيئة لكل وحدة/نظام فرعي عند أول استخدام في العملية:
+    🔹 lazy_import: استيراد الوحدة عند الحاجة وتسجيل زمنه (مرة واحدة)
+    🔹 init_stage: زمن أول تهيئة لنظام فرعي (المحرك، البيانات، الذاكرة...)
+    🔹 at: متى حدث ذلك بالثواني منذ بدء العملية (تقريبًا: منذ استيراد هذه الوحدة)
+    القياسات تُضاف أيضًا إلى perf_metrics باسم import:<الوحدة> و init:<المرحلة>.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def seen(self, name):
+        return name in self.entries
+
+    def record(self, name, kind, seconds, error=None):
+        with self._lock:
+            if name in self.entries:
+                return
+            self.entries[name] = {
+                "kind": kind,
+                "seconds": seconds,
+                "at": time.perf_counter() - self.started,
+                "thread": threading.current_thread().name,
+                "error": error,
+            }
+        if error is None:
+            observe(f"{kind}:{name}", seconds)
+
+    def report(self):
+        """:return: قائمة (الأبطأ أولًا) من {name, kind, seconds, at, thread, error}"""
+        with self._lock:
+            rows = [dict(name=name, **entry) for name, entry in self.entries.items()]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+
+
+_profiler = StartupProfiler()
+
+def startup_profiler():
+    return _profiler
+
+# ==============================
+# 💤 استيراد وتهيئة مؤجلان
+# ==============================
+def lazy_import(module_name, attr=None):
+    """
+    استيراد وحدة عند أول استخدام (importlib) وتسجيل زمنه إن لم تكن مستوردة من قبل.
+    :param attr: اسم عنصر داخل الوحدة لإرجاعه بدل الوحدة
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            _profiler.record(module_name, "import", time.perf_counter() - start, error=str(e))
+            raise
+        _profiler.record(module_name, "import", time.perf_counter() - start)
+    return getattr(module, attr) if attr else module
+
+@contextlib.contextmanager
+def init_stage(name):
+    """قياس أول تهيئة لنظام فرعي فقط؛ الاستدعاءات اللاحقة (من الذاكرة) لا تُقاس"""
+    if _profiler.seen(name):
+        yield
+        return
+    start = time.perf_counter()
+    yield
+    _profiler.record(name, "init", time.perf_counter() - start)
+
+# ==============================
+# 🧪 زمن الاستيراد البارد (عملية جديدة لكل وحدة)
+# ==============================
+def import_cost(module_name, baseline=BASELINE_MODULES, python=None):
+    """
+    زمن استيراد وحدة في عملية جديدة (python -X importtime) بعد استيراد baseline.
+    :return: {"module", "ms", "modules": عدد الوحدات الجديدة, "heaviest": [(الوحدة، ms)], "error"}
+    """
+    setup = "".join(f"import {name}; " for name in baseline)
+    proc = subprocess.run([python or sys.executable, "-X", "importtime", "-c", f"{setup}import {module_name}"],
+                          capture_output=True, text=True)
+    result = {"module": module_name, "ms": None, "modules": 0, "heaviest": [], "error": None}
+    if proc.returncode != 0:
+        result["error"] = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        return result
+    # importtime يطبع التبعيات قبل الوحدة نفسها: الأسطر بعد آخر وحدة من baseline تخص الوحدة المطلوبة
+    lines = [m for m in map(_IMPORT_TIME.match, proc.stderr.splitlines()) if m]
+    start = 0
+    for i, m in enumerate(lines):
+        if len(m.group(3)) == 1 and m.group(4) in baseline:
+            start = i + 1
+    lines = lines[start:]
+    own = [int(m.group(2)) for m in lines if len(m.group(3)) == 1 and m.group(4) == module_name]
+    result["ms"] = own[-1] / 1000 if own else 0.0
+    result["modules"] = len(lines)
+    direct = [(m.group(4), int(m.group(2)) / 1000) for m in lines if len(m.group(3)) == 3]
+    result["heaviest"] = sorted(direct, key=lambda item: item[1], reverse=True)[:3]
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="زمن الاستيراد البارد للوحدات الثقيلة في التطبيق")
+    parser.add_argument("modules", nargs="*", default=list(HEAVY_MODULES))
+    args = parser.parse_args()
+
+    total = 0.0
+    for name in args.modules:
+        cost = import_cost(name)
+        if cost["error"]:
+            print(f"{name:<28} ❌ {cost['error']}")
+            continue
+        total += cost["ms"]
+        heaviest = ", ".join(f"{dep} {ms:.0f}ms" for dep, ms in cost["heaviest"])
+        print(f"{name:<28} {cost['ms']:>8.1f} ms  ({cost['modules']} وحدة)  {heaviest}")
+    print(f"{'المجموع (تقريبي، مع تكرار التبعيات المشتركة)':<28} {total:>8.1f} ms")
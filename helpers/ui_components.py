@@ -1,30 +1,100 @@
+import functools
+import hashlib
+import html
+import json
+import os
 import streamlit as st
+import streamlit.components.v1 as components
+from helpers.perf_metrics import observe_size
+
+COMPONENTS_CSS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "components.css")
+
+# ==============================
+# 🧩 قوالب HTML مُجهّزة مسبقًا (الأنماط في assets/*.css وليست inline)
+# ==============================
+_BUBBLE = '<div class="message-bubble message-{kind}">{body}</div>'.format
+_SUBTITLE = '<p class="section-subtitle">{}</p>'.format
+_INFO_CARD = '<div class="info-card"{style}><b>{icon}{title}</b><p>{content}</p></div>'.format
+_MINI_CARD = '<div class="mini-card"{style}><b>{icon} {title}</b><br><span>{content}</span><br>{link}</div>'.format
+_MINI_LINK = '<a href="{}" target="_blank">عرض التفاصيل</a>'.format
+_SMART_CARD = (
+    '<div class="smart-card type-{kind}">'
+    '<img src="{img}" alt="icon" width="50px"/>'
+    '<h4>{icon} {title}</h4>'
+    '<p>{description}</p>'
+    '<a href="{link}" target="_blank">اضغط هنا للتفاصيل</a>'
+    '</div>'
+).format
+
+# ==============================
+# 📏 حجم HTML المرسل في كل إعادة تشغيل
+# ==============================
+def emit_html(markup, component="html", target=st):
+    """عرض HTML وتسجيل حجمه (بايت) لكل نوع عنصر ولإجمالي إعادة التشغيل"""
+    nbytes = len(markup.encode("utf-8"))
+    observe_size(f"html:{component}", nbytes)
+    st.session_state["_html_bytes"] = st.session_state.get("_html_bytes", 0) + nbytes
+    target.markdown(markup, unsafe_allow_html=True)
+
+def start_payload_meter():
+    """بداية إعادة تشغيل جديدة: تصفير عداد البايتات"""
+    st.session_state["_html_bytes"] = 0
+
+def finish_payload_meter():
+    """تسجيل إجمالي HTML المرسل في إعادة التشغيل الحالية"""
+    observe_size("html_per_rerun", st.session_state.get("_html_bytes", 0))
+
+# ==============================
+# 🎨 ملف الأنماط: يُقرأ مرة واحدة ويُحقن مرة واحدة لكل جلسة
+# ==============================
+@functools.lru_cache(maxsize=8)
+def _compile_stylesheet(files):
+    """:param files: ((المسار، وقت التعديل), ...) حتى يُعاد البناء عند تعديل الملف فقط"""
+    parts = []
+    for path, _ in files:
+        with open(path, "r", encoding="utf-8") as f:
+            parts.append(f.read())
+    css = "\n".join(parts)
+    key = hashlib.sha1(css.encode("utf-8")).hexdigest()[:12]
+    # iframe المكوّن يُزال في إعادة التشغيل التالية، أما عنصر <style> في الصفحة الأم فيبقى
+    script = (
+        "<script>const d = window.parent.document;"
+        "let s = d.getElementById('alywork-styles');"
+        "if (!s) { s = d.createElement('style'); s.id = 'alywork-styles'; d.head.appendChild(s); }"
+        f"s.textContent = {json.dumps(css, ensure_ascii=False)};</script>"
+    )
+    return key, css, script
+
+def stylesheet(*paths):
+    files = tuple((path, os.path.getmtime(path)) for path in paths if os.path.exists(path))
+    return _compile_stylesheet(files)
+
+def inject_styles(theme_css, mode="session"):
+    """
+    حقن أنماط النمط والمكوّنات.
+    🔹 mode="session": مرة واحدة لكل جلسة (أو عند تغيير النمط) عبر مكوّن بارتفاع 0
+    🔹 mode="rerun": وسم <style> في كل إعادة تشغيل (من نسخة مقروءة مسبقًا)
+    """
+    key, css, script = stylesheet(theme_css, COMPONENTS_CSS)
+    if mode != "session":
+        emit_html(f"<style>{css}</style>", "styles")
+        return
+    if st.session_state.get("_styles_key") == key:
+        return
+    observe_size("html:styles", len(script.encode("utf-8")))
+    components.html(script, height=0)
+    st.session_state["_styles_key"] = key
 
 # ==============================
 # 💬 فقاعات الرسائل
 # ==============================
+def message_bubble_html(sender, text, is_user=False):
+    """HTML فقاعة رسالة واحدة (لتجميع عدة رسائل في استدعاء markdown واحد)"""
+    body = html.escape(str(text)).replace("\n", "<br>")
+    return _BUBBLE(kind="user" if is_user else "ai", body=body)
+
 def message_bubble(sender, text, is_user=False):
-    bg = "#007BFF" if is_user else "#F1F1F1"
-    color = "white" if is_user else "black"
-    align = "right" if is_user else "left"
-    border_radius = "15px 5px 15px 15px" if is_user else "5px 15px 15px 15px"
-    st.markdown(
-        f"""
-        <div style="
-            background:{bg};
-            color:{color};
-            padding:12px 16px;
-            border-radius:{border_radius};
-            text-align:{align};
-            margin:6px 0;
-            max-width:80%;
-            word-wrap: break-word;
-            box-shadow: 2px 2px 8px rgba(0,0,0,0.1);
-            transition: all 0.2s;
-        ">{text}</div>
-        """,
-        unsafe_allow_html=True,
-    )
+    emit_html(message_bubble_html(sender, text, is_user), "message_bubble")
 
 # ==============================
 # 🏷️ عنوان القسم
@@ -32,51 +102,34 @@ def message_bubble(sender, text, is_user=False):
 def section_header(title, icon="⚖️", subtitle=None):
     st.markdown(f"## {icon} {title}")
     if subtitle:
-        st.markdown(f"<p style='color:gray;'>{subtitle}</p>", unsafe_allow_html=True)
+        emit_html(_SUBTITLE(subtitle), "section_header")
 
 # ==============================
 # 📌 بطاقة معلوماتية
 # ==============================
-def info_card(title, content, color="#F9FAFB", icon=None):
-    icon_html = f"<span style='font-size:20px; margin-right:5px;'>{icon}</span>" if icon else ""
-    st.markdown(
-        f"""
-        <div style="
-            background:{color};
-            padding:12px;
-            border-radius:12px;
-            margin:6px 0;
-            box-shadow:0 3px 6px rgba(0,0,0,0.1);
-            transition: transform 0.2s, box-shadow 0.2s;
-        " onmouseover="this.style.transform='scale(1.02)'; this.style.boxShadow='0 6px 12px rgba(0,0,0,0.15)';" 
-          onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='0 3px 6px rgba(0,0,0,0.1)';">
-            <b>{icon_html}{title}</b><br>
-            <p style='margin:5px 0; font-size:14px;'>{content}</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+@functools.lru_cache(maxsize=256)
+def info_card_html(title, content, color=None, icon=None):
+    icon_html = f'<span class="card-icon">{icon}</span>' if icon else ""
+    style = f' style="background:{color}"' if color else ""
+    return _INFO_CARD(style=style, icon=icon_html, title=title, content=content)
+
+def info_card(title, content, color=None, icon=None):
+    emit_html(info_card_html(title, content, color, icon), "info_card")
 
 # ==============================
 # ⚡ بطاقة تفاعلية صغيرة (لـ توصيات / تنبيهات)
 # ==============================
-def mini_card(title, content, icon="ℹ️", color="#E0F7FA", link=None):
-    link_html = f"<a href='{link}' target='_blank' style='color:#007BFF; text-decoration:underline;'>عرض التفاصيل</a>" if link else ""
-    st.markdown(
-        f"""
-        <div style="
-            background:{color};
-            padding:10px;
-            border-radius:10px;
-            margin:5px 0;
-            box-shadow:0 2px 5px rgba(0,0,0,0.1);
-            transition: transform 0.2s;
-        " onmouseover="this.style.transform='scale(1.03)'; this.style.boxShadow='0 4px 10px rgba(0,0,0,0.15)';"
-          onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='0 2px 5px rgba(0,0,0,0.1)';">
-            <b>{icon} {title}</b><br>
-            <span style='font-size:13px;'>{content}</span><br>
-            {link_html}
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
\ No newline at end of file
+@functools.lru_cache(maxsize=256)
+def mini_card_html(title, content, icon="ℹ️", color=None, link=None):
+    style = f' style="background:{color}"' if color else ""
+    return _MINI_CARD(style=style, icon=icon, title=title, content=content, link=_MINI_LINK(link) if link else "")
+
+def mini_card(title, content, icon="ℹ️", color=None, link=None):
+    emit_html(mini_card_html(title, content, icon, color, link), "mini_card")
+
+# ==============================
+# 💡 بطاقة توصية
+# ==============================
+def smart_card_html(rec, kind="default"):
+    return _SMART_CARD(kind=kind, img=rec['img'], icon=rec['icon'], title=rec['العنوان'],
+                       description=rec['الوصف'], link=rec['link'])
@@ -0,0 +1,83 @@
+import threading
+import time
+from helpers.startup_profiler import HEAVY_MODULES, init_stage, lazy_import, startup_profiler
+
+# ==============================
+# 🔥 تسخين الذاكرات قبل وصول الطلبات
+# ==============================
+def warm_imports(modules=HEAVY_MODULES):
+    """استيراد الوحدات الثقيلة مسبقًا (الوحدات غير المثبتة تُتجاهل)"""
+    loaded = []
+    for name in modules:
+        try:
+            lazy_import(name)
+            loaded.append(name)
+        except ImportError as e:
+            print(f"⚠️ تعذر استيراد {name}: {e}")
+    return loaded
+
+def warm_engine(config, watch=None):
+    """بناء فهرس المحرك (أو تحميله من AI.INDEX_DIR) ونسخة Excel المحفوظة"""
+    if not config.get("AI", {}).get("ENABLE", True):
+        return None
+    return lazy_import("helpers.engine_registry").engine_from_config(config, watch=watch)
+
+def warm_sheets(config):
+    """تحديث النسخة المحلية من Google Sheets (طلب شرطي) لتشغيل بارد سريع"""
+    url = config.get("SHEET_URL", "")
+    if not url:
+        return None
+    SheetsRefresher = lazy_import("helpers.sheets_refresher", "SheetsRefresher")
+    with init_stage("sheets"):
+        refresher = SheetsRefresher(url, ttl_seconds=config.get("CACHE", {}).get("TTL_SECONDS", 600))
+        refresher.refresh()
+    return refresher
+
+def warm_up(stages):
+    """
+    تنفيذ مراحل التسخين بالترتيب؛ فشل مرحلة لا يوقف البقية.
+    :param stages: [(الاسم، دالة بدون معاملات), ...]
+    :return: {الاسم: {"seconds", "error"}}
+    """
+    results = {}
+    for name, stage in stages:
+        start = time.perf_counter()
+        error = None
+        try:
+            stage()
+        except Exception as e:
+            error = str(e)
+            print(f"⚠️ فشل التسخين ({name}): {e}")
+        results[name] = {"seconds": time.perf_counter() - start, "error": error}
+    return results
+
+def start_background_warmup(stages):
+    """التسخين في خيط خلفي (بعد عرض الصفحة الأولى) حتى لا يؤخر بدء التطبيق"""
+    thread = threading.Thread(target=warm_up, args=(stages,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+    from config.config import get_config_store
+
+    parser = argparse.ArgumentParser(description="تسخين ذاكرات التطبيق (الفهرس، نسخة البيانات) قبل تشغيله")
+    parser.add_argument("--config", default=None, help="مسار config.json")
+    parser.add_argument("--skip-engine", action="store_true", help="عدم بناء فهرس المحرك")
+    parser.add_argument("--skip-sheets", action="store_true", help="عدم تحديث نسخة Google Sheets")
+    args = parser.parse_args()
+
+    config = get_config_store(args.config, watch=False).get()
+    stages = [("imports", warm_imports)]
+    if not args.skip_engine:
+        stages.append(("ai_engine", lambda: warm_engine(config, watch=False)))
+    if not args.skip_sheets:
+        stages.append(("sheets", lambda: warm_sheets(config)))
+    results = warm_up(stages)
+
+    for row in startup_profiler().report():
+        status = f"❌ {row['error']}" if row["error"] else ""
+        print(f"{row['kind']:<7} {row['name']:<28} {row['seconds'] * 1000:>9.1f} ms  {status}")
+    failed = [name for name, result in results.items() if result["error"]]
+    print("✅ اكتمل التسخين" if not failed else f"⚠️ مراحل فشلت: {', '.join(failed)}")
@@ -0,0 +1,274 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from helpers.fingerprint import cached_fingerprint
+from helpers.perf_metrics import timed
+
+# ==============================
+# 📦 إعدادات النسخة العمودية (Columnar Snapshot)
+# ==============================
+SNAPSHOT_FORMAT_VERSION = 2  # v2: الأعمدة النصية UTF-8 + مواقع (offsets) بدل مصفوفات <U بعرض ثابت
+MANIFEST_NAME = "manifest.json"
+DEFAULT_SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "cache/workbook_snapshot")
+KEEP_SNAPSHOTS = 2  # عدد النسخ المحفوظة على القرص (الحالية + السابقة)
+MAX_MANIFESTS = 8  # عدد manifests المحفوظة في الذاكرة
+# نفس القيم التي يعتبرها pd.read_excel فارغة (NaN)
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def snapshot_path(snapshot_dir, fingerprint):
+    """مسار النسخة الخاصة ببصمة ملف Excel"""
+    return os.path.join(snapshot_dir, f"snapshot-v{SNAPSHOT_FORMAT_VERSION}-{fingerprint[:16]}")
+
+
+# ==============================
+# 🔄 تحويل عمود من openpyxl إلى مصفوفة NumPy
+# ==============================
+def _column_array(values):
+    """
+    تحويل قيم عمود إلى (kind, array, null_mask).
+    الأنواع: int / float / bool / datetime / str
+    النصوص: array = (offsets, blob) بترميز UTF-8، فلا تُملأ كل خلية بطول أطول خلية
+    """
+    values = [None if isinstance(v, str) and v in NA_STRINGS else v for v in values]
+    present = [v for v in values if v is not None]
+    nulls = np.array([v is None for v in values], dtype=bool)
+    if not present:
+        return "float", np.full(len(values), np.nan), None
+    if all(isinstance(v, bool) for v in present) and not nulls.any():
+        return "bool", np.array(values, dtype=bool), None
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present) and not nulls.any():
+        return "int", np.array(values, dtype=np.int64), None
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float", np.array([np.nan if v is None else v for v in values], dtype=np.float64), None
+    if all(isinstance(v, datetime.datetime) for v in present):
+        return "datetime", np.array([np.datetime64("NaT") if v is None else np.datetime64(v, "ns") for v in values]), None
+    encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return "str", (offsets, blob), (nulls if nulls.any() else None)
+
+
+def _text_series(offsets, blob, nulls=None):
+    """
+    عمود نصي string[pyarrow] فوق مصفوفات الملف مباشرة (mmap) دون نسخ النصوص.
+    """
+    validity = None
+    if nulls is not None:
+        validity = pa.py_buffer(np.packbits(~nulls, bitorder="little"))
+    array = pa.LargeStringArray.from_buffers(
+        len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(blob), validity,
+        null_count=int(nulls.sum()) if nulls is not None else 0,
+    )
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), copy=False)
+
+
+def _header_names(header):
+    """أسماء الأعمدة بنفس أسلوب pandas (Unnamed: i وترقيم المكرر)"""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+# ==============================
+# 🛠️ بناء النسخة: قراءة كل الأوراق مرة واحدة (read-only)
+# ==============================
+@timed("snapshot_compile")
+def compile_snapshot(workbook_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR, fingerprint=None):
+    """
+    قراءة جميع أوراق ملف Excel مرة واحدة بوضع read-only وكتابتها كأعمدة NumPy.
+    :return: مسار مجلد النسخة
+    """
+    from openpyxl import load_workbook
+
+    fingerprint = fingerprint or cached_fingerprint(workbook_path)
+    target = snapshot_path(snapshot_dir, fingerprint)
+    if os.path.exists(os.path.join(target, MANIFEST_NAME)):
+        return target
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=snapshot_dir)
+    wb = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        sheets = []
+        for s_idx, ws in enumerate(wb.worksheets):
+            rows = ws.iter_rows(values_only=True)
+            header = list(next(rows, ()) or ())
+            body = [list(r) for r in rows]
+            while body and all(v is None for v in body[-1]):
+                body.pop()
+            width = max([len(header)] + [len(r) for r in body])
+            header += [None] * (width - len(header))
+            names = _header_names(header)
+
+            sheet_dir = f"sheet_{s_idx:03d}"
+            os.makedirs(os.path.join(tmp_dir, sheet_dir))
+            columns = []
+            for c_idx, name in enumerate(names):
+                values = [r[c_idx] if c_idx < len(r) else None for r in body]
+                kind, array, nulls = _column_array(values)
+                file_name = f"{sheet_dir}/col_{c_idx:03d}.npy"
+                column = {"name": name, "kind": kind, "file": file_name}
+                if kind == "str":
+                    offsets, array = array
+                    column["offsets"] = f"{sheet_dir}/col_{c_idx:03d}.offsets.npy"
+                    np.save(os.path.join(tmp_dir, column["offsets"]), offsets)
+                np.save(os.path.join(tmp_dir, file_name), array)
+                if nulls is not None:
+                    column["nulls"] = f"{sheet_dir}/col_{c_idx:03d}.nulls.npy"
+                    np.save(os.path.join(tmp_dir, column["nulls"]), nulls)
+                columns.append(column)
+            sheets.append({"name": ws.title, "rows": len(body), "columns": columns})
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "workbook": os.path.abspath(workbook_path),
+            "fingerprint": fingerprint,
+            "created_at": time.time(),
+            "sheets": sheets,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        wb.close()
+    return target
+
+
+def prune_snapshots(snapshot_dir=DEFAULT_SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS, current=None):
+    """
+    حذف النسخ الأقدم (ومنها نسخ الصيغ السابقة) والإبقاء على آخر keep نسخ.
+    الحذف آمن للعمليات التي ما زالت تقرأ نسخة قديمة عبر mmap.
+    :param current: مسار النسخة الحالية (لا تُحذف أبدًا)
+    """
+    if not os.path.isdir(snapshot_dir):
+        return
+    current = os.path.basename(current) if current else None
+    versions = []
+    for name in os.listdir(snapshot_dir):
+        manifest_file = os.path.join(snapshot_dir, name, MANIFEST_NAME)
+        if name.startswith("snapshot-") and name != current and os.path.exists(manifest_file):
+            versions.append((os.path.getmtime(manifest_file), name))
+    for _, name in sorted(versions, reverse=True)[max(keep - 1, 0):]:
+        shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+        with _manifests_lock:
+            _manifests.pop(os.path.join(snapshot_dir, name), None)
+
+
+# ==============================
+# 📂 واجهة التحميل المشتركة
+# ==============================
+_manifests = OrderedDict()
+_manifests_lock = threading.Lock()
+
+def ensure_snapshot(workbook_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR, fingerprint=None):
+    """
+    إرجاع manifest لنسخة مطابقة لمحتوى الملف الحالي (وبناؤها إن لزم).
+    """
+    if not os.path.exists(workbook_path):
+        raise FileNotFoundError(f"الملف غير موجود: {workbook_path}")
+    fingerprint = fingerprint or cached_fingerprint(workbook_path)
+    target = snapshot_path(snapshot_dir, fingerprint)
+    with _manifests_lock:
+        manifest = _manifests.get(target)
+        if manifest is not None:
+            _manifests.move_to_end(target)
+            return manifest
+    if not os.path.exists(os.path.join(target, MANIFEST_NAME)):
+        compile_snapshot(workbook_path, snapshot_dir, fingerprint)
+        prune_snapshots(snapshot_dir, current=target)
+    with open(os.path.join(target, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["path"] = target
+    with _manifests_lock:
+        _manifests[target] = manifest
+        while len(_manifests) > MAX_MANIFESTS:
+            _manifests.popitem(last=False)
+    return manifest
+
+
+def list_sheets(workbook_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """أسماء الأوراق وعدد صفوفها من manifest دون فتح ملف Excel"""
+    manifest = ensure_snapshot(workbook_path, snapshot_dir)
+    return [(s["name"], s["rows"]) for s in manifest["sheets"]]
+
+
+def read_sheet(workbook_path, sheet=0, columns=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR, fingerprint=None):
+    """
+    قراءة ورقة واحدة من النسخة العمودية.
+    :param sheet: رقم الورقة أو اسمها
+    :param columns: الأعمدة المطلوبة فقط (الأعمدة غير الموجودة تُتجاهل)
+    :return: pd.DataFrame
+    """
+    manifest = ensure_snapshot(workbook_path, snapshot_dir, fingerprint)
+    sheets = manifest["sheets"]
+    if isinstance(sheet, int):
+        meta = sheets[sheet]
+    else:
+        matches = [s for s in sheets if s["name"] == sheet]
+        if not matches:
+            raise ValueError(f"الورقة غير موجودة: {sheet}")
+        meta = matches[0]
+
+    wanted = meta["columns"]
+    if columns is not None:
+        by_name = {c["name"]: c for c in wanted}
+        wanted = [by_name[name] for name in columns if name in by_name]
+
+    def _load(name):
+        return np.load(os.path.join(manifest["path"], name), mmap_mode="r")
+
+    data = {}
+    for column in wanted:
+        array = _load(column["file"])
+        nulls = np.load(os.path.join(manifest["path"], column["nulls"])) if "nulls" in column else None
+        if column["kind"] == "str":
+            series = _text_series(_load(column["offsets"]), array, nulls)
+        else:
+            series = pd.Series(array, copy=False)
+            if nulls is not None:
+                series = series.astype(object).mask(nulls)
+        data[column["name"]] = series
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]) if data else None)
+
+
+def has_sheet(workbook_path, name, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """هل تحتوي النسخة على ورقة بهذا الاسم؟"""
+    return any(s == name for s, _ in list_sheets(workbook_path, snapshot_dir))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="بناء نسخة عمودية من ملف Excel متعدد الأوراق")
+    parser.add_argument("workbook", help="مسار ملف Excel")
+    parser.add_argument("snapshot_dir", nargs="?", default=DEFAULT_SNAPSHOT_DIR, help="مجلد النسخة")
+    args = parser.parse_args()
+
+    path = compile_snapshot(args.workbook, args.snapshot_dir)
+    print(f"✅ تم بناء النسخة العمودية: {path}")
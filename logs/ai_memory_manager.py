@@ -1,28 +1,28 @@
-import json
 import os
 from datetime import datetime
+from logs.memory_backends import _FileLock, create_backend, read_legacy_json
+from logs.memory_index import MemoryIndex
 
 class AIMemoryManager:
-    def __init__(self, path="helpers/ai_memory.json"):
+    """
+    ذاكرة تفاعلات المساعد الذكي مع backend تخزين قابل للاستبدال:
+    🔹 json: الملف القديم ai_memory.json (إعادة كتابة كاملة)
+    🔹 jsonl: سجل للإضافة فقط مع كتابة جماعية وضغط ذرّي
+    🔹 sqlite: قاعدة SQLite بوضع WAL
+    """
+    def __init__(self, path="helpers/ai_memory.json", backend=None, **backend_options):
         self.path = path
+        self.backend = create_backend(path, backend, **backend_options)
         self.memory = self.load_memory()
+        self.index = MemoryIndex(self.memory)
 
     def load_memory(self):
-        """تحميل الذاكرة من JSON أو إنشاء بنية جديدة"""
-        if os.path.exists(self.path):
-            try:
-                with open(self.path, "r", encoding="utf-8") as f:
-                    return json.load(f).get("memory", [])
-            except json.JSONDecodeError:
-                print("⚠️ خطأ في ملف ai_memory.json، سيتم إنشاء بنية فارغة")
-                return []
-        else:
-            return []
+        """تحميل الذاكرة من الـ backend"""
+        return self.backend.load()
 
     def save_memory(self):
-        """حفظ الذاكرة إلى JSON"""
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump({"memory": self.memory}, f, ensure_ascii=False, indent=4)
+        """كتابة أي عمليات معلقة إلى التخزين"""
+        self.backend.flush()
 
     def add_interaction(self, role, query, response, reference="", example="", notes="", context_tags=None):
         """إضافة تفاعل جديد"""
@@ -39,25 +39,30 @@ class AIMemoryManager:
             "context_tags": context_tags
         }
         self.memory.append(new_entry)
-        self.save_memory()
+        self.backend.append(new_entry)
+        self.index.add(len(self.memory) - 1, new_entry)
         return new_entry
 
-    def search_memory(self, keyword, role=None):
-        """البحث في الذاكرة باستخدام كلمة مفتاحية وخيار تحديد الدور"""
-        results = []
-        for entry in self.memory:
-            if (keyword.lower() in entry["query"].lower() or keyword.lower() in entry["response"].lower()):
-                if role is None or entry["role"] == role:
-                    results.append(entry)
-        return results
+    def search_memory(self, keyword=None, role=None, tags=None, start=None, end=None, offset=0, limit=None):
+        """
+        البحث في الذاكرة عبر الفهرس: كلمة مفتاحية، الدور، الوسوم، والفترة الزمنية
+        مع دعم التصفح (offset / limit).
+        """
+        positions = self.index.search(keyword, role=role, tags=tags, start=start, end=end)
+        stop = None if limit is None else offset + limit
+        return [self.memory[i] for i in positions[offset:stop]]
+
+    def count_memory(self, keyword=None, role=None, tags=None, start=None, end=None):
+        """عدد النتائج المطابقة (لحساب عدد الصفحات)"""
+        return len(self.index.search(keyword, role=role, tags=tags, start=start, end=end))
 
     def update_interaction(self, index, **kwargs):
         """تعديل تفاعل موجود بالاعتماد على index"""
         if 0 <= index < len(self.memory):
-            for key, value in kwargs.items():
-                if key in self.memory[index]:
-                    self.memory[index][key] = value
-            self.save_memory()
+            changed = {key: value for key, value in kwargs.items() if key in self.memory[index]}
+            self.memory[index].update(changed)
+            self.backend.update(index, changed)
+            self.index.update(index, self.memory[index])
             return self.memory[index]
         else:
             raise IndexError("❌ فهرس غير صالح للتعديل")
@@ -65,4 +70,44 @@ class AIMemoryManager:
     def clear_memory(self):
         """مسح كل الذاكرة"""
         self.memory = []
-        self.save_memory()
\ No newline at end of file
+        self.index = MemoryIndex()
+        self.backend.clear()
+
+    def reload(self):
+        """إعادة القراءة من التخزين (لرؤية ما أضافه عمال آخرون)"""
+        self.memory = self.load_memory()
+        self.index = MemoryIndex(self.memory)
+
+    def compact(self):
+        """
+        ضغط التخزين بشكل ذرّي (إزالة عمليات التعديل والحذف القديمة).
+        الذاكرة والفهرس يُستبدلان بنتيجة الضغط نفسها حتى تبقى مواقعها مطابقة لمعرّفات الـ backend.
+        """
+        self.memory = self.backend.compact()
+        self.index = MemoryIndex(self.memory)
+
+    def import_json(self, json_path):
+        """استيراد ملف ai_memory.json القديم إلى الـ backend الحالي"""
+        entries = read_legacy_json(json_path)
+        for entry in entries:
+            self.memory.append(entry)
+            self.backend.append(entry)
+            self.index.add(len(self.memory) - 1, entry)
+        self.backend.flush()
+        return len(entries)
+
+    def import_legacy_json(self, json_path):
+        """
+        ترحيل ملف ai_memory.json القديم مرة واحدة: الاستيراد تحت قفل ملف (عمال متعددون)
+        ثم إعادة تسميته إلى ‎.imported حتى لا يُستورد مجددًا.
+        :return: عدد التفاعلات المستوردة
+        """
+        if os.path.abspath(json_path) == os.path.abspath(self.path) or not os.path.exists(json_path):
+            return 0
+        with _FileLock(json_path):
+            self.reload()  # قد يكون عامل آخر رحّله قبل الحصول على القفل
+            if not os.path.exists(json_path):
+                return 0
+            count = self.import_json(json_path)
+            os.replace(json_path, f"{json_path}.imported")
+        return count
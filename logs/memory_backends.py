@@ -0,0 +1,321 @@
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+ENTRY_FIELDS = ["timestamp", "role", "query", "response", "reference", "example", "notes", "context_tags"]
+
+
+class _FileLock:
+    """قفل حصري بين العمليات عبر ملف .lock منفصل (يبقى صالحًا بعد استبدال ملف البيانات)"""
+
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+
+    def __enter__(self):
+        self._fd = open(self.path, "a")
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._fd.close()
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_legacy_json(path):
+    """قراءة ملف ai_memory.json القديم بصيغة {"memory": [...]}"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("memory", [])
+    except json.JSONDecodeError:
+        print("⚠️ خطأ في ملف ai_memory.json، سيتم إنشاء بنية فارغة")
+        return []
+
+
+# ==============================
+# 📄 JSON (الصيغة القديمة)
+# ==============================
+class JSONMemoryBackend:
+    """
+    الصيغة الأصلية: إعادة كتابة الملف كاملًا عند كل تعديل.
+    الكتابة أصبحت ذرّية (ملف مؤقت + rename) لتجنب تلف الملف.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+
+    def load(self):
+        self.entries = read_legacy_json(self.path)
+        return list(self.entries)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        _write_json_atomic(self.path, {"memory": self.entries})
+
+    def append(self, entry):
+        self.entries.append(entry)
+        self._save()
+
+    def update(self, index, fields):
+        self.entries[index].update(fields)
+        self._save()
+
+    def clear(self):
+        self.entries = []
+        self._save()
+
+    def flush(self):
+        pass
+
+    def compact(self):
+        self._save()
+        return list(self.entries)
+
+
+# كل backends الكتابة الجماعية الحية؛ تُكتب عملياتها المعلقة مرة واحدة عند إنهاء العملية
+# (مرجع ضعيف: لا يبقي atexit كل نسخة حية حتى نهاية العملية)
+_live_backends = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_backends():
+    for backend in list(_live_backends):
+        backend.flush()
+
+
+class _BufferedBackend:
+    """منطق الكتابة الجماعية (group commit) المشترك بين JSONL و SQLite"""
+
+    def __init__(self, batch_size=1, flush_interval=1.0):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.ids = []
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.RLock()
+        _live_backends.add(self)
+
+    def _enqueue(self, op):
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                if self.batch_size > 1:
+                    # ضمان كتابة الدفعة حتى لو لم تصل عمليات جديدة
+                    timer = threading.Timer(self.flush_interval, self.flush)
+                    timer.daemon = True
+                    timer.start()
+            self._pending.append(op)
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            ops, self._pending = self._pending, []
+            self._write_ops(ops)
+
+    def append(self, entry):
+        with self._lock:
+            uid = uuid.uuid4().hex
+            self.ids.append(uid)
+            self._enqueue({"op": "add", "id": uid, "entry": entry})
+
+    def update(self, index, fields):
+        with self._lock:
+            self._enqueue({"op": "update", "id": self.ids[index], "fields": fields})
+
+    def clear(self):
+        with self._lock:
+            self.ids = []
+            self._enqueue({"op": "clear"})
+            self.flush()
+
+
+# ==============================
+# 📜 سجل JSONL للإضافة فقط
+# ==============================
+class JSONLMemoryBackend(_BufferedBackend):
+    """
+    سجل عمليات (add / update / clear) بسطر JSON لكل عملية.
+    🔹 الإضافة O(1) دون إعادة كتابة الملف
+    🔹 قفل ملف بين العمليات لكتابة آمنة من عدة عمال Streamlit
+    🔹 compact() يعيد كتابة السجل كحالة نهائية بشكل ذرّي
+    """
+
+    def __init__(self, path, batch_size=1, flush_interval=1.0, fsync=True):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self.fsync = fsync
+        self._file_lock = _FileLock(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _replay(self):
+        entries, ids, positions = [], [], {}
+        if not os.path.exists(self.path):
+            return entries, ids
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # سطر أخير غير مكتمل بعد توقف مفاجئ
+                    continue
+                if op["op"] == "add":
+                    positions[op["id"]] = len(entries)
+                    entries.append(op["entry"])
+                    ids.append(op["id"])
+                elif op["op"] == "update" and op["id"] in positions:
+                    entries[positions[op["id"]]].update(op["fields"])
+                elif op["op"] == "clear":
+                    entries, ids, positions = [], [], {}
+        return entries, ids
+
+    def load(self):
+        with self._lock:
+            self.flush()
+            entries, self.ids = self._replay()
+            return entries
+
+    def _write_ops(self, ops):
+        payload = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode("utf-8")
+        with self._file_lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def compact(self):
+        """
+        استبدال السجل بعمليات add فقط للحالة الحالية (ذرّيًا).
+        :return: التفاعلات بعد الضغط (تشمل ما أضافه عمال آخرون، بنفس ترتيب self.ids)
+        """
+        with self._lock:
+            self.flush()
+            with self._file_lock:
+                entries, ids = self._replay()
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for uid, entry in zip(ids, entries):
+                        f.write(json.dumps({"op": "add", "id": uid, "entry": entry}, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            self.ids = ids
+            return entries
+
+
+# ==============================
+# 🗄️ SQLite (WAL)
+# ==============================
+class SQLiteMemoryBackend(_BufferedBackend):
+    """
+    تخزين في SQLite بوضع WAL: إدخال O(1)، كتابة جماعية في معاملة واحدة،
+    وقراءات متزامنة آمنة من عدة عمليات.
+    """
+
+    def __init__(self, path, batch_size=1, flush_interval=1.0):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, "
+            + ", ".join(f"{field} TEXT" for field in ENTRY_FIELDS) + ")"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _encode(entry):
+        values = []
+        for field in ENTRY_FIELDS:
+            value = entry.get(field, "")
+            values.append(json.dumps(value, ensure_ascii=False) if field == "context_tags" else value)
+        return values
+
+    def load(self):
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(f"SELECT id, {', '.join(ENTRY_FIELDS)} FROM memory ORDER BY seq").fetchall()
+            self.ids, entries = [], []
+            for row in rows:
+                self.ids.append(row[0])
+                entry = dict(zip(ENTRY_FIELDS, row[1:]))
+                entry["context_tags"] = json.loads(entry["context_tags"] or "[]")
+                entries.append(entry)
+            return entries
+
+    def _write_ops(self, ops):
+        with self.conn:
+            for op in ops:
+                if op["op"] == "add":
+                    self.conn.execute(
+                        f"INSERT INTO memory (id, {', '.join(ENTRY_FIELDS)}) VALUES ({', '.join('?' * (len(ENTRY_FIELDS) + 1))})",
+                        [op["id"]] + self._encode(op["entry"]),
+                    )
+                elif op["op"] == "update":
+                    fields = {k: v for k, v in op["fields"].items() if k in ENTRY_FIELDS}
+                    if not fields:
+                        continue
+                    assignments = ", ".join(f"{k} = ?" for k in fields)
+                    values = [json.dumps(v, ensure_ascii=False) if k == "context_tags" else v for k, v in fields.items()]
+                    self.conn.execute(f"UPDATE memory SET {assignments} WHERE id = ?", values + [op["id"]])
+                elif op["op"] == "clear":
+                    self.conn.execute("DELETE FROM memory")
+
+    def compact(self):
+        with self._lock:
+            self.flush()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.execute("VACUUM")
+            return self.load()
+
+
+# ==============================
+# 🏭 اختيار الـ backend
+# ==============================
+BACKENDS = {"json": JSONMemoryBackend, "jsonl": JSONLMemoryBackend, "sqlite": SQLiteMemoryBackend}
+
+
+def create_backend(path, backend=None, **options):
+    """
+    إنشاء backend حسب الاسم أو امتداد الملف:
+    .jsonl → JSONL، ‎.db/.sqlite → SQLite، غير ذلك → JSON القديم
+    """
+    if backend is None:
+        ext = os.path.splitext(path)[1].lower()
+        backend = "jsonl" if ext == ".jsonl" else "sqlite" if ext in (".db", ".sqlite", ".sqlite3") else "json"
+    if not isinstance(backend, str):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ backend غير مدعوم: {backend}")
+    if backend == "json":
+        return JSONMemoryBackend(path)
+    return BACKENDS[backend](path, **options)
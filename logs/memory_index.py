@@ -0,0 +1,92 @@
+import bisect
+from helpers.search_index import InvertedIndex
+
+
+class MemoryIndex:
+    """
+    فهرس تفاعلات الذاكرة يُحدَّث تدريجيًا:
+    🔹 كلمات query و response (فهرس مقلوب مع بحث جزئي)
+    🔹 الدور (role) والوسوم (context_tags)
+    🔹 الطوابع الزمنية مرتبة للبحث ضمن فترة
+    """
+
+    def __init__(self, entries=()):
+        self.text = InvertedIndex()
+        self.roles = {}
+        self.tags = {}
+        self.timeline = []
+        self._keys = {}
+        for position, entry in enumerate(entries):
+            self.add(position, entry)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, position, entry):
+        """إضافة تفاعل في موقعه داخل الذاكرة"""
+        if position in self._keys:
+            self.remove(position)
+        role = entry.get("role")
+        tags = tuple(entry.get("context_tags") or ())
+        timestamp = str(entry.get("timestamp", ""))
+        self.text.add(position, (entry.get("query", ""), entry.get("response", "")))
+        self.roles.setdefault(role, set()).add(position)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(position)
+        bisect.insort(self.timeline, (timestamp, position))
+        self._keys[position] = (role, tags, timestamp)
+
+    def remove(self, position):
+        keys = self._keys.pop(position, None)
+        if keys is None:
+            return
+        role, tags, timestamp = keys
+        self.text.remove(position)
+        self._discard(self.roles, role, position)
+        for tag in tags:
+            self._discard(self.tags, tag, position)
+        i = bisect.bisect_left(self.timeline, (timestamp, position))
+        if i < len(self.timeline) and self.timeline[i] == (timestamp, position):
+            del self.timeline[i]
+
+    @staticmethod
+    def _discard(mapping, key, position):
+        rows = mapping.get(key)
+        if rows is not None:
+            rows.discard(position)
+            if not rows:
+                del mapping[key]
+
+    def update(self, position, entry):
+        """إعادة فهرسة تفاعل بعد تعديله"""
+        self.add(position, entry)
+
+    def search(self, keyword=None, role=None, tags=None, start=None, end=None):
+        """
+        مواقع التفاعلات المطابقة لكل الشروط (مرتبة).
+        :param keyword: نص جزئي داخل query أو response
+        :param role: الدور
+        :param tags: وسم أو قائمة وسوم (يجب توفرها كلها)
+        :param start / end: حدود الفترة الزمنية بصيغة "%Y-%m-%d %H:%M:%S" (أو جزء منها)
+        """
+        sets = []
+        if role is not None:
+            sets.append(self.roles.get(role, set()))
+        if tags:
+            for tag in ([tags] if isinstance(tags, str) else tags):
+                sets.append(self.tags.get(tag, set()))
+        if start is not None or end is not None:
+            lo = 0 if start is None else bisect.bisect_left(self.timeline, (str(start),))
+            hi = len(self.timeline) if end is None else bisect.bisect_right(self.timeline, (str(end) + "\uffff",))
+            sets.append({position for _, position in self.timeline[lo:hi]})
+
+        if keyword:
+            candidates = None
+            if sets:
+                sets.sort(key=len)
+                candidates = set(sets[0]).intersection(*sets[1:])
+            return self.text.search(keyword, candidates=candidates)
+        if not sets:
+            return sorted(self._keys)
+        sets.sort(key=len)
+        return sorted(set(sets[0]).intersection(*sets[1:]))
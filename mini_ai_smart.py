@@ -1,6 +1,9 @@
 import pandas as pd
 import os
-from difflib import get_close_matches
+from helpers.search_index import InvertedIndex, NGramIndex
+from helpers.result_cache import cached_result, new_index_version, shared_result_cache
+from helpers.workbook_snapshot import has_sheet, read_sheet
+from helpers.perf_metrics import timed
 
 class MiniLegalAI:
     """
@@ -11,23 +14,71 @@ class MiniLegalAI:
 
     def __init__(self, workbook_path="AlyWork_Law_Pro_v2025_v24_ColabStreamlitReady.xlsx"):
         self.workbook_path = workbook_path
-        self.data = self.load_workbook(workbook_path)
+        self.index_version = None
+        self.reload()
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """إنشاء المساعد من DataFrame جاهز دون ملف Excel (لقياس الأداء والتجارب)"""
+        ai = cls.__new__(cls)
+        ai.workbook_path = None
+        ai.data = df.fillna("")
+        ai.build_indexes()
+        ai.index_version = new_index_version("frame")
+        return ai
+
+    def reload(self):
+        """إعادة تحميل ملف Excel وبناء الفهارس مع إبطال النتائج المخزنة للإصدار السابق"""
+        old_version = self.index_version
+        self.data = self.load_workbook(self.workbook_path)
+        self.build_indexes()
+        self.index_version = new_index_version(os.path.abspath(self.workbook_path))
+        if old_version is not None:
+            shared_result_cache().discard_version(old_version)
+
+    def normalize_query(self, query):
+        """توحيد الاستعلام كمفتاح للذاكرة المؤقتة (البحث غير حساس لحالة الأحرف)"""
+        return str(query).casefold()
 
     def load_workbook(self, path):
         """تحميل بيانات Excel كاملة."""
         if not os.path.exists(path):
             raise FileNotFoundError(f"الملف غير موجود: {path}")
         try:
-            xls = pd.ExcelFile(path)
-            if "مواد_القانون" in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name="مواد_القانون")
-            else:
-                df = pd.read_excel(xls, sheet_name=0)
+            with timed("excel_load"):
+                sheet = "مواد_القانون" if has_sheet(path, "مواد_القانون") else 0
+                df = read_sheet(path, sheet)
             df.fillna("", inplace=True)
             return df
         except Exception as e:
             raise ValueError(f"خطأ أثناء تحميل ملف Excel: {e}")
 
+    def build_indexes(self):
+        """
+        بناء الفهارس مرة واحدة عند التحميل:
+        🔹 فهرس مقلوب للكلمات عبر جميع الأعمدة
+        🔹 فهرس الأقسام: القسم → مواقع الصفوف
+        🔹 فهرس n-gram لنص القانون للبحث التقريبي
+        """
+        self.text_index = InvertedIndex.from_frame(self.data)
+        self.fuzzy_index = None
+        if "نص_القانون" in self.data.columns:
+            self.fuzzy_index = NGramIndex(self.data["نص_القانون"].tolist())
+        self.section_index = {}
+        if "القسم" in self.data.columns:
+            for row, value in enumerate(self.data["القسم"].tolist()):
+                self.section_index.setdefault(str(value), []).append(row)
+
+    def _section_rows(self, section):
+        """مواقع صفوف الأقسام التي يحتوي اسمها على section"""
+        needle = str(section).casefold()
+        rows = set()
+        for name, name_rows in self.section_index.items():
+            if needle in name.casefold():
+                rows.update(name_rows)
+        return rows
+
+    @cached_result("advanced_search")
     def advanced_search(self, query, section=None, max_results=3):
         """
         البحث الذكي شبه الاصطناعي:
@@ -38,19 +89,19 @@ class MiniLegalAI:
         if self.data.empty:
             return "لا توجد بيانات", "", ""
 
-        df = self.data.copy()
-        if section and "القسم" in df.columns:
-            df = df[df["القسم"].str.contains(section, case=False, na=False)]
+        allowed = None
+        if section and "القسم" in self.data.columns:
+            allowed = self._section_rows(section)
 
-        # البحث النصي الأساسي
-        mask = df.apply(lambda row: row.astype(str).str.contains(query, case=False, na=False).any(), axis=1)
-        results = df[mask]
+        # البحث النصي الأساسي عبر الفهرس المقلوب
+        rows = self.text_index.search(query, candidates=allowed, limit=max_results)
 
         # إذا لم توجد نتائج مباشرة، استخدم التطابق الذكي
-        if results.empty and "نص_القانون" in df.columns:
-            all_texts = df["نص_القانون"].tolist()
-            matches = get_close_matches(query, all_texts, n=max_results, cutoff=0.4)
-            results = df[df["نص_القانون"].isin(matches)]
+        if not rows and self.fuzzy_index is not None:
+            matches = self.fuzzy_index.most_similar(query, n=max_results, cutoff=0.4, candidates=allowed)
+            rows = sorted(row for row, _ in matches)
+        # الإجابة تستخدم أول نتيجة فقط: لا داعي لبناء DataFrame لكل الصفوف المطابقة
+        results = self.data.iloc[rows[:max_results]]
 
         if results.empty:
             return "لا توجد نتائج مطابقة للبحث.", "", ""
@@ -62,19 +113,17 @@ class MiniLegalAI:
 
         return law_text, reference, example
 
+    @cached_result("suggest_related_materials")
     def suggest_related_materials(self, query, n=3):
         """
         🔹 اقتراح مواد قانونية مشابهة للموضوع
         """
-        if self.data.empty or "نص_القانون" not in self.data.columns:
+        if self.data.empty or self.fuzzy_index is None:
             return []
 
-        all_texts = self.data["نص_القانون"].tolist()
-        matches = get_close_matches(query, all_texts, n=n, cutoff=0.3)
-
         suggestions = []
-        for match in matches:
-            row = self.data[self.data["نص_القانون"] == match].iloc[0]
+        for pos, _ in self.fuzzy_index.most_similar(query, n=n, cutoff=0.3):
+            row = self.data.iloc[pos]
             suggestions.append({
                 "المادة": row.get("المادة", ""),
                 "القسم": row.get("القسم", ""),
@@ -93,7 +142,7 @@ class MiniLegalAI:
         """إرجاع جميع المواد داخل قسم محدد"""
         if "القسم" not in self.data.columns:
             return pd.DataFrame()
-        return self.data[self.data["القسم"].str.contains(section, case=False, na=False)]
+        return self.data.iloc[sorted(self._section_rows(section))]
 
 # ========== مثال للاستخدام ==========
 if __name__ == "__main__":
@@ -1,40 +1,100 @@
+import hashlib
+import json
+import threading
 import streamlit as st
-from helpers.ui_components import section_header
+from helpers.recommendation_ranker import RecommendationRanker
+from helpers.ui_components import emit_html, section_header, smart_card_html
 
 # ==============================
 # 🎯 بيانات التوصيات الذكية مع صور مصغرة وروابط
 # ==============================
+RECOMMENDATIONS = {
+    "العمال": [
+        {"العنوان": "احسب مكافأة نهاية الخدمة", "الوصف": "استخدم الحاسبة لتقدير مستحقاتك.", "النوع": "حاسبة", "link": "#", "icon": "🧮", "img": "assets/icons/service_end.png"},
+        {"العنوان": "راجع حقوقك الأساسية", "الوصف": "تعرف على حقوقك وفق القانون الأردني.", "النوع": "توعية", "link": "#", "icon": "📚", "img": "assets/icons/rights.png"},
+        {"العنوان": "اطلع على سوابق قضائية", "الوصف": "أحكام مشابهة لحالتك.", "النوع": "قانوني", "link": "#", "icon": "⚖️", "img": "assets/icons/legal_case.png"},
+        {"العنوان": "تطبيقات عملية", "الوصف": "أمثلة تطبيقية للمواد القانونية.", "النوع": "تعليمي", "link": "#", "icon": "💡", "img": "assets/icons/practice.png"}
+    ],
+    "اصحاب العمل": [
+        {"العنوان": "تحقق من امتثالك القانوني", "الوصف": "تأكد من التزاماتك كصاحب عمل.", "النوع": "امتثال", "link": "#", "icon": "✅", "img": "assets/icons/compliance.png"},
+        {"العنوان": "احسب تكلفة الموظف", "الوصف": "احسب التكلفة الشاملة.", "النوع": "مالي", "link": "#", "icon": "💰", "img": "assets/icons/cost.png"},
+        {"العنوان": "اعرف إجراءات الفصل", "الوصف": "الخطوات القانونية للفصل المشروع.", "النوع": "قانوني", "link": "#", "icon": "⚖️", "img": "assets/icons/legal_case.png"},
+        {"العنوان": "نصائح إدارة الموارد البشرية", "الوصف": "استراتيجيات وأمثلة ناجحة.", "النوع": "توعية", "link": "#", "icon": "📚", "img": "assets/icons/hr.png"}
+    ],
+    "مفتشو العمل": [
+        {"العنوان": "دليل التفتيش", "الوصف": "إجراءات التفتيش ومراحله.", "النوع": "مرجع", "link": "#", "icon": "📖", "img": "assets/icons/inspection.png"},
+        {"العنوان": "نماذج تقارير", "الوصف": "نماذج تفتيش جاهزة.", "النوع": "نموذج", "link": "#", "icon": "📝", "img": "assets/icons/report.png"},
+        {"العنوان": "تحديثات القوانين", "الوصف": "آخر التعديلات والتعليمات.", "النوع": "مرجع", "link": "#", "icon": "📜", "img": "assets/icons/updates.png"}
+    ],
+    "الباحثون والمتدربون": [
+        {"العنوان": "تحليل التعديلات القانونية", "الوصف": "قارن النصوص قبل وبعد التعديل.", "النوع": "بحث", "link": "#", "icon": "🔍", "img": "assets/icons/research.png"},
+        {"العنوان": "اختبار معرفتك", "الوصف": "اختبارات قانونية تفاعلية.", "النوع": "تعليمي", "link": "#", "icon": "🧩", "img": "assets/icons/quiz.png"},
+        {"العنوان": "مراجع أكاديمية", "الوصف": "مقالات وأبحاث قانونية.", "النوع": "بحث", "link": "#", "icon": "📚", "img": "assets/icons/academic.png"}
+    ]
+}
+
 def get_recommendations_data():
-    return {
-        "العمال": [
-            {"العنوان": "احسب مكافأة نهاية الخدمة", "الوصف": "استخدم الحاسبة لتقدير مستحقاتك.", "النوع": "حاسبة", "link": "#", "icon": "🧮", "img": "assets/icons/service_end.png"},
-            {"العنوان": "راجع حقوقك الأساسية", "الوصف": "تعرف على حقوقك وفق القانون الأردني.", "النوع": "توعية", "link": "#", "icon": "📚", "img": "assets/icons/rights.png"},
-            {"العنوان": "اطلع على سوابق قضائية", "الوصف": "أحكام مشابهة لحالتك.", "النوع": "قانوني", "link": "#", "icon": "⚖️", "img": "assets/icons/legal_case.png"},
-            {"العنوان": "تطبيقات عملية", "الوصف": "أمثلة تطبيقية للمواد القانونية.", "النوع": "تعليمي", "link": "#", "icon": "💡", "img": "assets/icons/practice.png"}
-        ],
-        "اصحاب العمل": [
-            {"العنوان": "تحقق من امتثالك القانوني", "الوصف": "تأكد من التزاماتك كصاحب عمل.", "النوع": "امتثال", "link": "#", "icon": "✅", "img": "assets/icons/compliance.png"},
-            {"العنوان": "احسب تكلفة الموظف", "الوصف": "احسب التكلفة الشاملة.", "النوع": "مالي", "link": "#", "icon": "💰", "img": "assets/icons/cost.png"},
-            {"العنوان": "اعرف إجراءات الفصل", "الوصف": "الخطوات القانونية للفصل المشروع.", "النوع": "قانوني", "link": "#", "icon": "⚖️", "img": "assets/icons/legal_case.png"},
-            {"العنوان": "نصائح إدارة الموارد البشرية", "الوصف": "استراتيجيات وأمثلة ناجحة.", "النوع": "توعية", "link": "#", "icon": "📚", "img": "assets/icons/hr.png"}
-        ],
-        "مفتشو العمل": [
-            {"العنوان": "دليل التفتيش", "الوصف": "إجراءات التفتيش ومراحله.", "النوع": "مرجع", "link": "#", "icon": "📖", "img": "assets/icons/inspection.png"},
-            {"العنوان": "نماذج تقارير", "الوصف": "نماذج تفتيش جاهزة.", "النوع": "نموذج", "link": "#", "icon": "📝", "img": "assets/icons/report.png"},
-            {"العنوان": "تحديثات القوانين", "الوصف": "آخر التعديلات والتعليمات.", "النوع": "مرجع", "link": "#", "icon": "📜", "img": "assets/icons/updates.png"}
-        ],
-        "الباحثون والمتدربون": [
-            {"العنوان": "تحليل التعديلات القانونية", "الوصف": "قارن النصوص قبل وبعد التعديل.", "النوع": "بحث", "link": "#", "icon": "🔍", "img": "assets/icons/research.png"},
-            {"العنوان": "اختبار معرفتك", "الوصف": "اختبارات قانونية تفاعلية.", "النوع": "تعليمي", "link": "#", "icon": "🧩", "img": "assets/icons/quiz.png"},
-            {"العنوان": "مراجع أكاديمية", "الوصف": "مقالات وأبحاث قانونية.", "النوع": "بحث", "link": "#", "icon": "📚", "img": "assets/icons/academic.png"}
-        ]
-    }
+    return RECOMMENDATIONS
+
+# نوع البطاقة → صنف CSS (الألوان في assets/components.css)
+TYPE_CLASSES = {
+    "حاسبة": "calculator",
+    "توعية": "awareness",
+    "قانوني": "legal",
+    "تعليمي": "education",
+    "امتثال": "compliance",
+    "مالي": "finance",
+    "مرجع": "reference",
+    "نموذج": "template",
+    "بحث": "research"
+}
+
+# ==============================
+# 🧱 HTML البطاقة (يُبنى مرة واحدة لكل نسخة من البطاقة)
+# ==============================
+_card_html = {}
+
+def card_version(rec):
+    """بصمة محتوى البطاقة: أي تعديل في بياناتها يُنتج HTML جديدًا"""
+    return hashlib.sha1(json.dumps(rec, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def card_html(rec):
+    version = card_version(rec)
+    html_card = _card_html.get(version)
+    if html_card is None:
+        html_card = _card_html[version] = smart_card_html(rec, TYPE_CLASSES.get(rec['النوع'], "default"))
+    return html_card
+
+# ==============================
+# 📈 الترتيب حسب تفاعلات المستخدمين (مشترك بين الجلسات)
+# ==============================
+_ranker = RecommendationRanker(RECOMMENDATIONS)
+_record_lock = threading.Lock()
+
+def shared_ranker():
+    return _ranker
+
+def record_interaction(memory, role, query, result):
+    """
+    حفظ سؤال المستخدم في ذاكرة المساعد وتحديث عدادات الترتيب من التفاعل الجديد فقط.
+    :param result: (answer, reference, example)
+    """
+    answer, reference, example = result
+    with _record_lock:
+        memory.add_interaction(role, query, answer, reference, example, context_tags=[role] if role else [])
+        _ranker.sync(memory.memory)
 
 # ==============================
 # 💡 عرض البطاقات التفاعلية بأسلوب Grid متحرك
 # ==============================
-def smart_recommender(role_label="العمال", n=6):
-    recommendations = get_recommendations_data().get(role_label, [])
+def smart_recommender(role_label="العمال", n=6, query="", memory=None):
+    """
+    :param query: آخر سؤال في الجلسة (يرفع البطاقات المرتبطة به)
+    :param memory: AIMemoryManager لقراءة التفاعلات الجديدة (إن وجدت)
+    """
+    if memory is not None:
+        _ranker.sync(memory.memory)
+    recommendations = _ranker.rank(role_label, query, n)
     if not recommendations:
         st.warning("⚠️ لا توجد توصيات حالياً.")
         return
@@ -43,35 +103,6 @@ def smart_recommender(role_label="العمال", n=6):
 
     # إنشاء Grid ديناميكي (3 أعمدة)
     cols = st.columns(3)
-    type_styles = {
-        "حاسبة": "linear-gradient(135deg, #FFD700, #FFA500)",
-        "توعية": "linear-gradient(135deg, #00BFFF, #1E90FF)",
-        "قانوني": "linear-gradient(135deg, #FF4500, #FF6347)",
-        "تعليمي": "linear-gradient(135deg, #32CD32, #7CFC00)",
-        "امتثال": "linear-gradient(135deg, #8A2BE2, #9400D3)",
-        "مالي": "linear-gradient(135deg, #FF69B4, #FF1493)",
-        "مرجع": "linear-gradient(135deg, #20B2AA, #3CB371)",
-        "نموذج": "linear-gradient(135deg, #FFA500, #FF8C00)",
-        "بحث": "linear-gradient(135deg, #7FFF00, #32CD32)"
-    }
-
-    for idx, rec in enumerate(recommendations[:n]):
+    for idx, rec in enumerate(recommendations):
         with cols[idx % len(cols)]:
-            style = type_styles.get(rec['النوع'], "#D3D3D3")
-            html_card = f"""
-            <div style="
-                background: {style};
-                border-radius:15px;
-                padding:15px;
-                margin:5px;
-                box-shadow: 2px 4px 15px rgba(0,0,0,0.2);
-                transition: transform 0.3s, box-shadow 0.3s;
-                text-align:center;
-            ">
-                <img src='{rec['img']}' alt='icon' width='50px' style='margin-bottom:10px;'/>
-                <h4>{rec['icon']} {rec['العنوان']}</h4>
-                <p style='font-size:14px; margin:5px 0;'>{rec['الوصف']}</p>
-                <a href='{rec['link']}' target='_blank' style='color:#fff; text-decoration:underline;'>اضغط هنا للتفاصيل</a>
-            </div>
-            """
-            st.markdown(html_card, unsafe_allow_html=True)
\ No newline at end of file
+            emit_html(card_html(rec), "smart_card")